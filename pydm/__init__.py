@@ -1,6 +1,45 @@
-from .application import PyDMApplication
-from .display import Display
-from .data_plugins import set_read_only
+import sys
+import importlib
+
 from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
+
+# The application and the displays are only imported when they are first
+# used, so that importing a module of the package, e.g. a widget, does not
+# import them and all their dependencies.
+_LAZY_ATTRIBUTES = {'PyDMApplication': '.application',
+                    'Display': '.display',
+                    'set_read_only': '.data_plugins'}
+
+__all__ = ['PyDMApplication', 'Display', 'set_read_only']
+
+
+def _load_attribute(name):
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _LAZY_ATTRIBUTES:
+            return _load_attribute(name)
+        if not name.startswith('__'):
+            # The subpackages and modules, e.g. pydm.widgets, which were
+            # imported along with the application before.
+            try:
+                return importlib.import_module('.' + name, __name__)
+            except ImportError as error:
+                if getattr(error, 'name', None) != __name__ + '.' + name:
+                    raise
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             "".format(__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    # Module attributes can not be loaded lazily before Python 3.7.
+    for _name in _LAZY_ATTRIBUTES:
+        _load_attribute(_name)
@@ -57,9 +57,14 @@ class AboutWindow(QWidget):
         self.ui.dataPluginsTableWidget.setHorizontalHeaderLabels(col_labels)
         self.ui.dataPluginsTableWidget.horizontalHeader().setStretchLastSection(True)
         self.ui.dataPluginsTableWidget.verticalHeader().setVisible(False)
-        for (protocol, plugin) in pydm.data_plugins.plugin_modules.items():
+        plugin_files = [(protocol, inspect.getfile(plugin.__class__))
+                        for (protocol, plugin)
+                        in pydm.data_plugins.plugin_modules.items()]
+        # Plugins not used yet are not imported.
+        plugin_files.extend(pydm.data_plugins.lazy_plugins.items())
+        for (protocol, plugin_file) in sorted(plugin_files):
             protocol_item = QTableWidgetItem(protocol)
-            file_item = QTableWidgetItem(inspect.getfile(plugin.__class__))
+            file_item = QTableWidgetItem(plugin_file)
             new_row = self.ui.dataPluginsTableWidget.rowCount()
             self.ui.dataPluginsTableWidget.insertRow(new_row)
             self.ui.dataPluginsTableWidget.setItem(new_row, 0, protocol_item)
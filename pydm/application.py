@@ -20,6 +20,7 @@ from .utilities import macro, which, path_info, find_display_in_path
 from .utilities.stylesheet import apply_stylesheet
 from .utilities import connection
 from . import data_plugins
+from . import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -202,9 +203,10 @@ class PyDMApplication(QApplication):
         of starting up a new process, because PyDMApplications only have
         one window per process.
         """
-        main_window = PyDMMainWindow(hide_nav_bar=self.hide_nav_bar,
-                                     hide_menu_bar=self.hide_menu_bar,
-                                     hide_status_bar=self.hide_status_bar)
+        with tracing.trace_span("create main window"):
+            main_window = PyDMMainWindow(hide_nav_bar=self.hide_nav_bar,
+                                         hide_menu_bar=self.hide_menu_bar,
+                                         hide_status_bar=self.hide_status_bar)
 
         self.main_window = main_window
         apply_stylesheet(stylesheet_path, widget=self.main_window)
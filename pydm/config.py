@@ -1,9 +1,24 @@
 import os
+import tempfile
 
 __all__ = ['DEFAULT_PROTOCOL',
            'DESIGNER_ONLINE',
            'STYLESHEET',
-           'STYLESHEET_INCLUDE_DEFAULT'
+           'STYLESHEET_INCLUDE_DEFAULT',
+           'UI_CACHE_PATH',
+           'UI_CACHE_MEMORY_SIZE',
+           'UI_CACHE_DISK_SIZE',
+           'ARCHIVER_URL',
+           'ARCHIVER_THREADS',
+           'ARCHIVER_CACHE_SIZE',
+           'ARCHIVER_LAG',
+           'MAX_VALUE_RATE',
+           'DATA_PLUGINS_MANIFEST',
+           'SHM_PATH',
+           'SHM_POLL_RATE',
+           'HISTORY_PATH',
+           'HISTORY_SEGMENT_SIZE',
+           'HISTORY_SEGMENTS'
            ]
 
 
@@ -17,3 +32,50 @@ DESIGNER_ONLINE = os.getenv("PYDM_DESIGNER_ONLINE", None) is not None
 STYLESHEET = os.getenv("PYDM_STYLESHEET", None)
 
 STYLESHEET_INCLUDE_DEFAULT = os.getenv("PYDM_STYLESHEET_INCLUDE_DEFAULT", False)
+
+# Compiled .ui files are also cached at this directory, if it is set. The
+# cached Python code is executed when the displays are opened again, so the
+# directory must only be writable by the user.
+UI_CACHE_PATH = os.getenv("PYDM_UI_CACHE_PATH") or None
+
+# Maximum number of compiled .ui files kept in memory and on disk.
+UI_CACHE_MEMORY_SIZE = int(os.getenv("PYDM_UI_CACHE_MEMORY_SIZE", 64))
+UI_CACHE_DISK_SIZE = int(os.getenv("PYDM_UI_CACHE_DISK_SIZE", 1024))
+
+ARCHIVER_URL = os.getenv("PYDM_ARCHIVER_URL",
+                         "http://lcls-archapp.slac.stanford.edu")
+
+# Number of requests made in parallel to the archiver and maximum number of
+# archived samples kept in memory.
+ARCHIVER_THREADS = int(os.getenv("PYDM_ARCHIVER_THREADS", 4))
+ARCHIVER_CACHE_SIZE = int(os.getenv("PYDM_ARCHIVER_CACHE_SIZE", 10000000))
+# Seconds it may take for a sample to be retrievable from the archiver.  The
+# samples more recent than that are not cached.
+ARCHIVER_LAG = float(os.getenv("PYDM_ARCHIVER_LAG", 60))
+
+# Maximum number of new values per second delivered to the widgets by each
+# connection. Zero delivers every value as soon as it is received.
+MAX_VALUE_RATE = float(os.getenv("PYDM_MAX_VALUE_RATE", 0))
+
+# File in which the protocols of the data plugin files are recorded, so that
+# each plugin is only imported when its protocol is first used. Set the
+# variable to an empty string to import every plugin at startup.
+DATA_PLUGINS_MANIFEST = os.getenv(
+    "PYDM_DATA_PLUGINS_MANIFEST",
+    os.path.join(os.getenv("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache")),
+                 "pydm", "data_plugins.json"))
+
+# Directory of the rings of frames in shared memory used by the shm:// data
+# plugin, and number of times per second each ring is checked for new frames.
+SHM_PATH = os.getenv("PYDM_SHM_PATH",
+                     "/dev/shm" if os.path.isdir("/dev/shm")
+                     else tempfile.gettempdir())
+SHM_POLL_RATE = float(os.getenv("PYDM_SHM_POLL_RATE", 100))
+
+# Directory of the files in which the time plots keep the history of their
+# curves, number of samples per file, and number of files kept per curve
+# before the oldest ones are removed.
+HISTORY_PATH = os.getenv("PYDM_HISTORY_PATH", tempfile.gettempdir())
+HISTORY_SEGMENT_SIZE = int(os.getenv("PYDM_HISTORY_SEGMENT_SIZE", 1000000))
+HISTORY_SEGMENTS = int(os.getenv("PYDM_HISTORY_SEGMENTS", 8))
@@ -2,59 +2,238 @@
 Loads all the data plugins available at the given PYDM_DATA_PLUGINS_PATH
 environment variable and subfolders that follows the *_plugin.py and have
 classes that inherits from the pydm.data_plugins.PyDMPlugin class.
+
+The protocols of the plugin files are recorded in a manifest, at
+PYDM_DATA_PLUGINS_MANIFEST, so that the plugin files that did not change
+since are only imported when a channel first uses one of their protocols.
 """
 import os
 import sys
+import json
 import inspect
 import logging
 import imp
 import uuid
-from collections import deque
+import tempfile
+import time
+import weakref
+from collections import deque, OrderedDict
 from contextlib import contextmanager
-from qtpy.QtWidgets import QApplication
+from qtpy.QtCore import QObject, QTimer, Signal
+from qtpy.QtWidgets import QApplication, QWidget
 from .plugin import PyDMPlugin
 from ..utilities import protocol_and_address
 from .. import config
+from .. import tracing
 
 logger = logging.getLogger(__name__)
 plugin_modules = {}
+# Plugins recorded in the manifest and not imported yet, protocol -> file.
+lazy_plugins = {}
 __read_only = False
 global __CONNECTION_QUEUE__
 __CONNECTION_QUEUE__ = None
 global __DEFER_CONNECTIONS__
 __DEFER_CONNECTIONS__ = False
+# Number of connection_queue contexts currently open.
+__CONNECTION_QUEUE_DEPTH__ = 0
 
 @contextmanager
 def connection_queue(defer_connections=False):
+    """
+    Queue the connections made inside the context.  The queue is handed to
+    the connection scheduler when the outermost context exits, unless it
+    was opened with ``defer_connections=True``, in which case
+    `establish_queued_connections` must be called once it exited.
+    """
     global __CONNECTION_QUEUE__
     global __DEFER_CONNECTIONS__
+    global __CONNECTION_QUEUE_DEPTH__
     if __CONNECTION_QUEUE__ is None:
         __CONNECTION_QUEUE__ = deque()
         __DEFER_CONNECTIONS__ = defer_connections
-    yield
-    if __DEFER_CONNECTIONS__:
-        return
-    establish_queued_connections()
+    __CONNECTION_QUEUE_DEPTH__ += 1
+    try:
+        yield
+    finally:
+        __CONNECTION_QUEUE_DEPTH__ -= 1
+        if not __DEFER_CONNECTIONS__:
+            establish_queued_connections()
+
+
+class ConnectionScheduler(QObject):
+    """
+    Establishes the queued connections in the background.
+
+    At every pass of the event loop the scheduler connects channels until
+    its time budget is spent, so that the user interface stays responsive
+    while a large display connects.  The channels of visible widgets are
+    connected first.  The channels of each batch are grouped by plugin and
+    handed at once to `PyDMPlugin.add_connections`.
+
+    Signals
+    -------
+    progress : int, int
+        Emitted after every batch with the number of channels connected and
+        the number still pending, since the scheduler last became idle.
+    """
+    progress = Signal(int, int)
+
+    # Seconds spent connecting channels at each pass of the event loop.
+    time_budget = 0.02
+
+    def __init__(self, parent=None):
+        super(ConnectionScheduler, self).__init__(parent)
+        # id(channel) -> weakref to the channel, in connection order.
+        self._pending = OrderedDict()
+        self._needs_sort = False
+        self.established = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.process_batch)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def schedule(self, channels):
+        """
+        Queue channels to be connected in the following passes of the event
+        loop.
+
+        Parameters
+        ----------
+        channels : iterable of PyDMChannel
+        """
+        for channel in channels:
+            # A channel queued again keeps a single entry.
+            self._pending[id(channel)] = weakref.ref(channel)
+        if self._pending:
+            self._needs_sort = True
+            self._timer.start()
+
+    def cancel(self, channel):
+        """
+        Do not connect a queued channel, e.g. because it was disconnected
+        before being connected.
+        """
+        ref = self._pending.get(id(channel))
+        if ref is not None and ref() is channel:
+            del self._pending[id(channel)]
+
+    def process_batch(self):
+        """
+        Connect pending channels until the time budget is spent.
+        """
+        with tracing.trace_span("connect channels"):
+            self._process_batch()
+
+    def _process_batch(self):
+        if self._needs_sort:
+            self._sort_pending()
+        deadline = time.time() + self.time_budget
+        while self._pending and time.time() < deadline:
+            batch = OrderedDict()
+            # Take a few channels at a time to amortize the timing.
+            for _ in range(min(50, len(self._pending))):
+                channel = self._pending.popitem(last=False)[1]()
+                if channel is None:
+                    continue
+                plugin = plugin_for_address(channel.address)
+                if plugin is None:
+                    continue
+                batch.setdefault(plugin, []).append(channel)
+            for plugin, channels in batch.items():
+                self.established += len(channels)
+                plugin.add_connections(channels)
+        if self._pending:
+            self._timer.start()
+        self.progress.emit(self.established, len(self._pending))
+        if not self._pending:
+            self.established = 0
+
+    def flush(self):
+        """
+        Connect all the pending channels now.
+        """
+        self._timer.stop()
+        while self._pending:
+            channel = self._pending.popitem(last=False)[1]()
+            if channel is not None:
+                establish_connection_immediately(channel)
+        self.established = 0
+
+    def _sort_pending(self):
+        # Stable sort, visible widgets first.
+        self._needs_sort = False
+        self._pending = OrderedDict(
+            sorted(self._pending.items(),
+                   key=lambda item: not _is_visible(item[1]())))
+
+
+def _is_visible(channel):
+    if channel is None:
+        return False
+    for slot in (channel.value_slot, channel.connection_slot):
+        widget = getattr(slot, '__self__', None)
+        if isinstance(widget, QWidget):
+            try:
+                return (widget.isVisible() and
+                        not widget.visibleRegion().isEmpty())
+            except RuntimeError:
+                return False
+    return False
 
 
+_scheduler = None
+
+
+def connection_scheduler():
+    """
+    The ConnectionScheduler of the application.
+
+    Returns
+    -------
+    ConnectionScheduler
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ConnectionScheduler()
+    return _scheduler
+
+
+@tracing.traced()
 def establish_queued_connections():
     global __DEFER_CONNECTIONS__
     global __CONNECTION_QUEUE__
-    if __CONNECTION_QUEUE__ is None:
+    if __CONNECTION_QUEUE__ is None or __CONNECTION_QUEUE_DEPTH__ > 0:
+        # The outermost connection_queue context establishes them.
         return
-    try:
-        while (__CONNECTION_QUEUE__ is not None and
-               len(__CONNECTION_QUEUE__) > 0):
-            channel = __CONNECTION_QUEUE__.popleft()
+    queue = __CONNECTION_QUEUE__
+    __CONNECTION_QUEUE__ = None
+    __DEFER_CONNECTIONS__ = False
+    if QApplication.instance() is None:
+        for channel in queue:
             establish_connection_immediately(channel)
-            QApplication.instance().processEvents()
-    except IndexError:
-        pass
-    finally:
-        __CONNECTION_QUEUE__ = None
-        __DEFER_CONNECTIONS__ = False
-    
-        
+        return
+    connection_scheduler().schedule(queue)
+
+
+def cancel_queued_connection(channel):
+    """
+    Remove a channel from the connection queue, if it is still there.
+    """
+    global __CONNECTION_QUEUE__
+    if __CONNECTION_QUEUE__ is not None:
+        try:
+            __CONNECTION_QUEUE__.remove(channel)
+        except ValueError:
+            pass
+    if _scheduler is not None:
+        _scheduler.cancel(channel)
+
+
 def establish_connection(channel):
     global __CONNECTION_QUEUE__
     if __CONNECTION_QUEUE__ is not None:
@@ -81,8 +260,11 @@ def plugin_for_address(address):
         protocol = config.DEFAULT_PROTOCOL
     # Load proper plugin module
     if protocol:
+        protocol = str(protocol)
+        if protocol not in plugin_modules and protocol in lazy_plugins:
+            load_lazy_plugin(protocol)
         try:
-            return plugin_modules[str(protocol)]
+            return plugin_modules[protocol]
         except KeyError as exc:
             logger.exception("Could not find protocol for %r", address)
     # Catch all in case of improper plugin specification
@@ -108,13 +290,152 @@ def add_plugin(plugin):
         logger.warning("Replacing %s plugin with %s for use with protocol %s",
                        plugin, plugin_modules[plugin.protocol],
                        plugin.protocol)
+    lazy_plugins.pop(plugin.protocol, None)
     plugin_modules[plugin.protocol] = plugin()
 
 
-def load_plugins_from_path(locations, token):
+def add_lazy_plugin(protocol, filename):
+    """
+    Register a plugin file for a protocol, to be imported the first time a
+    channel uses the protocol.
+
+    Parameters
+    ----------
+    protocol : str
+    filename : str
+        Path of the plugin file
+    """
+    if protocol in plugin_modules:
+        logger.warning("Replacing %s plugin with %s for use with protocol %s",
+                       plugin_modules[protocol], filename, protocol)
+        del plugin_modules[protocol]
+    lazy_plugins[protocol] = filename
+
+
+def load_lazy_plugin(protocol):
+    """
+    Import the plugin file registered for a protocol with `add_lazy_plugin`.
+    The plugins for the other protocols of the file are loaded as well.
+
+    Parameters
+    ----------
+    protocol : str
+    """
+    filename = lazy_plugins.get(protocol)
+    if filename is None:
+        return
+    for other in [p for p, f in lazy_plugins.items() if f == filename]:
+        del lazy_plugins[other]
+    logger.debug("Loading plugin for protocol %s from %s", protocol, filename)
+    try:
+        with tracing.trace_span("load data plugin", protocol=protocol):
+            load_plugin_file(filename)
+    except Exception as e:
+        logger.exception("Unable to import plugin file %s. "
+                         "The exception raised was: %s", filename, e)
+
+
+def load_plugin_file(filename):
+    """
+    Import a plugin file and add its plugins to the global registry.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the plugin file
+
+    Returns
+    -------
+    plugins: dict
+        Dictionary of plugins added from this file
+    """
+    root = os.path.dirname(filename)
+    if root not in sys.path:
+        sys.path.append(root)
+    temp_name = str(uuid.uuid4())
+    with tracing.trace_span("import data plugin", file=filename):
+        module = imp.load_source(temp_name, filename)
+    classes = [obj for name, obj in inspect.getmembers(module)
+               if (inspect.isclass(obj)
+                   and issubclass(obj, PyDMPlugin)
+                   and obj is not PyDMPlugin)]
+    # De-duplicate classes.
+    classes = list(set(classes))
+    added_plugins = dict()
+    for plugin in classes:
+        if plugin.protocol is not None:
+            # Add to global plugin list
+            add_plugin(plugin)
+            # Add to return dictionary of added plugins
+            added_plugins[plugin.protocol] = plugin
+    return added_plugins
+
+
+MANIFEST_VERSION = 1
+
+
+def read_manifest(manifest):
+    """
+    Read the plugin files recorded in a manifest.
+
+    Parameters
+    ----------
+    manifest : str
+        Path of the manifest file
+
+    Returns
+    -------
+    files: dict
+        Dictionary of file path vs. its modification time, size and
+        protocols.  Empty if the manifest can not be read.
+    """
+    try:
+        with open(manifest) as f:
+            contents = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if (not isinstance(contents, dict)
+            or contents.get('version') != MANIFEST_VERSION):
+        return {}
+    return contents.get('files', {})
+
+
+def write_manifest(manifest, files):
+    """
+    Write the plugin files to a manifest, replacing it atomically.
+
+    Parameters
+    ----------
+    manifest : str
+        Path of the manifest file
+    files : dict
+        Dictionary of file path vs. its modification time, size and
+        protocols.
+    """
+    directory = os.path.dirname(manifest) or '.'
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': files}, f,
+                      indent=1, sort_keys=True)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        os.rename(temp_path, manifest)
+    except (IOError, OSError):
+        logger.debug("Could not write the data plugins manifest %s.",
+                     manifest, exc_info=True)
+
+
+@tracing.traced()
+def load_plugins_from_path(locations, token, manifest=None):
     """
     Load plugins from file locations that match a specific token
 
+    If a manifest is given, the files recorded in it that did not change
+    are not imported.  Their protocols are registered with `add_lazy_plugin`
+    instead.  The other files are imported and recorded in the manifest.
 
     Parameters
     ----------
@@ -125,44 +446,60 @@ def load_plugins_from_path(locations, token):
         Phrase that must match the end of the filename for it to be checked for
         PyDMPlugins
 
+    manifest : str, optional
+        Path of the manifest file.  If None or empty, every file is imported.
+
     Returns
     -------
     plugins: dict
-        Dictionary of plugins add from this folder
+        Dictionary of plugins imported from this folder
     """
     added_plugins = dict()
+    recorded = read_manifest(manifest) if manifest else {}
+    files = dict()
     for loc in locations:
-        for root, _, files in os.walk(loc):
+        for root, _, names in os.walk(loc):
             if root.split(os.path.sep)[-1].startswith("__"):
                 continue
 
             logger.debug("Looking for PyDM Data Plugins at: %s", root)
-            for name in files:
-                if name.endswith(token):
-                    try:
-                        logger.debug("Trying to load %s...", name)
-                        sys.path.append(root)
-                        temp_name = str(uuid.uuid4())
-                        module = imp.load_source(temp_name,
-                                                 os.path.join(root, name))
-                    except Exception as e:
-                        logger.exception("Unable to import plugin file %s."
-                                         "This plugin will be skipped."
-                                         "The exception raised was: %s",
-                                         name, e)
-                        continue
-                    classes = [obj for name, obj in inspect.getmembers(module)
-                               if (inspect.isclass(obj)
-                                   and issubclass(obj, PyDMPlugin)
-                                   and obj is not PyDMPlugin)]
-                    # De-duplicate classes.
-                    classes = list(set(classes))
-                    for plugin in classes:
-                        if plugin.protocol is not None:
-                            # Add to global plugin list
-                            add_plugin(plugin)
-                            # Add to return dictionary of added plugins
-                            added_plugins[plugin.protocol] = plugin
+            for name in names:
+                if not name.endswith(token):
+                    continue
+                filename = os.path.realpath(os.path.join(root, name))
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                entry = recorded.get(filename)
+                if (entry and entry.get('mtime') == stat.st_mtime
+                        and entry.get('size') == stat.st_size):
+                    for protocol in entry.get('protocols', []):
+                        add_lazy_plugin(protocol, filename)
+                    files[filename] = entry
+                    continue
+                try:
+                    logger.debug("Trying to load %s...", name)
+                    plugins = load_plugin_file(filename)
+                except Exception as e:
+                    logger.exception("Unable to import plugin file %s."
+                                     "This plugin will be skipped."
+                                     "The exception raised was: %s",
+                                     name, e)
+                    continue
+                added_plugins.update(plugins)
+                files[filename] = {'mtime': stat.st_mtime,
+                                   'size': stat.st_size,
+                                   'protocols': sorted(plugins)}
+    if manifest:
+        # Keep the files of other locations, e.g. of other applications,
+        # as long as they exist.
+        updated = dict((filename, entry)
+                       for filename, entry in recorded.items()
+                       if os.path.exists(filename))
+        updated.update(files)
+        if updated != recorded:
+            write_manifest(manifest, updated)
     return added_plugins
 
 
@@ -208,4 +545,5 @@ else:
 plugin_dir = os.path.dirname(os.path.realpath(__file__))
 locations.insert(0, plugin_dir)
 
-load_plugins_from_path(locations, DATA_PLUGIN_TOKEN)
+load_plugins_from_path(locations, DATA_PLUGIN_TOKEN,
+                       manifest=config.DATA_PLUGINS_MANIFEST)
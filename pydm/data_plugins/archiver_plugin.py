@@ -1,7 +1,510 @@
-from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
-import requests
+"""
+Data plugin for the EPICS Archiver Appliance.
+
+The address of a channel is the query string of the getData.json retrieval
+request, e.g. ``archiver://pv=ROOM:TEMP&from=2019-01-01T00:00:00.000Z&to=...``,
+where ``from`` and ``to`` may be ISO 8601 dates or seconds since the epoch.
+If ``to`` is omitted the current time is used, and if ``from`` is omitted the
+last hour is retrieved.
+
+Requests are made by a pool of worker threads, so the GUI never waits for the
+archiver.  The response is decoded into NumPy arrays as it is received, and
+the retrieved time ranges are cached so that requesting an overlapping range
+only fetches the missing parts.  The archiver stores the samples with a
+delay, so the last PYDM_ARCHIVER_LAG seconds are never cached, and are
+fetched again by the following requests.
+"""
+import re
+import json
+import time
+import codecs
+import logging
+import calendar
+import datetime
+import itertools
+from collections import OrderedDict
+
 import numpy as np
-import os
+import requests
+from six.moves.urllib.parse import parse_qs, urlencode
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm import config
+
+logger = logging.getLogger(__name__)
+
+_ISO_TIME = re.compile(r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d)(?::(\d\d)(\.\d*)?)?'
+                       r'\s*(Z|[+-]\d\d:?\d\d)?$')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def parse_time(text):
+    """
+    Convert a time given as seconds since the epoch or as an ISO 8601 date
+    into seconds since the epoch.
+
+    Parameters
+    ----------
+    text : str or float
+
+    Returns
+    -------
+    float
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _ISO_TIME.match(text.strip())
+    if match is None:
+        raise ValueError("Invalid time: {}".format(text))
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    secs = calendar.timegm((int(year), int(month), int(day), int(hour),
+                            int(minute), int(second or 0)))
+    if fraction and len(fraction) > 1:
+        secs += float(fraction)
+    if zone and zone != 'Z':
+        zone = zone.replace(':', '')
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        secs -= offset if zone[0] == '+' else -offset
+    return secs
+
+
+def format_time(secs):
+    """
+    Convert seconds since the epoch into the ISO 8601 format used by the
+    Archiver Appliance.
+
+    Parameters
+    ----------
+    secs : float
+
+    Returns
+    -------
+    str
+    """
+    whole = int(secs // 1)
+    millis = int(round((secs - whole) * 1000))
+    if millis == 1000:
+        whole, millis = whole + 1, 0
+    date = datetime.datetime.utcfromtimestamp(whole)
+    return "{}.{:03d}Z".format(date.strftime("%Y-%m-%dT%H:%M:%S"), millis)
+
+
+def parse_address(address):
+    """
+    Extract the PV name and time range from a channel address.
+
+    Parameters
+    ----------
+    address : str
+        The query string of the retrieval request, without the protocol.
+
+    Returns
+    -------
+    tuple (str, float, float)
+        The PV name and the start and end of the time range.
+    """
+    params = parse_qs(address)
+    try:
+        pv = params['pv'][0]
+    except (KeyError, IndexError):
+        raise ValueError("No PV specified in archiver address {}."
+                         "".format(address))
+    end = parse_time(params['to'][0]) if 'to' in params else time.time()
+    start = (parse_time(params['from'][0]) if 'from' in params
+             else end - 3600)
+    return pv, start, end
+
+
+class ArchiveStreamDecoder(object):
+    """
+    Incremental decoder for the JSON returned by the getData.json request.
+
+    Text is fed in chunks as it arrives from the network.  The samples found
+    are converted into NumPy arrays every ``chunk_points`` samples, so the
+    whole response is never held as Python objects.
+
+    Parameters
+    ----------
+    chunk_points : int, optional
+        Number of samples converted into arrays at once.
+    """
+    def __init__(self, chunk_points=4096):
+        self.chunk_points = chunk_points
+        self._decoder = json.JSONDecoder()
+        self._buffer = u""
+        self._pos = 0
+        self._in_data = False
+        self.done = False
+        self._times = []
+        self._values = []
+        self._time_chunks = []
+        self._value_chunks = []
+
+    def feed(self, text):
+        """
+        Decode the samples contained in a new chunk of text.
+
+        Parameters
+        ----------
+        text : str
+        """
+        if self.done or not text:
+            return
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        if not self._in_data:
+            key = self._buffer.find('"data"')
+            if key < 0:
+                return
+            start = self._buffer.find('[', key)
+            if start < 0:
+                return
+            self._pos = start + 1
+            self._in_data = True
+
+        buf = self._buffer
+        while True:
+            pos = _SEPARATORS.match(buf, self._pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == ']':
+                self.done = True
+                break
+            try:
+                sample, pos = self._decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Incomplete sample, wait for more text.
+                break
+            self._pos = pos
+            self._times.append(sample['secs'] + sample.get('nanos', 0) * 1e-9)
+            self._values.append(sample['val'])
+            if len(self._times) >= self.chunk_points:
+                self._flush()
+
+    def _flush(self):
+        if self._times:
+            self._time_chunks.append(np.array(self._times, dtype=float))
+            self._value_chunks.append(np.array(self._values))
+            self._times = []
+            self._values = []
+
+    def result(self):
+        """
+        The samples decoded so far.
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+            The timestamps, in seconds since the epoch, and the values.
+        """
+        self._flush()
+        if not self._time_chunks:
+            return np.array([], dtype=float), np.array([])
+        return (np.concatenate(self._time_chunks),
+                np.concatenate(self._value_chunks))
+
+
+def _concatenate(arrays):
+    arrays = [a for a in arrays if len(a)]
+    if not arrays:
+        return np.array([])
+    return np.concatenate(arrays)
+
+
+class ArchiveCache(object):
+    """
+    In-memory cache of the time ranges retrieved from the archiver.
+
+    The samples are kept in segments covering continuous time ranges of one
+    PV.  Overlapping or adjacent segments are merged when inserted.  When the
+    total number of samples exceeds ``max_points``, the least recently used
+    segments are evicted.
+
+    Parameters
+    ----------
+    max_points : int, optional
+        Maximum number of samples kept.
+    """
+    def __init__(self, max_points=10000000):
+        self.max_points = max_points
+        self.points = 0
+        # (pv, start, end) -> (times, values), least recently used first.
+        self._segments = OrderedDict()
+
+    def __len__(self):
+        return len(self._segments)
+
+    def clear(self):
+        self._segments.clear()
+        self.points = 0
+
+    def _pv_segments(self, pv):
+        return sorted(k for k in self._segments if k[0] == pv)
+
+    def missing(self, pv, start, end):
+        """
+        The parts of a time range that are not in the cache.
+
+        Returns
+        -------
+        list of tuple (float, float)
+        """
+        gaps = []
+        cursor = start
+        for _, seg_start, seg_end in self._pv_segments(pv):
+            if seg_end < cursor:
+                continue
+            if seg_start > end or cursor >= end:
+                break
+            if seg_start > cursor:
+                gaps.append((cursor, seg_start))
+            cursor = max(cursor, seg_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def insert(self, pv, start, end, times, values):
+        """
+        Add the samples retrieved for a time range.
+        """
+        inside = (times >= start) & (times <= end)
+        time_pieces, value_pieces = [times[inside]], [values[inside]]
+        for key in self._pv_segments(pv):
+            _, seg_start, seg_end = key
+            if seg_start <= end and seg_end >= start:
+                seg_times, seg_values = self._segments.pop(key)
+                self.points -= len(seg_times)
+                time_pieces.append(seg_times)
+                value_pieces.append(seg_values)
+                start, end = min(start, seg_start), max(end, seg_end)
+        merged_times = _concatenate(time_pieces).astype(float)
+        merged_values = _concatenate(value_pieces)
+        if len(time_pieces) > 1 and len(merged_times):
+            merged_times, unique = np.unique(merged_times, return_index=True)
+            merged_values = merged_values[unique]
+        self._segments[(pv, start, end)] = (merged_times, merged_values)
+        self.points += len(merged_times)
+        while self.points > self.max_points and len(self._segments) > 1:
+            _, (old_times, _) = self._segments.popitem(last=False)
+            self.points -= len(old_times)
+
+    def get(self, pv, start, end):
+        """
+        The cached samples of a PV inside a time range.
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+        """
+        time_pieces, value_pieces = [], []
+        for key in self._pv_segments(pv):
+            _, seg_start, seg_end = key
+            if seg_start > end or seg_end < start:
+                continue
+            seg_times, seg_values = self._segments.pop(key)
+            self._segments[key] = (seg_times, seg_values)
+            inside = (seg_times >= start) & (seg_times <= end)
+            time_pieces.append(seg_times[inside])
+            value_pieces.append(seg_values[inside])
+        return (_concatenate(time_pieces).astype(float),
+                _concatenate(value_pieces))
+
+
+class ArchiveFetch(QRunnable):
+    """
+    Worker retrieving one time range of a PV, executed by the thread pool of
+    the ArchiveRetriever.
+    """
+    def __init__(self, retriever, key, url):
+        super(ArchiveFetch, self).__init__()
+        self.retriever = retriever
+        self.key = key
+        self.url = url
+
+    def run(self):
+        try:
+            r = requests.get(self.url, stream=True,
+                             timeout=self.retriever.timeout)
+            content_type = r.headers.get('content-type', '')
+            if r.status_code != 200 or 'application/json' not in content_type:
+                raise IOError("Archiver answered with status {} and content "
+                              "type {}.".format(r.status_code, content_type))
+            decoder = ArchiveStreamDecoder()
+            text_decoder = codecs.getincrementaldecoder('utf-8')()
+            for chunk in r.iter_content(chunk_size=64 * 1024):
+                decoder.feed(text_decoder.decode(chunk))
+            decoder.feed(text_decoder.decode(b"", final=True))
+            times, values = decoder.result()
+        except Exception as ex:
+            logger.debug("Archiver request %s failed.", self.url,
+                         exc_info=True)
+            self.retriever.failed.emit(self.key, str(ex))
+        else:
+            self.retriever.fetched.emit(self.key, times, values)
+
+
+class ArchiveRetriever(QObject):
+    """
+    Retrieves archived data without blocking the GUI thread.
+
+    The missing parts of each requested time range are fetched by a pool of
+    worker threads.  The results are put in the cache in the GUI thread, and
+    the callback of a request is called with the requested range once all its
+    parts are available.
+
+    Parameters
+    ----------
+    base_url : str, optional
+    max_threads : int, optional
+    cache_size : int, optional
+        Maximum number of samples kept in the cache.
+    lag : float, optional
+        Seconds it may take for a sample to be retrievable from the
+        archiver.  The samples more recent than that are not cached.
+    """
+    fetched = Signal(object, object, object)
+    failed = Signal(object, str)
+
+    def __init__(self, base_url=None, max_threads=None, cache_size=None,
+                 lag=None, parent=None):
+        super(ArchiveRetriever, self).__init__(parent)
+        self.base_url = base_url or config.ARCHIVER_URL
+        self.timeout = 30
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads or config.ARCHIVER_THREADS)
+        self.cache = ArchiveCache(cache_size or config.ARCHIVER_CACHE_SIZE)
+        self.lag = config.ARCHIVER_LAG if lag is None else lag
+        self.request_count = 0
+        self._ids = itertools.count()
+        # request id -> [pv, start, end, callback, pending fetch keys, error,
+        #                recent samples not cached]
+        self._requests = {}
+        # fetch key -> ids of the requests waiting for it
+        self._fetches = {}
+        self.fetched.connect(self._fetch_done)
+        self.failed.connect(self._fetch_failed)
+
+    def url_for(self, pv, start, end):
+        params = urlencode([('pv', pv), ('from', format_time(start)),
+                            ('to', format_time(end))])
+        return "{base}/retrieval/data/getData.json?{params}".format(
+            base=self.base_url, params=params)
+
+    def retrieve(self, pv, start, end, callback):
+        """
+        Request the samples of a PV in a time range.
+
+        Parameters
+        ----------
+        pv : str
+        start, end : float
+            The time range, in seconds since the epoch.
+        callback : callable
+            Called in the GUI thread with the timestamps and values, or with
+            None and None if the retrieval failed.  If the range is already
+            cached, it is called before this method returns.
+
+        Returns
+        -------
+        int or None
+            An identifier that can be given to `cancel`, or None if the
+            callback was already called.
+        """
+        gaps = self.cache.missing(pv, start, end)
+        if not gaps:
+            callback(*self.cache.get(pv, start, end))
+            return None
+        request_id = next(self._ids)
+        pending = set()
+        self._requests[request_id] = [pv, start, end, callback, pending, None,
+                                      []]
+        for gap_start, gap_end in gaps:
+            key = (pv, gap_start, gap_end)
+            pending.add(key)
+            if key in self._fetches:
+                self._fetches[key].append(request_id)
+                continue
+            self._fetches[key] = [request_id]
+            self.request_count += 1
+            self.pool.start(ArchiveFetch(self, key,
+                                         self.url_for(pv, gap_start, gap_end)))
+        return request_id
+
+    def cancel(self, request_id):
+        """
+        Forget a request.  Its callback will not be called.
+        """
+        self._requests.pop(request_id, None)
+
+    def _fetch_done(self, key, times, values):
+        pv, start, end = key
+        # Samples may still be written to the archiver for the most recent
+        # part of the range: only the part before it is cached.
+        settled = min(end, time.time() - self.lag)
+        if settled > start:
+            self.cache.insert(pv, start, settled, times, values)
+        recent = times > settled
+        self._complete(key, None, (times[recent], values[recent]))
+
+    def _fetch_failed(self, key, message):
+        self._complete(key, message)
+
+    def _complete(self, key, error, recent=None):
+        for request_id in self._fetches.pop(key, []):
+            request = self._requests.get(request_id)
+            if request is None:
+                continue
+            pv, start, end, callback, pending, _, recent_pieces = request
+            pending.discard(key)
+            if error is not None:
+                request[5] = error
+            if recent is not None and len(recent[0]):
+                recent_pieces.append(recent)
+            if pending:
+                continue
+            del self._requests[request_id]
+            try:
+                if request[5] is not None:
+                    logger.error("Unable to retrieve archived data for %s: "
+                                 "%s", pv, request[5])
+                    callback(None, None)
+                else:
+                    callback(*self._samples(pv, start, end, recent_pieces))
+            except RuntimeError:
+                logger.debug("Archiver request receiver was gone.")
+
+
+    def _samples(self, pv, start, end, recent_pieces):
+        # The cached samples of a range and the recent ones fetched for it.
+        times, values = self.cache.get(pv, start, end)
+        if not recent_pieces:
+            return times, values
+        times = _concatenate([times] + [t for t, _ in recent_pieces])
+        values = _concatenate([values] + [v for _, v in recent_pieces])
+        times, unique = np.unique(times.astype(float), return_index=True)
+        values = values[unique]
+        inside = (times >= start) & (times <= end)
+        return times[inside], values[inside]
+
+
+_retriever = None
+
+
+def get_retriever():
+    """
+    The ArchiveRetriever shared by all the archiver connections.
+
+    Returns
+    -------
+    ArchiveRetriever
+    """
+    global _retriever
+    if _retriever is None:
+        _retriever = ArchiveRetriever()
+    return _retriever
 
 
 class Connection(PyDMConnection):
@@ -9,17 +512,51 @@ class Connection(PyDMConnection):
     def __init__(self, channel, address, protocol=None, parent=None):
         super(Connection, self).__init__(channel, address, protocol, parent)
         self.add_listener(channel)
-        base_url = os.getenv("PYDM_ARCHIVER_URL", "http://lcls-archapp.slac.stanford.edu")
-        url_string = "{base}/retrieval/data/getData.json?{params}".format(base=base_url, params=address)
-        r = requests.get(url_string)  # blocking.  BAD!
-        if r.status_code == 200 and r.headers['content-type'] == 'application/json':
+        self.timestamps = None
+        self._request = None
+        try:
+            self.pv, start, end = parse_address(address)
+        except ValueError:
+            logger.exception("Invalid archiver address %s.", address)
+            return
+        self.request_range(start, end)
+
+    def request_range(self, start, end):
+        """
+        Retrieve a new time range for the PV of this connection.  Only the
+        parts of the range that are not cached are requested to the
+        archiver.
+
+        Parameters
+        ----------
+        start, end : float
+            The time range, in seconds since the epoch.
+        """
+        retriever = get_retriever()
+        if self._request is not None:
+            retriever.cancel(self._request)
+            self._request = None
+        self._request = retriever.retrieve(self.pv, start, end,
+                                           self.receive_data)
+
+    def receive_data(self, timestamps, values):
+        self._request = None
+        if timestamps is None:
+            if self.connected:
+                self.connected = False
+                self.connection_state_signal.emit(False)
+            return
+        if not self.connected:
             self.connected = True
             self.connection_state_signal.emit(True)
-            data_dict = r.json()
-            # x_data not used so commented out... maybe return it with y_data?
-            # x_data = np.array([point["secs"] for point in data_dict[0]["data"]])
-            y_data = np.array([point["val"] for point in data_dict[0]["data"]])
-            self.new_waveform_signal.emit(y_data)
+        self.timestamps = timestamps
+        self.value = values
+        self.new_value_signal[np.ndarray].emit(values)
+
+    def close(self):
+        if self._request is not None:
+            get_retriever().cancel(self._request)
+            self._request = None
 
 
 class ArchiverPlugin(PyDMPlugin):
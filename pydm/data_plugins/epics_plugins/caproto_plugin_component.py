@@ -1,5 +1,6 @@
 import caproto.threading.pyepics_compat as epics
 from caproto import SubscriptionType
+import time
 import logging
 import numpy as np
 from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
@@ -19,6 +20,12 @@ float_types = set((epics.ChannelType.CTRL_FLOAT, epics.ChannelType.FLOAT, epics.
 
 
 class Connection(PyDMConnection):
+    # The values are monitored in the time form, so that the numeric values
+    # are also sent with the timestamps given by Channel Access.  The
+    # metadata comes from a monitor of the control form limited to the
+    # property changes, whose first event gives the metadata on connection,
+    # so that every value is only sent once by the IOC.
+    source_timestamps = True
 
     def __init__(self, channel, pv, protocol=None, parent=None):
         super(Connection, self).__init__(channel, pv, protocol, parent)
@@ -31,8 +38,10 @@ class Connection(PyDMConnection):
         self._upper_ctrl_limit = None
         self._lower_ctrl_limit = None
 
-        self.pv = epics.get_pv(pv, connection_callback=self.send_connection_state, form='ctrl', auto_monitor=SubscriptionType.DBE_VALUE|SubscriptionType.DBE_ALARM|SubscriptionType.DBE_PROPERTY, access_callback=self.send_access_state)
-        self.pv.add_callback(self.send_new_value, with_ctrlvars=True)
+        self.pv = epics.get_pv(pv, connection_callback=self.send_connection_state, form='ctrl', auto_monitor=SubscriptionType.DBE_PROPERTY, access_callback=self.send_access_state)
+        self.pv.add_callback(self.send_ctrl_vars, with_ctrlvars=True)
+        self.time_pv = epics.get_pv(pv, form='time', auto_monitor=SubscriptionType.DBE_VALUE|SubscriptionType.DBE_ALARM)
+        self.time_pv.add_callback(self.send_new_value)
         self.add_listener(channel)
 
     def clear_cache(self):
@@ -45,10 +54,13 @@ class Connection(PyDMConnection):
         self._lower_ctrl_limit = None
 
     def send_new_value(self, value=None, char_value=None, count=None, typefull=None, type=None, *args, **kws):
+        # Called by the monitor of the time form, which also gives the
+        # severity.
         self.update_ctrl_vars(**kws)
 
         if value is not None and not np.array_equal(value, self._value):
             self._value = value
+            self.send_new_sample(value, typefull, **kws)
             if isinstance(value, np.ndarray):
                 self.new_value_signal[np.ndarray].emit(value)
             else:
@@ -65,6 +77,22 @@ class Connection(PyDMConnection):
                 else:
                     self.new_value_signal[str].emit(char_value)
 
+    def send_new_sample(self, value=None, typefull=None, timestamp=None, *args, **kws):
+        if isinstance(value, np.ndarray) or value is None:
+            return
+        if typefull not in int_types and typefull not in float_types:
+            return
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return
+        self.send_sample(timestamp or time.time(), value)
+
+    def send_ctrl_vars(self, severity=None, *args, **kws):
+        # Called by the monitor of the property changes.  The severity comes
+        # with the values.
+        self.update_ctrl_vars(**kws)
+
     def update_ctrl_vars(self, units=None, enum_strs=None, severity=None, upper_ctrl_limit=None, lower_ctrl_limit=None, precision=None, *args, **kws):
         if severity is not None and self._severity != severity:
             self._severity = severity
@@ -109,9 +137,10 @@ class Connection(PyDMConnection):
         self.connection_state_signal.emit(conn)
         if conn:
             self.clear_cache()
-            if hasattr(self, 'pv'):
+            if hasattr(self, 'time_pv'):
                 self.reload_access_state()
                 self.pv.run_callbacks()
+                self.time_pv.run_callbacks()
 
     @Slot(int)
     @Slot(float)
@@ -134,7 +163,6 @@ class Connection(PyDMConnection):
         # manually send the signals indicating that the PV is connected, what the latest value is, etc.
         if self.pv.connected:
             self.send_connection_state(conn=True)
-            self.pv.run_callbacks()
         else:
             self.send_connection_state(conn=False)
         # If the channel is used for writing to PVs, hook it up to the 'put' methods.
@@ -158,6 +186,7 @@ class Connection(PyDMConnection):
 
     def close(self):
         self.pv.disconnect()
+        self.time_pv.disconnect()
 
 
 class CaprotoPlugin(PyDMPlugin):
@@ -166,3 +195,15 @@ class CaprotoPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def add_connections(self, channels):
+        # Search for all the new PVs in one batch.  The PVs created for each
+        # connection afterwards are then found in the context cache.
+        addresses = self.new_addresses(channels)
+        if len(addresses) > 1:
+            try:
+                epics.PV.default_context().get_pvs(*addresses)
+            except Exception:
+                logger.debug("Unable to search for %d PVs at once.",
+                             len(addresses), exc_info=True)
+        super(CaprotoPlugin, self).add_connections(channels)
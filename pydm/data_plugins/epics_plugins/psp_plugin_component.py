@@ -479,3 +479,14 @@ class PSPPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def add_connections(self, channels):
+        """
+        Create the connections of many channels, sending the searches for
+        all their PVs in a single flush.
+
+        :param channels: The channels to connect.
+        :type channels:  list of :class:`PyDMChannel`
+        """
+        super(PSPPlugin, self).add_connections(channels)
+        pyca.flush_io()
@@ -1,4 +1,5 @@
 import epics
+import time
 import logging
 import numpy as np
 from pydm.data_plugins import is_read_only
@@ -25,14 +26,23 @@ float_types = set((epics.dbr.CTRL_FLOAT, epics.dbr.FLOAT, epics.dbr.TIME_FLOAT,
 
 
 class Connection(PyDMConnection):
+    # The values are monitored in the time form, so that the numeric values
+    # are also sent with the timestamps given by Channel Access.  The
+    # metadata comes from a monitor of the control form limited to the
+    # property changes, whose first event gives the metadata on connection,
+    # so that every value is only sent once by the IOC.
+    source_timestamps = True
 
     def __init__(self, channel, pv, protocol=None, parent=None):
         super(Connection, self).__init__(channel, pv, protocol, parent)
         self.app = QApplication.instance()
         self.pv = epics.PV(pv, connection_callback=self.send_connection_state,
-                           form='ctrl', auto_monitor=epics.dbr.DBE_VALUE|epics.dbr.DBE_ALARM|epics.dbr.DBE_PROPERTY,
+                           form='ctrl', auto_monitor=epics.dbr.DBE_PROPERTY,
                            access_callback=self.send_access_state)
-        self.pv.add_callback(self.send_new_value, with_ctrlvars=True)
+        self.pv.add_callback(self.send_ctrl_vars, with_ctrlvars=True)
+        self.time_pv = epics.PV(pv, form='time',
+                                auto_monitor=epics.dbr.DBE_VALUE|epics.dbr.DBE_ALARM,
+                                callback=self.send_new_value)
         self.add_listener(channel)
 
         self._value = None
@@ -53,10 +63,13 @@ class Connection(PyDMConnection):
         self._lower_ctrl_limit = None
 
     def send_new_value(self, value=None, char_value=None, count=None, ftype=None, *args, **kws):
+        # Called by the monitor of the time form, which also gives the
+        # severity.
         self.update_ctrl_vars(**kws)
 
         if value is not None and not np.array_equal(value, self._value):
             self._value = value
+            self.send_new_sample(value, ftype, **kws)
             if isinstance(value, np.ndarray):
                 self.new_value_signal[np.ndarray].emit(value)
             else:
@@ -73,6 +86,22 @@ class Connection(PyDMConnection):
                 else:
                     self.new_value_signal[str].emit(char_value)
 
+    def send_new_sample(self, value=None, ftype=None, timestamp=None, *args, **kws):
+        if isinstance(value, np.ndarray) or value is None:
+            return
+        if ftype not in int_types and ftype not in float_types:
+            return
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return
+        self.send_sample(timestamp or time.time(), value)
+
+    def send_ctrl_vars(self, severity=None, *args, **kws):
+        # Called by the monitor of the property changes.  The severity comes
+        # with the values.
+        self.update_ctrl_vars(**kws)
+
     def update_ctrl_vars(self, units=None, enum_strs=None, severity=None, upper_ctrl_limit=None, lower_ctrl_limit=None, precision=None, *args, **kws):
         if severity is not None and self._severity != severity:
             self._severity = severity
@@ -117,9 +146,10 @@ class Connection(PyDMConnection):
         self.connection_state_signal.emit(conn)
         if conn:
             self.clear_cache()
-            if hasattr(self, 'pv'):
+            if hasattr(self, 'time_pv'):
                 self.reload_access_state()
                 self.pv.run_callbacks()
+                self.time_pv.run_callbacks()
 
     @Slot(int)
     @Slot(float)
@@ -142,7 +172,6 @@ class Connection(PyDMConnection):
         # manually send the signals indicating that the PV is connected, what the latest value is, etc.
         if epics.ca.isConnected(self.pv.chid):
             self.send_connection_state(conn=True)
-            self.pv.run_callbacks()
         else:
             self.send_connection_state(conn=False)
         # If the channel is used for writing to PVs, hook it up to the 'put' methods.
@@ -170,6 +199,8 @@ class Connection(PyDMConnection):
             self.pv.access_callbacks = []
             self.pv.connection_callbacks = []
             self.pv.disconnect()
+            self.time_pv.clear_callbacks()
+            self.time_pv.disconnect()
         except KeyError:
             # The PV was no longer availbale.
             pass
@@ -181,3 +212,9 @@ class PyEPICSPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def add_connections(self, channels):
+        # Create every channel first, then send all the searches at once
+        # instead of waiting for the library to flush them.
+        super(PyEPICSPlugin, self).add_connections(channels)
+        epics.ca.flush_io()
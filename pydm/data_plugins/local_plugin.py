@@ -7,6 +7,7 @@ import numpy as np
 from qtpy.QtWidgets import QWidget
 from qtpy.QtCore import Slot, Qt, QCoreApplication, QTimer
 from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm.data_plugins import lazy_plugins
 
 
 class LocalPlugin(PyDMPlugin):
@@ -54,7 +55,8 @@ class LocalPlugin(PyDMPlugin):
         """
         super(LocalPlugin, self).__init__()
         app = QCoreApplication.instance()
-        standard_protocol = app.plugins.keys()
+        standard_protocol = list(app.plugins.keys())
+        standard_protocol.extend(lazy_plugins.keys())
         if protocol in standard_protocol:
             err = "Protocol {} invalid, same as a standard protocol"
             raise Exception(err.format(protocol))
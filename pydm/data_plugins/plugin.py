@@ -1,15 +1,109 @@
+import time
+import logging
 import weakref
 import threading
+import functools
+from collections import deque, OrderedDict
 
+import numpy as np
 from numpy import ndarray
 
 from ..utilities.remove_protocol import protocol_and_address
-from qtpy.QtCore import Signal, QObject, Qt
+from .. import config
+from qtpy.QtCore import Signal, QObject, Qt, QTimer
 from qtpy.QtWidgets import QApplication
 
+VALUE_TYPES = (int, float, str, ndarray)
+# Types of the values also delivered to the listeners of batches of samples.
+SAMPLE_TYPES = (int, float)
+
+# Signals of the connection and the channel slots they are delivered to.
+METADATA_SIGNALS = (('connection_state_signal', 'connection_slot'),
+                    ('new_severity_signal', 'severity_slot'),
+                    ('write_access_signal', 'write_access_slot'),
+                    ('enum_strings_signal', 'enum_strings_slot'),
+                    ('unit_signal', 'unit_slot'),
+                    ('prec_signal', 'prec_slot'),
+                    ('upper_ctrl_limit_signal', 'upper_ctrl_limit_slot'),
+                    ('lower_ctrl_limit_signal', 'lower_ctrl_limit_slot'))
+
+logger = logging.getLogger(__name__)
+
+
+class _TypeProbe(QObject):
+    signal = Signal([float], [int], [str], [ndarray])
+
+
+_accepted_types_cache = {}
+
+
+def accepted_value_types(slot):
+    """
+    The types of new_value_signal that a value slot accepts.  Slots decorated
+    with the Slot decorator only accept the types they declare, as they would
+    if they were connected to the signal.
+
+    Parameters
+    ----------
+    slot : callable
+
+    Returns
+    -------
+    tuple
+    """
+    func = getattr(slot, '__func__', slot)
+    if not hasattr(func, '__pyqtSignature__'):
+        return VALUE_TYPES
+    try:
+        return _accepted_types_cache[func]
+    except (KeyError, TypeError):
+        pass
+    probe = _TypeProbe()
+    accepted = []
+    for value_type in VALUE_TYPES:
+        try:
+            probe.signal[value_type].connect(slot)
+        except TypeError:
+            continue
+        probe.signal[value_type].disconnect(slot)
+        accepted.append(value_type)
+    accepted = tuple(accepted)
+    try:
+        _accepted_types_cache[func] = accepted
+    except TypeError:
+        pass
+    return accepted
+
 
 class PyDMConnection(QObject):
+    """
+    Base class for the connections of the data plugins.
+
+    Plugins publish new values and metadata by emitting the signals of the
+    connection.  Each signal is delivered once to the GUI thread, where the
+    connection calls the corresponding slot of every listening channel.  The
+    channels are held by weak references and are forgotten when they are
+    garbage collected.
+
+    By default every value is delivered as soon as it is received.  For
+    high-rate channels, `set_coalescing` enables a mode in which the values
+    are delivered to the listeners at most ``max_rate`` times per second:
+    either only the latest value, or every sample received since the last
+    delivery in a single pass of the event loop.  Channels created with
+    ``deliver_all=True``, e.g. the ones of the plot curves, always receive
+    every sample.
+
+    Numeric values are also delivered as batches of samples, i.e. arrays of
+    timestamps and values, to the channels with a ``values_slot``, which then
+    receive them in one call instead of one call to their ``value_slot`` per
+    value.  Plugins which know the time at which the values were produced,
+    e.g. Channel Access timestamps, publish them with `send_sample` or emit
+    ``new_values_signal``, and set `source_timestamps`.  For the other
+    plugins, the values are stamped with the time they are received.
+    """
     new_value_signal = Signal([float], [int], [str], [ndarray])
+    new_values_signal = Signal(ndarray, ndarray)
+    _flush_requested = Signal()
     connection_state_signal = Signal(bool)
     new_severity_signal = Signal(int)
     write_access_signal = Signal(bool)
@@ -19,6 +113,10 @@ class PyDMConnection(QObject):
     upper_ctrl_limit_signal = Signal([float], [int])
     lower_ctrl_limit_signal = Signal([float], [int])
 
+    # Whether the plugin emits new_values_signal, with the timestamps of the
+    # source, for the numeric values it emits on new_value_signal.
+    source_timestamps = False
+
     def __init__(self, channel, address, protocol=None, parent=None):
         super(PyDMConnection, self).__init__(parent)
         self.protocol = protocol
@@ -27,119 +125,289 @@ class PyDMConnection(QObject):
         self.value = None
         self.listener_count = 0
         self.app = QApplication.instance()
+        self.max_rate = 0
+        self.deliver_all = False
+        # The listeners which need every value, whatever deliver_all is.
+        self._deliver_all_listeners = set()
+        self.received_count = 0
+        self.delivered_count = 0
+        self._pending = deque()
+        self._pending_samples = deque()
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_delivery = 0
+        self._last_sample_time = 0
+
+        # Dispatch table: slot name -> id(channel) -> weakref to the channel.
+        # The value slots also record the value types they accept.
+        self._listeners = {slot: OrderedDict()
+                           for _, slot in METADATA_SIGNALS}
+        self._listeners['value_slot'] = OrderedDict()
+        self._listeners['values_slot'] = OrderedDict()
+        self._snapshots = {}
+        # id(channel) -> weakref to the channel, for every listener counted.
+        self._listener_refs = {}
+
+        for signal_name, slot_name in METADATA_SIGNALS:
+            getattr(self, signal_name).connect(
+                functools.partial(self._dispatch, slot_name),
+                Qt.QueuedConnection)
+        self._dispatchers = [(value_type,
+                              functools.partial(self._dispatch_value, value_type))
+                             for value_type in VALUE_TYPES]
+        self._forwarders = [(value_type,
+                             functools.partial(self._receive_value, value_type))
+                            for value_type in VALUE_TYPES]
+        self._dispatchers.append((None, self._dispatch_samples))
+        self._forwarders.append((None, self._receive_samples))
+        self._wire_values(coalescing=False, connect=True)
+        self._flush_requested.connect(self._schedule_flush, Qt.QueuedConnection)
+        if config.MAX_VALUE_RATE > 0:
+            self.set_coalescing(config.MAX_VALUE_RATE)
+
+    def _wire_values(self, coalescing, connect):
+        if coalescing:
+            # Values are intercepted in the emitting thread and delivered
+            # later, by _flush.
+            wiring, connection_type = self._forwarders, Qt.DirectConnection
+        else:
+            wiring, connection_type = self._dispatchers, Qt.QueuedConnection
+        for value_type, receiver in wiring:
+            if value_type is None:
+                signal = self.new_values_signal
+            else:
+                signal = self.new_value_signal[value_type]
+            if connect:
+                signal.connect(receiver, connection_type)
+            else:
+                signal.disconnect(receiver)
+
+    def set_coalescing(self, max_rate, deliver_all=False):
+        """
+        Limit the rate at which new values are delivered to the listeners.
+
+        Parameters
+        ----------
+        max_rate : float
+            Maximum number of deliveries per second.  Zero or None disables
+            the coalescing, so that every value is posted to the listeners as
+            soon as it is received.
+        deliver_all : bool, optional
+            If False, only the latest value received since the previous
+            delivery is delivered.  If True, every value received since the
+            previous delivery is delivered, in order, which is useful for
+            plots that need every sample.  The batches of samples are
+            coalesced the same way.  Every value is delivered anyway while
+            a channel created with ``deliver_all=True`` is listening.
+        """
+        was_coalescing = self.max_rate > 0
+        self.max_rate = max(max_rate or 0, 0)
+        self.deliver_all = deliver_all
+        if (self.max_rate > 0) == was_coalescing:
+            return
+        self._wire_values(coalescing=was_coalescing, connect=False)
+        if was_coalescing:
+            # Deliver what is left before listening to the plugin directly.
+            self._flush()
+        self._wire_values(coalescing=not was_coalescing, connect=True)
+
+    def reset_statistics(self):
+        """
+        Reset the counters of values received and delivered.
+        """
+        self.received_count = 0
+        self.delivered_count = 0
+
+    def send_sample(self, timestamp, value):
+        """
+        Publish the timestamp of a numeric value to the listeners of batches
+        of samples, if there are any.  This is called by the plugins which
+        set `source_timestamps`, along with emitting the value on
+        ``new_value_signal``.  Values older than the last one published,
+        e.g. cached values sent again to a new listener, are given the
+        timestamp of the last one, so that the samples stay in time order.
+
+        Parameters
+        ----------
+        timestamp : float
+            The time at which the value was produced, in seconds since the
+            epoch.
+        value : int or float
+        """
+        timestamp = max(timestamp, self._last_sample_time)
+        self._last_sample_time = timestamp
+        if self._listeners['values_slot']:
+            self.new_values_signal.emit(np.array([timestamp], dtype=float),
+                                        np.array([value], dtype=float))
+
+    def _receive_value(self, value_type, value):
+        # Called in the thread emitting new_value_signal.
+        with self._pending_lock:
+            self.received_count += 1
+            if not (self.deliver_all or self._deliver_all_listeners):
+                self._pending.clear()
+            self._pending.append((value_type, value, time.time()))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._flush_requested.emit()
+
+    def _receive_samples(self, timestamps, values):
+        # Called in the thread emitting new_values_signal.
+        with self._pending_lock:
+            if not (self.deliver_all or self._deliver_all_listeners):
+                self._pending_samples.clear()
+                timestamps, values = timestamps[-1:], values[-1:]
+            self._pending_samples.append((timestamps, values))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._flush_requested.emit()
+
+    def _schedule_flush(self):
+        delay = 0
+        if self.max_rate > 0:
+            delay = self._last_delivery + 1.0 / self.max_rate - time.time()
+        QTimer.singleShot(max(int(delay * 1000), 0), self._flush)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending = self._pending
+            pending_samples = self._pending_samples
+            self._pending = deque()
+            self._pending_samples = deque()
+            self._flush_scheduled = False
+        self._last_delivery = time.time()
+        for value_type, value, _ in pending:
+            self._fan_out_value(value_type, value)
+        if not self.source_timestamps:
+            # The numeric values, stamped when they were received.
+            pending_samples = [(timestamp, value)
+                               for value_type, value, timestamp in pending
+                               if value_type in SAMPLE_TYPES]
+            if pending_samples:
+                pending_samples = [np.array(pending_samples, dtype=float).T]
+        if pending_samples and self._listeners['values_slot']:
+            self._fan_out_samples(
+                np.concatenate([sample[0] for sample in pending_samples]),
+                np.concatenate([sample[1] for sample in pending_samples]))
+
+    def _dispatch_value(self, value_type, value):
+        self.received_count += 1
+        self._fan_out_value(value_type, value)
+        if (not self.source_timestamps and value_type in SAMPLE_TYPES and
+                self._listeners['values_slot']):
+            self._fan_out_samples(np.array([time.time()]),
+                                  np.array([value], dtype=float))
+
+    def _dispatch_samples(self, timestamps, values):
+        if self.source_timestamps:
+            self._fan_out_samples(timestamps, values)
+
+    def _fan_out_samples(self, timestamps, values):
+        dead = []
+        for key, channel_ref in self._snapshot('values_slot'):
+            channel = channel_ref()
+            if channel is None:
+                dead.append(key)
+                continue
+            self._call(channel.values_slot, timestamps, values)
+        if dead:
+            self._forget('values_slot', dead)
+
+    def _fan_out_value(self, value_type, value):
+        self.delivered_count += 1
+        dead = []
+        for key, channel_ref, types in self._snapshot('value_slot'):
+            if value_type not in types:
+                continue
+            channel = channel_ref()
+            if channel is None:
+                dead.append(key)
+                continue
+            self._call(channel.value_slot, value)
+        if dead:
+            self._forget('value_slot', dead)
+
+    def _dispatch(self, slot_name, value):
+        dead = []
+        for key, channel_ref in self._snapshot(slot_name):
+            channel = channel_ref()
+            if channel is None:
+                dead.append(key)
+                continue
+            self._call(getattr(channel, slot_name), value)
+        if dead:
+            self._forget(slot_name, dead)
+
+    @staticmethod
+    def _call(slot, *args):
+        if slot is None:
+            return
+        try:
+            slot(*args)
+        except RuntimeError:
+            # The widget owning the slot was deleted.
+            logger.debug("Listener of %r was gone.", slot)
+        except Exception:
+            logger.exception("Error while delivering %r to %r.", args, slot)
+
+    def _snapshot(self, slot_name):
+        # Listeners are iterated over a snapshot, so that slots can add or
+        # remove listeners.  The snapshot is only rebuilt after a change.
+        snapshot = self._snapshots.get(slot_name)
+        if snapshot is None:
+            table = self._listeners[slot_name]
+            if slot_name == 'value_slot':
+                snapshot = tuple((key, ref, types)
+                                 for key, (ref, types) in table.items())
+            else:
+                snapshot = tuple(table.items())
+            self._snapshots[slot_name] = snapshot
+        return snapshot
+
+    def _forget(self, slot_name, keys):
+        table = self._listeners[slot_name]
+        for key in keys:
+            table.pop(key, None)
+        self._snapshots.pop(slot_name, None)
 
     def add_listener(self, channel):
+        key = id(channel)
+        known = self._listener_refs.get(key)
+        if known is not None and known() is channel:
+            # Already listening, e.g. connected twice from a queue.
+            return
         self.listener_count = self.listener_count + 1
-        if channel.connection_slot is not None:
-            self.connection_state_signal.connect(channel.connection_slot, Qt.QueuedConnection)
-
-        if channel.value_slot is not None:
-            try:
-                self.new_value_signal[int].connect(channel.value_slot, Qt.QueuedConnection)
-            except TypeError:
-                pass
-            try:
-                self.new_value_signal[float].connect(channel.value_slot, Qt.QueuedConnection)
-            except TypeError:
-                pass
-            try:
-                self.new_value_signal[str].connect(channel.value_slot, Qt.QueuedConnection)
-            except TypeError:
-                pass
-            try:
-                self.new_value_signal[ndarray].connect(channel.value_slot, Qt.QueuedConnection)
-            except TypeError:
-                pass
-
-        if channel.severity_slot is not None:
-            self.new_severity_signal.connect(channel.severity_slot, Qt.QueuedConnection)
-
-        if channel.write_access_slot is not None:
-            self.write_access_signal.connect(channel.write_access_slot, Qt.QueuedConnection)
-
-        if channel.enum_strings_slot is not None:
-            self.enum_strings_signal.connect(channel.enum_strings_slot, Qt.QueuedConnection)
-
-        if channel.unit_slot is not None:
-            self.unit_signal.connect(channel.unit_slot, Qt.QueuedConnection)
-
-        if channel.upper_ctrl_limit_slot is not None:
-            self.upper_ctrl_limit_signal.connect(channel.upper_ctrl_limit_slot, Qt.QueuedConnection)
-
-        if channel.lower_ctrl_limit_slot is not None:
-            self.lower_ctrl_limit_signal.connect(channel.lower_ctrl_limit_slot, Qt.QueuedConnection)
-
-        if channel.prec_slot is not None:
-            self.prec_signal.connect(channel.prec_slot, Qt.QueuedConnection)
+        channel_ref = weakref.ref(channel)
+        self._listener_refs[key] = channel_ref
+        if getattr(channel, 'deliver_all', False):
+            with self._pending_lock:
+                self._deliver_all_listeners.add(key)
+        for slot_name, table in self._listeners.items():
+            slot = getattr(channel, slot_name, None)
+            if slot is None:
+                continue
+            if slot_name == 'value_slot':
+                types = accepted_value_types(slot)
+                if getattr(channel, 'values_slot', None) is not None:
+                    # The numeric values go to the values slot instead.
+                    types = tuple(value_type for value_type in types
+                                  if value_type not in SAMPLE_TYPES)
+                table[key] = (channel_ref, types)
+            else:
+                table[key] = channel_ref
+            self._snapshots.pop(slot_name, None)
 
     def remove_listener(self, channel, destroying=False):
-        if not destroying:
-            if channel.connection_slot is not None:
-                try:
-                    self.connection_state_signal.disconnect(channel.connection_slot)
-                except TypeError:
-                    pass
-
-            if channel.value_slot is not None:
-                try:
-                    self.new_value_signal[int].disconnect(channel.value_slot)
-                except TypeError:
-                    pass
-                try:
-                    self.new_value_signal[float].disconnect(channel.value_slot)
-                except TypeError:
-                    pass
-                try:
-                    self.new_value_signal[str].disconnect(channel.value_slot)
-                except TypeError:
-                    pass
-                try:
-                    self.new_value_signal[ndarray].disconnect(channel.value_slot)
-                except TypeError:
-                    pass
-
-            if channel.severity_slot is not None:
-                try:
-                    self.new_severity_signal.disconnect(channel.severity_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.write_access_slot is not None:
-                try:
-                    self.write_access_signal.disconnect(channel.write_access_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.enum_strings_slot is not None:
-                try:
-                    self.enum_strings_signal.disconnect(channel.enum_strings_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.unit_slot is not None:
-                try:
-                    self.unit_signal.disconnect(channel.unit_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.upper_ctrl_limit_slot is not None:
-                try:
-                    self.upper_ctrl_limit_signal.disconnect(channel.upper_ctrl_limit_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.lower_ctrl_limit_slot is not None:
-                try:
-                    self.lower_ctrl_limit_signal.disconnect(channel.lower_ctrl_limit_slot)
-                except (KeyError, TypeError):
-                    pass
-
-            if channel.prec_slot is not None:
-                try:
-                    self.prec_signal.disconnect(channel.prec_slot)
-                except (KeyError, TypeError):
-                    pass
-
+        key = id(channel)
+        if self._listener_refs.pop(key, None) is None:
+            return
+        with self._pending_lock:
+            self._deliver_all_listeners.discard(key)
+        for slot_name, table in self._listeners.items():
+            if table.pop(key, None) is not None:
+                self._snapshots.pop(slot_name, None)
         self.listener_count = self.listener_count - 1
         if self.listener_count < 1:
             self.close()
@@ -174,6 +442,43 @@ class PyDMPlugin(object):
                 self.connections[address] = self.connection_class(channel, address,
                                                                   self.protocol)
 
+    def add_connections(self, channels):
+        """
+        Connect many channels at once.
+
+        The default implementation calls `add_connection` for each channel.
+        Plugins whose underlying library can resolve many names at once
+        override it to create all the connections first and search for them
+        in a single pass.
+
+        Parameters
+        ----------
+        channels : list of PyDMChannel
+        """
+        for channel in channels:
+            self.add_connection(channel)
+
+    def new_addresses(self, channels):
+        """
+        The addresses of the given channels that do not have a connection
+        yet, in order and without duplicates.
+
+        Parameters
+        ----------
+        channels : list of PyDMChannel
+
+        Returns
+        -------
+        list of str
+        """
+        addresses = []
+        with self.lock:
+            for channel in channels:
+                address = self.get_address(channel)
+                if address not in self.connections and address not in addresses:
+                    addresses.append(address)
+        return addresses
+
     def remove_connection(self, channel, destroying=False):
         with self.lock:
             address = self.get_address(channel)
@@ -0,0 +1,161 @@
+"""
+Data plugin for the rings of frames in shared memory written by local
+producers, such as camera or digitizer acquisition processes running on the
+same host as the display.
+
+The address of a channel is the name of the ring, relative to
+PYDM_SHM_PATH, or its absolute path, e.g. ``shm://camera`` or
+``shm:///dev/shm/camera``.  The rate at which the ring is checked for new
+frames can be given with the ``rate`` option, e.g. ``shm://camera?rate=30``.
+
+The latest frame is delivered as a read-only view of the shared memory, so
+no copy is made.  The view is only valid until the producer wraps around the
+ring and writes over its slot: the ring must have enough slots for the
+listeners to be done with a frame before then.  A frame overwritten before
+it is delivered is dropped, and a warning is logged if a frame is overwritten
+while the listeners are handling it.  With the ``copy`` option, e.g.
+``shm://camera?copy=1``, a copy of each frame is delivered instead, and the
+frames overwritten while copied are dropped.  See
+`pydm.utilities.shared_frames` for the format of the ring and for a reference
+producer.
+"""
+import logging
+
+import numpy as np
+from six.moves.urllib.parse import parse_qs
+from qtpy.QtCore import QTimer
+
+from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm.utilities.shared_frames import SharedFrameReader
+from pydm import config
+
+logger = logging.getLogger(__name__)
+
+
+def parse_address(address):
+    """
+    Extract the name of the ring, the polling rate and whether to copy the
+    frames from a channel address.
+
+    Parameters
+    ----------
+    address : str
+        The address of the channel, without the protocol.
+
+    Returns
+    -------
+    tuple (str, float, bool)
+        The name of the ring, the number of polls per second and whether to
+        deliver copies of the frames.
+    """
+    name, _, query = address.partition('?')
+    if not name:
+        raise ValueError("No ring specified in shm address {}."
+                         "".format(address))
+    params = parse_qs(query)
+    rate = config.SHM_POLL_RATE
+    if 'rate' in params:
+        rate = float(params['rate'][0])
+    if rate <= 0:
+        raise ValueError("Invalid rate in shm address {}.".format(address))
+    copy = False
+    if 'copy' in params:
+        try:
+            copy = bool(int(params['copy'][0]))
+        except ValueError:
+            raise ValueError("Invalid copy option in shm address {}."
+                             "".format(address))
+    return name, rate, copy
+
+
+class Connection(PyDMConnection):
+
+    def __init__(self, channel, address, protocol=None, parent=None):
+        super(Connection, self).__init__(channel, address, protocol, parent)
+        self.reader = None
+        self.copy = False
+        # The reader and the number of the frames delivered as views, by id.
+        self._views = {}
+        self._warned_overwritten = False
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        try:
+            self.name, rate, self.copy = parse_address(address)
+        except ValueError:
+            logger.exception("Invalid shm address %s.", address)
+            self.name = None
+        self.add_listener(channel)
+        if self.name is None:
+            return
+        self.poll()
+        self.timer.start(max(int(1000 / rate), 1))
+
+    def poll(self):
+        """
+        Deliver the latest frame of the ring, if there is a new one.
+        """
+        try:
+            if self.reader is None or self.reader.replaced():
+                self.reader = SharedFrameReader(self.name)
+                logger.debug("Mapped %s, frames of %s %s.", self.reader.path,
+                             self.reader.shape, self.reader.dtype)
+            frame = self.reader.read(copy=self.copy)
+        except (IOError, OSError, ValueError) as ex:
+            if self.connected:
+                logger.debug("Lost the ring of frames %s: %s", self.name, ex)
+            self.reader = None
+            self.set_connected(False)
+            return
+        self.set_connected(True)
+        if frame is not None:
+            self.value = frame
+            if not self.copy:
+                self._forget_overwritten()
+                self._views[id(frame)] = (self.reader,
+                                          self.reader.last_counter)
+            self.new_value_signal[np.ndarray].emit(frame)
+
+    def _forget_overwritten(self):
+        self._views = dict((key, (reader, counter))
+                           for key, (reader, counter) in self._views.items()
+                           if reader is self.reader and reader.valid(counter))
+
+    def _fan_out_value(self, value_type, value):
+        if self.copy:
+            super(Connection, self)._fan_out_value(value_type, value)
+            return
+        reader, counter = self._views.get(id(value), (None, 0))
+        if reader is None or not reader.valid(counter):
+            # The producer wrapped around before the frame was delivered.
+            logger.debug("Dropped an overwritten frame of %s.", self.name)
+            return
+        super(Connection, self)._fan_out_value(value_type, value)
+        if not reader.valid(counter) and not self._warned_overwritten:
+            self._warned_overwritten = True
+            logger.warning("A frame of %s was overwritten while it was "
+                           "handled, use more slots in the ring or the "
+                           "copy option.", self.name)
+
+    def set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.connection_state_signal.emit(connected)
+
+    def add_listener(self, channel):
+        super(Connection, self).add_listener(channel)
+        self.connection_state_signal.emit(self.connected)
+        # The rings are written by their producer only.
+        self.write_access_signal.emit(False)
+        if self.connected and self.value is not None:
+            self.new_value_signal[np.ndarray].emit(self.value)
+
+    def close(self):
+        self.timer.stop()
+        # The mapping is released with the last frame delivered.
+        self.reader = None
+        self._views = {}
+
+
+class SharedMemoryPlugin(PyDMPlugin):
+    protocol = "shm"
+    connection_class = Connection
@@ -1,3 +1,7 @@
+import io
+import re
+import ast
+import time
 import functools
 import imp
 import six
@@ -9,10 +13,13 @@ import uuid
 import warnings
 from os import path
 
-from qtpy import uic
 from qtpy.QtWidgets import QWidget, QApplication
 
-from .utilities import macro, is_pydm_app
+from .utilities import is_pydm_app, macro
+from . import data_plugins
+from . import tracing
+from .utilities.ui_cache import (get_ui_cache, generate_ui_source,
+                                 form_class_from_code)
 from .utilities.stylesheet import merge_widget_stylesheet
 
 
@@ -59,10 +66,14 @@ def load_file(file, macros=None, args=None, target=ScreenTarget.NEW_PROCESS):
         app.new_pydm_process(file, macros=macros, command_line_args=args)
         return None
     else:
-        if file.endswith('.ui'):
-            w = load_ui_file(file, macros=macros)
-        else:
-            w = load_py_file(file, args=args, macros=macros)
+        # The channels are connected in the background once the display is
+        # loaded, visible widgets first.
+        with tracing.trace_span("load_file", file=file), \
+                data_plugins.connection_queue():
+            if file.endswith('.ui'):
+                w = load_ui_file(file, macros=macros)
+            else:
+                w = load_py_file(file, args=args, macros=macros)
 
         if target == ScreenTarget.DIALOG:
             w.show()
@@ -70,9 +81,12 @@ def load_file(file, macros=None, args=None, target=ScreenTarget.NEW_PROCESS):
         return w
 
 
-def _load_ui_into_display(uifile, display):
-    klass, _ = uic.loadUiType(uifile)
+def _load_ui_into_display(uifile, display, macros=None):
+    klass = get_ui_cache().form_class(uifile, macros=macros)
+    _setup_ui_into_display(klass, display)
 
+
+def _setup_ui_into_display(klass, display):
     # Python 2.7 compatibility. More info at the following links:
     # https://github.com/universe-proton/universe-topology/issues/3
     # https://stackoverflow.com/questions/3296993/python-how-to-call-unbound-method-with-other-type-parameter
@@ -81,7 +95,8 @@ def _load_ui_into_display(uifile, display):
 
     # Add retranslateUi to Display class
     display.retranslateUi = functools.partial(retranslateUi, display)
-    setupUi(display, display)
+    with tracing.trace_span("setupUi"):
+        setupUi(display, display)
 
     display.ui = display
 
@@ -105,20 +120,168 @@ def load_ui_file(uifile, macros=None):
     QWidget
     """
 
-    d = Display(macros=macros)
+    with tracing.trace_span("create display"):
+        d = Display(macros=macros)
     merge_widget_stylesheet(d)
 
-    if macros:
-        f = macro.substitute_in_file(uifile, macros)
-    else:
-        f = uifile
-
     d._loaded_file = uifile
-    _load_ui_into_display(f, d)
+    _load_ui_into_display(uifile, d, macros=macros or None)
 
     return d
 
 
+# Matches macro references as understood by string.Template: $name, ${name}
+_MACRO_REFERENCE = re.compile(r'\$(?:([_a-zA-Z][_a-zA-Z0-9]*)|\{([_a-zA-Z][_a-zA-Z0-9]*)\})')
+
+
+def _expand_display_macros(display, text):
+    """
+    Function made available to the code of a UiTemplate to substitute the
+    macros of the display being set up in a string.
+    """
+    macros = getattr(display, 'macros', None)
+    if callable(macros):
+        macros = macros()
+    if not macros:
+        return text
+    return macro.substitute_in_string(text, macros)
+
+
+class _MacroStringTransformer(ast.NodeTransformer):
+    """
+    Wrap every string literal that may reference a macro into a call to
+    ``_expand_display_macros(self, literal)``.
+    """
+    def __init__(self):
+        super(_MacroStringTransformer, self).__init__()
+        self.strings = []
+
+    def _wrap(self, node, value):
+        if not isinstance(value, six.string_types) or '$' not in value:
+            return node
+        self.strings.append(value)
+        call = ast.Call(func=ast.Name(id='_expand_display_macros',
+                                      ctx=ast.Load()),
+                        args=[ast.Name(id='self', ctx=ast.Load()), node],
+                        keywords=[])
+        if six.PY2:
+            call.starargs = None
+            call.kwargs = None
+        return ast.copy_location(call, node)
+
+    def visit_Constant(self, node):
+        return self._wrap(node, node.value)
+
+    def visit_Str(self, node):
+        return self._wrap(node, node.s)
+
+
+class UiTemplate(object):
+    """
+    A .ui file parsed once and instantiated many times with different macros.
+
+    Loading a display with macros substitutes them in the whole file and
+    compiles the result with uic, which is expensive when the same file is
+    loaded over and over with different macros, as the PyDMTemplateRepeater
+    does.  UiTemplate compiles the file once, with the macros left in place,
+    and finds which string properties reference macros.  Each instance then
+    only needs to substitute the macros in those strings.
+
+    If the macros are used in a way this cannot handle (e.g. as part of a
+    numeric property or of a widget name), every instance is loaded with
+    `load_ui_file` instead.
+
+    Parameters
+    ----------
+    uifile : str
+        The path to the .ui file.
+    """
+    def __init__(self, uifile):
+        self.filename = uifile
+        self.macro_names = set()
+        self.instance_count = 0
+        self.instance_time = 0.0
+        start = time.time()
+        self._form_class = None
+        try:
+            self._form_class = self._compile()
+        except Exception:
+            logger.debug("Template %s will be loaded with macro substitution "
+                         "on the whole file.", uifile, exc_info=True)
+        self.compile_time = time.time() - start
+
+    @property
+    def precompiled(self):
+        """
+        Whether or not the template was compiled only once.
+
+        Returns
+        -------
+        bool
+        """
+        return self._form_class is not None
+
+    @property
+    def mean_instance_time(self):
+        """
+        The average time taken to create an instance of the template.
+
+        Returns
+        -------
+        float
+            The time in seconds, or 0 if no instances were created yet.
+        """
+        if self.instance_count == 0:
+            return 0.0
+        return self.instance_time / self.instance_count
+
+    def _compile(self):
+        with io.open(self.filename, encoding='utf-8') as f:
+            text = f.read()
+        source = generate_ui_source(text)
+        if source is None:
+            raise ValueError("No uic code generator available.")
+        tree = ast.parse(source, self.filename)
+        transformer = _MacroStringTransformer()
+        tree = ast.fix_missing_locations(transformer.visit(tree))
+        # Every macro reference must have made it to a string literal,
+        # otherwise it was used somewhere we can't substitute it.
+        if sum(s.count('$') for s in transformer.strings) < text.count('$'):
+            raise ValueError("Macros used outside of string properties.")
+        for string in transformer.strings:
+            for match in _MACRO_REFERENCE.finditer(string):
+                self.macro_names.add(match.group(1) or match.group(2))
+        code = compile(tree, self.filename, 'exec')
+        return form_class_from_code(
+            code, self.filename,
+            namespace={'_expand_display_macros': _expand_display_macros})
+
+    def instantiate(self, macros=None):
+        """
+        Create a new instance of the template.
+
+        Parameters
+        ----------
+        macros : dict, optional
+            The macros to substitute in this instance.
+
+        Returns
+        -------
+        Display
+        """
+        start = time.time()
+        if self._form_class is None:
+            d = load_ui_file(self.filename, macros=macros)
+        else:
+            d = Display(macros=macros)
+            merge_widget_stylesheet(d)
+            d._loaded_file = self.filename
+            _setup_ui_into_display(self._form_class, d)
+        self.instance_count += 1
+        self.instance_time += time.time() - start
+        return d
+
+
 def load_py_file(pyfile, args=None, macros=None):
     """
     Load a .py file, performs some sanity checks to try and determine
@@ -152,7 +315,8 @@ def load_py_file(pyfile, args=None, macros=None):
     temp_name = str(uuid.uuid4())
 
     # Now load the intelligence module.
-    module = imp.load_source(temp_name, pyfile)
+    with tracing.trace_span("import display module", file=pyfile):
+        module = imp.load_source(temp_name, pyfile)
     if hasattr(module, 'intelclass'):
         cls = module.intelclass
         if not issubclass(cls, Display):
@@ -187,7 +351,8 @@ def load_py_file(pyfile, args=None, macros=None):
         kwargs['args'] = args
     if 'macros' in module_params:
         kwargs['macros'] = macros
-    instance = cls(**kwargs)
+    with tracing.trace_span("create display", display=cls.__name__):
+        instance = cls(**kwargs)
     instance._loaded_file = pyfile
     merge_widget_stylesheet(instance)
     return instance
@@ -264,10 +429,5 @@ class Display(QWidget):
             return self.ui
         if self.ui_filepath() is not None and self.ui_filepath() != "":
             self._loaded_file = self.ui_filepath()
-            if macros is not None:
-                f = macro.substitute_in_file(self.ui_filepath(), macros)
-            else:
-                f = self.ui_filepath()
-
-            _load_ui_into_display(f, self)
+            _load_ui_into_display(self.ui_filepath(), self, macros=macros)
             merge_widget_stylesheet(self.ui)
@@ -93,6 +93,8 @@ class PyDMMainWindow(QMainWindow):
 
         self.update_tools_menu()
         self.enable_disable_navigation()
+        data_plugins.connection_scheduler().progress.connect(
+            self.update_connection_progress)
 
     def display_widget(self):
         return self._display_widget
@@ -122,6 +124,27 @@ class PyDMMainWindow(QMainWindow):
             self._display_widget.setParent(None)
             self.ui.actionEdit_in_Designer.setEnabled(False)
 
+    @Slot(int, int)
+    def update_connection_progress(self, established, pending):
+        """
+        Show the progress of the connection of the channels in the status
+        bar.
+
+        Parameters
+        ----------
+        established : int
+            Number of channels connected so far.
+        pending : int
+            Number of channels waiting to be connected.
+        """
+        if pending:
+            self.statusBar().showMessage(
+                "Connecting channels: {0} of {1}...".format(
+                    established, established + pending))
+        else:
+            self.statusBar().showMessage(
+                "Connected {0} channels.".format(established), 2000)
+
     def handle_open_file_error(self, filename, error):
         self.statusBar().showMessage("Cannot open file: '{0}', reason: '{1}'...".format(filename, error), 5000)
 
@@ -1,16 +1,27 @@
 # coding: utf-8
 # Fixtures for PyDM Unit Tests
 
+import os
+import shutil
+import tempfile
+
+# The data plugins are loaded, and their manifest is written, when
+# pydm.data_plugins is first imported: keep it out of the home directory.
+_cache_directory = tempfile.mkdtemp(prefix='pydm-tests-')
+os.environ['PYDM_DATA_PLUGINS_MANIFEST'] = os.path.join(_cache_directory,
+                                                        'data_plugins.json')
+
 import pytest
 from pytestqt.qt_compat import qt_api
 
 import numpy as np
-import tempfile
 import logging
 
 from qtpy.QtCore import QObject, Signal, Slot
 from pydm.application import PyDMApplication
+from pydm import config
 from pydm.data_plugins import PyDMPlugin, add_plugin
+from pydm.utilities import ui_cache
 
 logger = logging.getLogger(__name__)
 _, file_path = tempfile.mkstemp(suffix=".log")
@@ -18,6 +29,24 @@ handler = logging.FileHandler(file_path)
 logger.addHandler(handler)
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: timing benchmark, only run when the "
+                   "PYDM_BENCHMARK environment variable is set")
+
+
+def pytest_collection_modifyitems(config, items):
+    # The timings depend on the machine: the benchmarks only report them,
+    # and are left out of the regular test runs.
+    if os.getenv('PYDM_BENCHMARK'):
+        return
+    skip = pytest.mark.skip(reason="Benchmark, set PYDM_BENCHMARK=1 to run "
+                                   "it")
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
 class ConnectionSignals(QObject):
     """
     An assortment of signals, to which a unit test can choose from and bind an appropriate slot
@@ -83,6 +112,19 @@ def signals():
     return ConnectionSignals()
 
 
+@pytest.fixture(scope='session', autouse=True)
+def cache_paths(tmp_path_factory):
+    """
+    Keep the files cached by the tests out of the home directory.
+    """
+    path = str(tmp_path_factory.mktemp('ui_cache'))
+    os.environ['PYDM_UI_CACHE_PATH'] = path
+    config.UI_CACHE_PATH = path
+    ui_cache._ui_cache = None
+    yield
+    shutil.rmtree(_cache_directory, ignore_errors=True)
+
+
 @pytest.yield_fixture(scope='session')
 def qapp(qapp_args):
     """
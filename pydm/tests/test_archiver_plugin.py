@@ -0,0 +1,189 @@
+import json
+import time
+import threading
+
+import numpy as np
+import pytest
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.urllib.parse import urlparse, parse_qs
+
+from pydm.data_plugins.archiver_plugin import (
+    ArchiveStreamDecoder, ArchiveCache, ArchiveRetriever, Connection,
+    parse_time, format_time, parse_address)
+import pydm.data_plugins.archiver_plugin as archiver_plugin
+from pydm.widgets.channel import PyDMChannel
+
+
+def archiver_json(times, values):
+    data = [{"secs": int(t), "nanos": int(round((t % 1) * 1e9)), "val": v,
+             "severity": 0, "status": 0} for t, v in zip(times, values)]
+    return json.dumps([{"meta": {"name": "PV", "PREC": "0"}, "data": data}])
+
+
+class StubArchiverHandler(BaseHTTPRequestHandler):
+    """Answers like the Archiver Appliance with one sample per second."""
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        self.server.requests.append(params)
+        time.sleep(self.server.delay)
+        start = parse_time(params['from'][0])
+        end = parse_time(params['to'][0])
+        times = np.arange(np.ceil(start), np.floor(end) + 1)
+        body = archiver_json(times, times * 2).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        # Send it in small pieces to exercise the incremental decoding.
+        for i in range(0, len(body), 100):
+            self.wfile.write(body[i:i + 100])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_archiver():
+    server = HTTPServer(('127.0.0.1', 0), StubArchiverHandler)
+    server.requests = []
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def retriever(qapp, stub_archiver, monkeypatch):
+    url = "http://127.0.0.1:{}".format(stub_archiver.server_address[1])
+    retriever = ArchiveRetriever(base_url=url, max_threads=2, lag=60)
+    monkeypatch.setattr(archiver_plugin, '_retriever', retriever)
+    return retriever
+
+
+def test_time_conversion():
+    assert parse_time("1500000000.5") == 1500000000.5
+    assert parse_time("2017-07-14T02:40:00.500Z") == 1500000000.5
+    assert parse_time("2017-07-13T19:40:00-07:00") == 1500000000
+    assert format_time(1500000000.5) == "2017-07-14T02:40:00.500Z"
+    pv, start, end = parse_address(
+        "pv=TST:PV&from=2017-07-14T02:40:00.000Z&to=1500000060")
+    assert (pv, start, end) == ("TST:PV", 1500000000, 1500000060)
+
+
+@pytest.mark.parametrize("piece", [1, 7, 1000000])
+def test_stream_decoder(piece):
+    times = 1500000000 + np.arange(50) * 0.25
+    text = archiver_json(times, list(range(50)))
+    decoder = ArchiveStreamDecoder(chunk_points=8)
+    for i in range(0, len(text), piece):
+        decoder.feed(text[i:i + piece])
+    assert decoder.done
+    decoded_times, values = decoder.result()
+    np.testing.assert_allclose(decoded_times, times)
+    np.testing.assert_array_equal(values, np.arange(50))
+
+
+def test_cache_ranges():
+    cache = ArchiveCache(max_points=100)
+    times = np.arange(0, 11, dtype=float)
+    cache.insert("A", 0, 10, times, times * 2)
+    assert cache.missing("A", 5, 20) == [(10, 20)]
+    assert cache.missing("A", -5, 5) == [(-5, 0)]
+    assert cache.missing("B", 0, 10) == [(0, 10)]
+
+    times = np.arange(10, 21, dtype=float)
+    cache.insert("A", 10, 20, times, times * 2)
+    # Adjacent ranges are merged, without duplicating the common sample.
+    assert len(cache) == 1
+    assert cache.missing("A", 0, 20) == []
+    times, values = cache.get("A", 5, 15)
+    np.testing.assert_array_equal(times, np.arange(5, 16))
+    np.testing.assert_array_equal(values, np.arange(5, 16) * 2)
+
+
+def test_cache_eviction():
+    cache = ArchiveCache(max_points=25)
+    for pv in ("A", "B", "C"):
+        cache.insert(pv, 0, 9, np.arange(10.), np.arange(10.))
+    # The least recently used range was evicted.
+    assert cache.points == 20
+    assert cache.missing("A", 0, 9) == [(0, 9)]
+    cache.get("B", 0, 9)
+    cache.insert("D", 0, 9, np.arange(10.), np.arange(10.))
+    assert cache.missing("B", 0, 9) == []
+    assert cache.missing("C", 0, 9) == [(0, 9)]
+
+
+def test_retriever_fetches_missing_ranges(qtbot, retriever, stub_archiver):
+    results = []
+    start = 1500000000
+    retriever.retrieve("TST:PV", start, start + 100,
+                       lambda t, v: results.append((t, v)))
+    qtbot.waitUntil(lambda: len(results) == 1, timeout=5000)
+    times, values = results[0]
+    assert len(times) == 101
+    np.testing.assert_array_equal(values, times * 2)
+
+    # Panning only requests the part that is not cached.
+    retriever.retrieve("TST:PV", start + 50, start + 150,
+                       lambda t, v: results.append((t, v)))
+    qtbot.waitUntil(lambda: len(results) == 2, timeout=5000)
+    assert len(stub_archiver.requests) == 2
+    request = stub_archiver.requests[1]
+    assert parse_time(request['from'][0]) == start + 100
+    assert parse_time(request['to'][0]) == start + 150
+    times, values = results[1]
+    np.testing.assert_array_equal(times, np.arange(start + 50, start + 151))
+
+    # Zooming in is answered from the cache, immediately.
+    retriever.retrieve("TST:PV", start + 10, start + 20,
+                       lambda t, v: results.append((t, v)))
+    assert len(results) == 3
+    assert len(stub_archiver.requests) == 2
+
+
+def test_retriever_recent_samples_not_cached(qtbot, retriever,
+                                             stub_archiver):
+    results = []
+    end = int(time.time())
+    start = end - 100
+    retriever.retrieve("TST:PV", start, end,
+                       lambda t, v: results.append((t, v)))
+    qtbot.waitUntil(lambda: len(results) == 1, timeout=5000)
+    times, values = results[0]
+    np.testing.assert_array_equal(times, np.arange(start, end + 1))
+    np.testing.assert_array_equal(values, times * 2)
+    # The last minute may still be written to the archiver: it is fetched
+    # again by the next request.
+    gaps = retriever.cache.missing("TST:PV", start, end)
+    assert len(gaps) == 1
+    assert end - 61 < gaps[0][0] <= end - 59
+    retriever.retrieve("TST:PV", start, end,
+                       lambda t, v: results.append((t, v)))
+    qtbot.waitUntil(lambda: len(results) == 2, timeout=5000)
+    assert len(stub_archiver.requests) == 2
+    request = stub_archiver.requests[1]
+    assert parse_time(request['from'][0]) == pytest.approx(gaps[0][0],
+                                                          abs=0.001)
+    np.testing.assert_array_equal(results[1][0], np.arange(start, end + 1))
+
+
+def test_connection_does_not_block(qtbot, retriever, stub_archiver, signals):
+    stub_archiver.delay = 0.5
+    channel = PyDMChannel(address="archiver://pv=TST:PV&from=1500000000"
+                                  "&to=1500000010",
+                          connection_slot=signals.connection_state_signal.emit,
+                          value_slot=signals.receiveValue)
+    start = time.time()
+    connection = Connection(channel, "pv=TST:PV&from=1500000000"
+                                     "&to=1500000010")
+    assert time.time() - start < 0.25
+    assert not connection.connected
+    qtbot.waitUntil(lambda: signals.value is not None, timeout=5000)
+    assert connection.connected
+    np.testing.assert_array_equal(connection.timestamps,
+                                  np.arange(1500000000, 1500000011))
+    np.testing.assert_array_equal(signals.value, connection.timestamps * 2)
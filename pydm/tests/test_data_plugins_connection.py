@@ -0,0 +1,276 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+from qtpy.QtCore import QObject, Slot
+
+from pydm.data_plugins.plugin import PyDMConnection
+from pydm.widgets.channel import PyDMChannel
+from pydm.widgets.timeplot import TimePlotCurveItem
+
+
+class Listener(object):
+    def __init__(self):
+        self.values = []
+        self.threads = set()
+
+    def receive(self, value):
+        self.values.append(value)
+        self.threads.add(threading.current_thread())
+
+
+@pytest.fixture
+def listener_connection(qapp):
+    listener = Listener()
+    channel = PyDMChannel(address="tst://coalesce", value_slot=listener.receive)
+    connection = PyDMConnection(channel, "coalesce")
+    connection.add_listener(channel)
+    yield listener, connection, channel
+    connection.remove_listener(channel)
+
+
+def emit_from_thread(connection, values):
+    def emit():
+        for value in values:
+            connection.new_value_signal[float].emit(value)
+    thread = threading.Thread(target=emit)
+    thread.start()
+    thread.join()
+
+
+def test_listener_added_once(qtbot, listener_connection):
+    # A channel added twice is a single listener.
+    listener, connection, channel = listener_connection
+    connection.add_listener(channel)
+    assert connection.listener_count == 1
+    connection.new_value_signal[float].emit(1.0)
+    qtbot.waitUntil(lambda: listener.values == [1.0], timeout=1000)
+    connection.remove_listener(channel)
+    assert connection.listener_count == 0
+    connection.remove_listener(channel)
+    assert connection.listener_count == 0
+    connection.add_listener(channel)
+
+
+def test_no_coalescing(qtbot, listener_connection):
+    listener, connection, _ = listener_connection
+    emit_from_thread(connection, [1.0, 2.0, 3.0])
+    qtbot.waitUntil(lambda: len(listener.values) == 3, timeout=1000)
+    assert listener.values == [1.0, 2.0, 3.0]
+    assert listener.threads == {threading.current_thread()}
+    assert connection.received_count == connection.delivered_count == 3
+
+
+def test_coalescing_latest_value(qtbot, listener_connection):
+    listener, connection, _ = listener_connection
+    connection.set_coalescing(10)
+    emit_from_thread(connection, [float(i) for i in range(1000)])
+    qtbot.waitUntil(lambda: listener.values[-1:] == [999.0], timeout=1000)
+    qtbot.wait(150)
+    assert len(listener.values) <= 2
+    assert connection.received_count == 1000
+    assert connection.delivered_count == len(listener.values)
+
+    # Going back to the direct delivery.
+    connection.set_coalescing(0)
+    emit_from_thread(connection, [1.0, 2.0])
+    qtbot.waitUntil(lambda: listener.values[-2:] == [1.0, 2.0], timeout=1000)
+
+
+def test_coalescing_every_sample(qtbot, listener_connection):
+    listener, connection, _ = listener_connection
+    connection.set_coalescing(10, deliver_all=True)
+    values = [float(i) for i in range(1000)]
+    emit_from_thread(connection, values)
+    qtbot.waitUntil(lambda: len(listener.values) == 1000, timeout=1000)
+    assert listener.values == values
+    assert listener.threads == {threading.current_thread()}
+    assert connection.received_count == connection.delivered_count == 1000
+
+
+def test_coalescing_remove_listener(qtbot, listener_connection):
+    listener, connection, channel = listener_connection
+    connection.set_coalescing(100)
+    connection.remove_listener(channel)
+    connection.new_value_signal[float].emit(1.0)
+    qtbot.wait(50)
+    assert listener.values == []
+    connection.add_listener(channel)
+
+
+class SampleListener(object):
+    def __init__(self):
+        self.batches = []
+
+    def receive(self, timestamps, values):
+        self.batches.append((timestamps, values))
+
+    def samples(self):
+        return (np.concatenate([batch[0] for batch in self.batches]),
+                np.concatenate([batch[1] for batch in self.batches]))
+
+
+def test_samples(qtbot, listener_connection):
+    listener, connection, _ = listener_connection
+    samples = SampleListener()
+    channel = PyDMChannel(address="tst://coalesce", value_slot=listener.receive,
+                          values_slot=samples.receive)
+    connection.add_listener(channel)
+    start = time.time()
+    emit_from_thread(connection, [1.0, 2.0])
+    connection.new_value_signal[str].emit("a")
+    qtbot.waitUntil(lambda: len(listener.values) == 4, timeout=1000)
+    # The numeric values only go to the values slot, stamped on arrival.
+    assert listener.values == [1.0, 2.0, "a", "a"]
+    timestamps, values = samples.samples()
+    np.testing.assert_array_equal(values, [1.0, 2.0])
+    assert start <= timestamps[0] <= timestamps[1] <= time.time()
+
+    # Coalesced, every sample received is delivered in one call.
+    samples.batches = []
+    connection.set_coalescing(10, deliver_all=True)
+    emit_from_thread(connection, [float(i) for i in range(1000)])
+    qtbot.waitUntil(lambda: len(samples.batches) and
+                    len(samples.samples()[1]) == 1000, timeout=1000)
+    assert len(samples.batches) <= 2
+    np.testing.assert_array_equal(samples.samples()[1], np.arange(1000))
+    connection.remove_listener(channel)
+
+
+class TimestampedConnection(PyDMConnection):
+    source_timestamps = True
+
+
+def test_source_timestamps(qtbot, qapp):
+    samples = SampleListener()
+    values = []
+    channel = PyDMChannel(address="tst://stamped", value_slot=values.append,
+                          values_slot=samples.receive)
+    connection = TimestampedConnection(channel, "stamped")
+    connection.add_listener(channel)
+    for timestamp, value in ((100.0, 1.0), (101.0, 2.0), (50.0, 3.0)):
+        connection.new_value_signal[float].emit(value)
+        connection.send_sample(timestamp, value)
+    connection.new_values_signal.emit(np.array([102.0, 103.0]),
+                                      np.array([4.0, 5.0]))
+    qtbot.waitUntil(lambda: len(samples.batches) == 4, timeout=1000)
+    timestamps, received = samples.samples()
+    # Older timestamps are moved up to keep the samples in order.
+    np.testing.assert_array_equal(timestamps, [100, 101, 101, 102, 103])
+    np.testing.assert_array_equal(received, [1, 2, 3, 4, 5])
+    assert values == []
+    connection.remove_listener(channel)
+
+
+class TypedListener(QObject):
+    def __init__(self):
+        super(TypedListener, self).__init__()
+        self.values = []
+
+    @Slot(str)
+    def receive(self, value):
+        self.values.append(value)
+
+
+def test_listeners_fan_out(qtbot, listener_connection):
+    listener, connection, channel = listener_connection
+    states = []
+    other = PyDMChannel(address="tst://coalesce", value_slot=listener.receive,
+                        connection_slot=states.append)
+    connection.add_listener(other)
+    connection.connection_state_signal.emit(True)
+    connection.new_value_signal[float].emit(1.0)
+    qtbot.waitUntil(lambda: len(listener.values) == 2, timeout=1000)
+    assert states == [True]
+    assert connection.received_count == 1
+    assert connection.delivered_count == 1
+
+    # Listeners are held by weak references.
+    del other
+    connection.connection_state_signal.emit(False)
+    connection.new_value_signal[float].emit(2.0)
+    qtbot.waitUntil(lambda: len(listener.values) == 3, timeout=1000)
+    assert states == [True]
+    assert len(connection._listeners['value_slot']) == 1
+
+
+def test_listener_slot_types(qtbot, listener_connection):
+    # Decorated slots only receive the types they declare, as with signals.
+    _, connection, _ = listener_connection
+    typed = TypedListener()
+    channel = PyDMChannel(address="tst://coalesce", value_slot=typed.receive)
+    connection.add_listener(channel)
+    connection.new_value_signal[float].emit(1.0)
+    connection.new_value_signal[str].emit("a")
+    qtbot.waitUntil(lambda: connection.delivered_count == 2, timeout=1000)
+    assert typed.values == ["a"]
+    connection.remove_listener(channel)
+
+
+def make_listeners(listener, count):
+    return [PyDMChannel(address="tst://coalesce", value_slot=listener.receive,
+                        connection_slot=listener.receive)
+            for _ in range(count)]
+
+
+def test_many_listeners(qtbot, listener_connection):
+    listener, connection, _ = listener_connection
+    channels = make_listeners(listener, 1000)
+    for channel in channels:
+        connection.add_listener(channel)
+    assert len(connection._listeners['value_slot']) == 1001
+    connection.new_value_signal[float].emit(1.0)
+    qtbot.waitUntil(lambda: len(listener.values) == 1001, timeout=5000)
+    assert connection.delivered_count == 1
+    for channel in channels:
+        connection.remove_listener(channel)
+    assert len(connection._listeners['value_slot']) == 1
+    assert len(connection._listeners['connection_slot']) == 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [1000, 10000, 50000])
+def test_listeners_benchmark(qtbot, listener_connection, count):
+    """
+    Cost of adding and removing listeners and of delivering a value, which
+    posts a single event whatever the number of listeners.
+    """
+    listener, connection, _ = listener_connection
+    channels = make_listeners(listener, count)
+    start = time.time()
+    for channel in channels:
+        connection.add_listener(channel)
+    added = time.time()
+    connection.new_value_signal[float].emit(1.0)
+    qtbot.waitUntil(lambda: len(listener.values) == count + 1, timeout=5000)
+    delivered = time.time()
+    for channel in channels:
+        connection.remove_listener(channel)
+    removed = time.time()
+    print("{} listeners: add {:.3f} s, deliver {:.3f} s, remove {:.3f} s"
+          "".format(count, added - start, delivered - added,
+                    removed - delivered))
+
+
+def test_coalescing_plot_curve(qtbot, listener_connection):
+    # Plot curves need every sample, even if the connection only delivers
+    # the latest value to the other listeners.
+    listener, connection, _ = listener_connection
+    curve = TimePlotCurveItem(channel_address="tst://coalesce")
+    curve.setBufferSize(1000)
+    connection.add_listener(curve.channel)
+    connection.set_coalescing(10)
+    emit_from_thread(connection, [float(i) for i in range(1000)])
+    qtbot.waitUntil(lambda: curve.points_accumulated == 1000, timeout=1000)
+    np.testing.assert_array_equal(curve.data_buffer[1], np.arange(1000))
+    assert listener.values == [float(i) for i in range(1000)]
+
+    # Without the curve, only the latest value is delivered again.
+    connection.remove_listener(curve.channel)
+    curve.channel = None
+    listener.values = []
+    emit_from_thread(connection, [float(i) for i in range(1000)])
+    qtbot.waitUntil(lambda: listener.values[-1:] == [999.0], timeout=1000)
+    qtbot.wait(150)
+    assert len(listener.values) <= 2
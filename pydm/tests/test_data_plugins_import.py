@@ -1,8 +1,18 @@
 import os
+import sys
+import json
+import time
+import subprocess
+
+from qtpy.QtWidgets import QLabel
 
 import pydm.data_plugins
-from pydm.data_plugins import (plugin_modules, load_plugins_from_path,
-                               plugin_for_address)
+from pydm.data_plugins import (plugin_modules, lazy_plugins,
+                               load_plugins_from_path, plugin_for_address,
+                               add_plugin, PyDMPlugin, connection_queue,
+                               connection_scheduler,
+                               establish_queued_connections)
+from pydm.widgets.channel import PyDMChannel
 from pydm import config
 
 def test_data_plugin_add(qapp, test_plugin):
@@ -24,6 +34,65 @@ def test_plugin_directory_loading(qapp):
     os.remove(os.path.join(cur_dir, 'plugin_foo.py'))
 
 
+def test_plugin_manifest(tmpdir):
+    plugin_file = tmpdir.join('plugin_foo.py')
+    plugin_file.write(fake_file.replace("'tst", "'lazy"))
+    manifest = str(tmpdir.join('cache', 'manifest.json'))
+    # Files that are not recorded yet are imported.
+    added = load_plugins_from_path([str(tmpdir)], 'foo.py', manifest=manifest)
+    assert sorted(added) == ['lazy1', 'lazy2']
+    with open(manifest) as f:
+        recorded = json.load(f)['files']
+    assert recorded[os.path.realpath(str(plugin_file))]['protocols'] == [
+        'lazy1', 'lazy2']
+    del plugin_modules['lazy1'], plugin_modules['lazy2']
+
+    # Afterwards, only when one of their protocols is used.
+    assert load_plugins_from_path([str(tmpdir)], 'foo.py',
+                                  manifest=manifest) == {}
+    assert 'lazy1' not in plugin_modules
+    assert 'lazy2' in lazy_plugins
+    assert plugin_for_address('lazy1://address') is plugin_modules['lazy1']
+    assert 'lazy2' in plugin_modules
+    assert 'lazy2' not in lazy_plugins
+
+    # Files that changed are imported again.
+    plugin_file.write(fake_file.replace("'tst", "'lazier"))
+    os.utime(str(plugin_file), (time.time() + 10, time.time() + 10))
+    added = load_plugins_from_path([str(tmpdir)], 'foo.py', manifest=manifest)
+    assert sorted(added) == ['lazier1', 'lazier2']
+    for protocol in ('lazy1', 'lazy2', 'lazier1', 'lazier2'):
+        plugin_modules.pop(protocol, None)
+
+
+IMPORT_PLUGINS = """
+import sys
+import pydm.data_plugins
+print(' '.join(sorted(pydm.data_plugins.plugin_modules)))
+print(' '.join(sorted(pydm.data_plugins.lazy_plugins)))
+print('requests' in sys.modules)
+"""
+
+
+def test_plugin_import_time(tmpdir):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen',
+               PYDM_DATA_PLUGINS_MANIFEST=str(tmpdir.join('manifest.json')))
+
+    def import_data_plugins():
+        output = subprocess.check_output([sys.executable, '-c',
+                                          IMPORT_PLUGINS],
+                                         env=env, universal_newlines=True)
+        return output.splitlines()[-3:]
+
+    first = import_data_plugins()
+    second = import_data_plugins()
+    assert 'fake' in first[0].split()
+    # With the manifest, the plugins and their dependencies are not imported.
+    assert second[0] == ''
+    assert 'fake' in second[1].split()
+    assert second[2] == 'False'
+
+
 def test_plugin_for_address(test_plugin):
     # Get by protocol
     assert isinstance(plugin_for_address('tst://tst:this'),
@@ -35,6 +104,103 @@ def test_plugin_for_address(test_plugin):
                       test_plugin)
 
 
+class SchedulerPlugin(PyDMPlugin):
+    protocol = 'sched'
+    delay = 0
+
+    def __init__(self):
+        super(SchedulerPlugin, self).__init__()
+        self.connected = []
+        self.batches = []
+
+    def add_connections(self, channels):
+        self.batches.append(len(channels))
+        for channel in channels:
+            time.sleep(self.delay)
+            self.connected.append(channel)
+
+
+def test_connection_scheduler(qtbot):
+    add_plugin(SchedulerPlugin)
+    plugin = plugin_modules['sched']
+    plugin.delay = 0.001
+    hidden = QLabel()
+    visible = QLabel()
+    qtbot.addWidget(hidden)
+    qtbot.addWidget(visible)
+    visible.show()
+    qtbot.waitExposed(visible)
+
+    progress = []
+    scheduler = connection_scheduler()
+
+    def record(*args):
+        progress.append(args)
+    scheduler.progress.connect(record)
+    hidden_channels = [PyDMChannel("sched://hidden{}".format(i),
+                                   value_slot=hidden.setNum)
+                       for i in range(100)]
+    visible_channels = [PyDMChannel("sched://visible{}".format(i),
+                                    value_slot=visible.setNum)
+                        for i in range(50)]
+    cancelled = hidden_channels[0]
+    with connection_queue():
+        for channel in hidden_channels + visible_channels:
+            channel.connect()
+        cancelled.disconnect()
+    # Nothing was connected while queueing, nor right after.
+    assert plugin.connected == []
+
+    qtbot.waitUntil(lambda: bool(progress) and progress[-1][1] == 0,
+                    timeout=5000)
+    assert len(plugin.connected) == 149
+    assert cancelled not in plugin.connected
+    # Visible widgets first, in batches handed to the plugin.
+    assert plugin.connected[:50] == visible_channels
+    assert len(progress) > 1
+    assert progress[-1] == (149, 0)
+    assert max(plugin.batches) > 1
+    scheduler.progress.disconnect(record)
+
+
+def test_nested_connection_queue(qtbot):
+    # The connections queued in nested contexts, like the ones of the
+    # template repeaters in a display, wait for the outermost context.
+    add_plugin(SchedulerPlugin)
+    plugin = plugin_modules['sched']
+    scheduler = connection_scheduler()
+    first = PyDMChannel("sched://nested1")
+    second = PyDMChannel("sched://nested2")
+    with connection_queue():
+        with connection_queue(defer_connections=True):
+            first.connect()
+        establish_queued_connections()
+        second.connect()
+        assert scheduler.pending == 0
+    assert plugin.connected == []
+    assert scheduler.pending == 2
+    qtbot.waitUntil(lambda: scheduler.pending == 0, timeout=5000)
+    assert plugin.connected == [first, second]
+
+
+def test_connection_queued_again(qtbot):
+    # A channel disconnected and connected again before the scheduler got
+    # to it is connected once.
+    add_plugin(SchedulerPlugin)
+    plugin = plugin_modules['sched']
+    scheduler = connection_scheduler()
+    channel = PyDMChannel("sched://again")
+    with connection_queue():
+        channel.connect()
+    channel.disconnect()
+    assert scheduler.pending == 0
+    with connection_queue():
+        channel.connect()
+    assert scheduler.pending == 1
+    qtbot.waitUntil(lambda: scheduler.pending == 0, timeout=5000)
+    assert plugin.connected == [channel]
+
+
 fake_file = """\
 from pydm.data_plugins import PyDMPlugin
 
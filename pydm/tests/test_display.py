@@ -1,6 +1,8 @@
 import os
 import pytest
+from qtpy.QtWidgets import QLabel
 from pydm import Display
+from pydm.display import UiTemplate
 
 # The path to the .ui file used in these tests
 test_ui_path = os.path.join(
@@ -34,3 +36,43 @@ def test_nonexistant_ui_file_raises(qtbot):
 
     with pytest.raises(IOError):
         my_display = TestDisplay(parent=None)
+
+
+def _write_template(tmpdir, old, new):
+    with open(test_ui_path) as f:
+        text = f.read()
+    path = str(tmpdir.join("template.ui"))
+    with open(path, "w") as f:
+        f.write(text.replace(old, new))
+    return path
+
+
+def test_ui_template_instances(qtbot, tmpdir):
+    """A template is compiled once and each instance gets its own macros."""
+    path = _write_template(tmpdir, "TextLabel", "${NAME} at $LOCATION")
+    template = UiTemplate(path)
+    assert template.precompiled
+    assert template.macro_names == {"NAME", "LOCATION"}
+
+    for name in ("first", "second"):
+        display = template.instantiate({"NAME": name, "LOCATION": "home"})
+        qtbot.addWidget(display)
+        assert display.numBlobsLabel.text() == "{} at home".format(name)
+        assert display.loaded_file() == path
+    assert template.instance_count == 2
+    assert template.mean_instance_time > 0
+
+
+@pytest.mark.parametrize("old, new", [
+    ('name="numBlobsLabel"', 'name="numBlobs${NAME}"'),
+    ("<width>285</width>", "<width>${WIDTH}</width>"),
+])
+def test_ui_template_fallback(qtbot, tmpdir, old, new):
+    """Macros outside of string properties are still substituted."""
+    path = _write_template(tmpdir, old, new)
+    template = UiTemplate(path)
+    assert not template.precompiled
+
+    display = template.instantiate({"NAME": "Label", "WIDTH": "100"})
+    qtbot.addWidget(display)
+    assert display.findChild(QLabel, "numBlobsLabel") is not None
@@ -0,0 +1,121 @@
+"""
+Connection of many PVs served by a local caproto IOC, connecting the
+channels one by one and with the bulk PyDMPlugin.add_connections.
+
+The benchmark of the time needed to connect them is only run when the
+PYDM_BENCHMARK environment variable is set.  The number of PVs it connects
+defaults to 1000 and can be set with the PYDM_BENCHMARK_PVS environment
+variable, e.g. to 10000.
+"""
+import os
+import sys
+import time
+import socket
+import subprocess
+
+import pytest
+
+pytest.importorskip('caproto')
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 6),
+                                reason="caproto requires Python 3.6+")
+
+from pydm.widgets.channel import PyDMChannel
+
+PV_COUNT = int(os.getenv('PYDM_BENCHMARK_PVS', 1000))
+# The number of PVs connected by the regular test.
+TEST_PV_COUNT = 50
+
+IOC_SCRIPT = """
+import sys
+from caproto import ChannelDouble
+from caproto.asyncio.server import run
+prefixes, count = sys.argv[1].split(','), int(sys.argv[2])
+pvdb = {'{}{}'.format(prefix, i): ChannelDouble(value=i)
+        for prefix in prefixes for i in range(count)}
+run(pvdb, interfaces=['127.0.0.1'])
+"""
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture(scope='module')
+def caproto_ioc():
+    port = str(free_port())
+    env = dict(os.environ, EPICS_CA_SERVER_PORT=port)
+    ioc = subprocess.Popen([sys.executable, '-c', IOC_SCRIPT,
+                            'BULK:,SINGLE:',
+                            str(PV_COUNT if os.getenv('PYDM_BENCHMARK')
+                                else TEST_PV_COUNT)], env=env)
+    # The client context is created on first use, with these settings.
+    saved = {k: os.environ.get(k) for k in ('EPICS_CA_SERVER_PORT',
+                                            'EPICS_CA_ADDR_LIST',
+                                            'EPICS_CA_AUTO_ADDR_LIST')}
+    os.environ.update(EPICS_CA_SERVER_PORT=port,
+                      EPICS_CA_ADDR_LIST='127.0.0.1',
+                      EPICS_CA_AUTO_ADDR_LIST='NO')
+    from pydm.data_plugins.epics_plugins.caproto_plugin_component import (
+        CaprotoPlugin)
+    plugin = CaprotoPlugin()
+    # Wait for the IOC to serve the PVs.
+    probe = [PyDMChannel('ca://SINGLE:0')]
+    state = {}
+    probe[0].connection_slot = lambda conn: state.update(conn=conn)
+    yield ioc, plugin, probe, state
+    ioc.terminate()
+    ioc.wait()
+    for key, value in saved.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+
+def time_to_connect(qtbot, plugin, prefix, bulk, count=PV_COUNT):
+    connected = set()
+    channels = [PyDMChannel('ca://{}{}'.format(prefix, i),
+                            connection_slot=lambda conn, i=i: (
+                                connected.add(i) if conn else None))
+                for i in range(count)]
+    start = time.time()
+    if bulk:
+        plugin.add_connections(channels)
+    else:
+        for channel in channels:
+            plugin.add_connection(channel)
+    created = time.time()
+    qtbot.waitUntil(lambda: len(connected) == count, timeout=max(60000, count * 20))
+    elapsed = time.time() - start
+    for channel in channels:
+        plugin.remove_connection(channel)
+    return created - start, elapsed
+
+
+def wait_for_ioc(qtbot, caproto_ioc):
+    ioc, plugin, probe, state = caproto_ioc
+    plugin.add_connection(probe[0])
+    qtbot.waitUntil(lambda: state.get('conn') is True, timeout=30000)
+    return plugin
+
+
+def test_bulk_connections(qtbot, caproto_ioc):
+    plugin = wait_for_ioc(qtbot, caproto_ioc)
+    # time_to_connect fails unless every PV connects.
+    time_to_connect(qtbot, plugin, 'SINGLE:', bulk=False,
+                    count=TEST_PV_COUNT)
+    time_to_connect(qtbot, plugin, 'BULK:', bulk=True, count=TEST_PV_COUNT)
+
+
+@pytest.mark.benchmark
+def test_bulk_connection_benchmark(qtbot, caproto_ioc):
+    plugin = wait_for_ioc(qtbot, caproto_ioc)
+    single = time_to_connect(qtbot, plugin, 'SINGLE:', bulk=False)
+    bulk = time_to_connect(qtbot, plugin, 'BULK:', bulk=True)
+    print("{} PVs connected one by one in {:.2f} s ({:.2f} s creating), "
+          "in bulk in {:.2f} s ({:.2f} s creating)".format(
+              PV_COUNT, single[1], single[0], bulk[1], bulk[0]))
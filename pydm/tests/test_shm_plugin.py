@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from pydm.data_plugins import plugin_for_address
+from pydm.data_plugins.shm_plugin import (Connection, SharedMemoryPlugin,
+                                          parse_address)
+from pydm.utilities.shared_frames import SharedFrameWriter
+from pydm.widgets.channel import PyDMChannel
+
+
+def test_parse_address(monkeypatch):
+    monkeypatch.setattr('pydm.config.SHM_POLL_RATE', 50)
+    assert parse_address('camera') == ('camera', 50, False)
+    assert parse_address('/dev/shm/camera?rate=10') == ('/dev/shm/camera', 10,
+                                                        False)
+    assert parse_address('camera?copy=1&rate=10') == ('camera', 10, True)
+    for address in ('', '?rate=10', 'camera?rate=0', 'camera?copy=yes'):
+        with pytest.raises(ValueError):
+            parse_address(address)
+
+
+def test_plugin_registered():
+    # The plugin files are imported under another module name.
+    plugin = plugin_for_address('shm://camera')
+    assert type(plugin).__name__ == SharedMemoryPlugin.__name__
+
+
+def test_connection(qtbot, signals, tmpdir):
+    path = str(tmpdir.join('camera'))
+    channel = PyDMChannel(address='shm://' + path,
+                          connection_slot=signals.connection_state_signal.emit,
+                          value_slot=signals.receiveValue)
+    # The producer is not running yet.
+    connection = Connection(channel, path + '?rate=200')
+    assert not connection.connected
+
+    writer = SharedFrameWriter(path, (4, 8), np.uint16)
+    qtbot.waitUntil(lambda: connection.connected, timeout=2000)
+    assert signals.value is None
+    writer.write(np.full((4, 8), 7))
+    qtbot.waitUntil(lambda: signals.value is not None, timeout=2000)
+    assert signals.value.shape == (4, 8)
+    assert signals.value[0, 0] == 7
+    # The listeners get a view of the shared memory.
+    assert not signals.value.flags.writeable
+    assert signals.value.base is not None
+
+    writer.write(np.full((4, 8), 8))
+    qtbot.waitUntil(lambda: signals.value[0, 0] == 8, timeout=2000)
+
+    # A producer started again with other frames is mapped again.
+    writer.close()
+    qtbot.waitUntil(lambda: not connection.connected, timeout=2000)
+    writer = SharedFrameWriter(path, (100,), np.float64)
+    writer.write(np.arange(100.))
+    qtbot.waitUntil(lambda: signals.value.shape == (100,), timeout=2000)
+    np.testing.assert_array_equal(signals.value, np.arange(100.))
+
+    connection.close()
+    assert not connection.timer.isActive()
+    writer.close()
+
+
+def test_connection_copy(qtbot, signals, tmpdir):
+    path = str(tmpdir.join('camera'))
+    writer = SharedFrameWriter(path, (4, 8), np.uint16)
+    writer.write(np.full((4, 8), 7))
+    channel = PyDMChannel(address='shm://' + path,
+                          value_slot=signals.receiveValue)
+    connection = Connection(channel, path + '?copy=1')
+    qtbot.waitUntil(lambda: signals.value is not None, timeout=2000)
+    assert signals.value[0, 0] == 7
+    # The listeners get a copy, which the producer does not overwrite.
+    assert signals.value.base is None
+    value = signals.value
+    for i in range(8):
+        writer.write(np.full((4, 8), i))
+    assert value[0, 0] == 7
+    connection.close()
+    writer.close()
+
+
+def test_overwritten_while_handled(qtbot, tmpdir, caplog):
+    path = str(tmpdir.join('camera'))
+    writer = SharedFrameWriter(path, (4, 8), np.uint16, slots=1)
+    writer.write(np.full((4, 8), 7))
+    values = []
+
+    def handle(value):
+        values.append(value[0, 0])
+        # The producer wraps around while the frame is handled.
+        writer.write(np.full((4, 8), 8))
+
+    channel = PyDMChannel(address='shm://' + path, value_slot=handle)
+    connection = Connection(channel, path)
+    connection.timer.stop()
+    qtbot.waitUntil(lambda: values == [7], timeout=2000)
+    assert 'overwritten' in caplog.text
+    connection.close()
+    writer.close()
+
+
+def test_overwritten_before_delivery(qtbot, tmpdir):
+    path = str(tmpdir.join('camera'))
+    writer = SharedFrameWriter(path, (4, 8), np.uint16, slots=1)
+    writer.write(np.full((4, 8), 7))
+    values = []
+    channel = PyDMChannel(address='shm://' + path,
+                          value_slot=lambda value: values.append(value[0, 0]))
+    connection = Connection(channel, path)
+    connection.timer.stop()
+    # The frame read is overwritten before it is delivered: it is dropped.
+    writer.write(np.full((4, 8), 8))
+    qtbot.wait(50)
+    assert values == []
+    connection.poll()
+    qtbot.waitUntil(lambda: values == [8], timeout=2000)
+    connection.close()
+    writer.close()
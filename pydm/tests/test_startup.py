@@ -0,0 +1,101 @@
+"""
+Checks that the widgets and their dependencies are only imported when they
+are used, and benchmark of the time needed to import pydm and a widget
+module, as reported by ``python -X importtime``.
+"""
+import os
+import sys
+import subprocess
+
+import pytest
+
+import pydm
+import pydm.widgets
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason="Lazy imports require Python 3.7+")
+
+
+def import_times(statement):
+    """
+    Run an import statement in a new interpreter with ``-X importtime``.
+
+    Returns
+    -------
+    modules : dict
+        Module name vs. its cumulative import time, in seconds, for the
+        modules imported by the statement and not at the interpreter startup.
+    total : float
+        Total import time of these modules, in seconds.
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    times = {}
+    top_level = {}
+    for code in ('pass', statement):
+        process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                    code], env=env, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        _, output = process.communicate()
+        assert process.returncode == 0, output
+        times[code] = {}
+        top_level[code] = set()
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[code][name.strip()] = int(cumulative) * 1e-6
+            if not name[1:].startswith(' '):
+                top_level[code].add(name.strip())
+    modules = dict((name, cumulative)
+                   for name, cumulative in times[statement].items()
+                   if name not in times['pass'])
+    total = sum(modules[name] for name in top_level[statement]
+                if name in modules)
+    return modules, total
+
+
+@pytest.mark.parametrize("statement", ["import pydm",
+                                       "import pydm.widgets.label"])
+def test_lazy_imports(statement):
+    modules, _ = import_times(statement)
+    # Neither the application nor the plots are imported.
+    assert 'pydm.application' not in modules
+    assert 'pyqtgraph' not in modules
+    assert 'pydm.widgets.timeplot' not in modules
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("statement", ["import pydm",
+                                       "import pydm.widgets.label",
+                                       "from pydm import PyDMApplication"])
+def test_import_time(statement):
+    modules, total = import_times(statement)
+    slowest = sorted(modules.items(), key=lambda item: item[1],
+                     reverse=True)[:5]
+    print("{}: {:.3f} s, slowest: {}".format(
+        statement, total, ", ".join("{} {:.3f} s".format(name, cumulative)
+                                    for name, cumulative in slowest)))
+
+
+def test_lazy_widgets():
+    assert 'PyDMTimePlot' in dir(pydm.widgets)
+    assert pydm.widgets.PyDMLabel.__module__ == 'pydm.widgets.label'
+    assert 'PyDMLabel' in vars(pydm.widgets)
+    with pytest.raises(AttributeError):
+        pydm.widgets.NotAWidget
+    assert pydm.Display.__module__ == 'pydm.display'
+    namespace = {}
+    exec("from pydm.widgets import *", namespace)
+    assert 'PyDMTemplateRepeater' in namespace
+
+
+def test_lazy_subpackages():
+    # The subpackages are attributes of pydm without being imported first.
+    code = ("import pydm; pydm.widgets.PyDMLabel; pydm.utilities.is_pydm_app; "
+            "pydm.data_plugins.plugin_modules; "
+            "assert not hasattr(pydm, 'not_a_module')")
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    process = subprocess.Popen([sys.executable, '-c', code], env=env,
+                               stderr=subprocess.PIPE, universal_newlines=True)
+    _, output = process.communicate()
+    assert process.returncode == 0, output
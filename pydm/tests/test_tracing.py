@@ -0,0 +1,71 @@
+import os
+import json
+import time
+
+import pytest
+
+from pydm import tracing
+from pydm.display import load_file, ScreenTarget
+
+test_ui_path = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "test_data", "test.ui")
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.enable_tracing()
+    yield tracer
+    tracing.disable_tracing()
+
+
+def test_tracing_disabled():
+    assert not tracing.is_tracing()
+    # A function call and an empty with statement, with no span created.
+    first = tracing.trace_span("span", file="file")
+    with first:
+        pass
+    assert tracing.trace_span("other") is first
+
+
+@pytest.mark.benchmark
+def test_tracing_disabled_cost():
+    calls = 100000
+    start = time.time()
+    for _ in range(calls):
+        with tracing.trace_span("span", file="file"):
+            pass
+    elapsed = time.time() - start
+    print("Disabled span: {:.3f} us".format(elapsed / calls * 1e6))
+
+
+def test_spans(tracer):
+    @tracing.traced()
+    def work():
+        time.sleep(0.01)
+        return 42
+
+    with tracing.trace_span("outer", category="test", size=3):
+        assert work() == 42
+    events = [event for event in tracer.trace_events() if event["ph"] == "X"]
+    assert [event["name"] for event in events] == ["work", "outer"]
+    work_event, outer_event = events
+    assert outer_event["cat"] == "test"
+    assert outer_event["args"] == {"size": "3"}
+    assert work_event["dur"] >= 10000
+    assert outer_event["ts"] <= work_event["ts"]
+    assert (outer_event["ts"] + outer_event["dur"] >=
+            work_event["ts"] + work_event["dur"])
+
+
+def test_display_load_trace(qtbot, tracer, tmpdir):
+    display = load_file(test_ui_path, target=ScreenTarget.DIALOG)
+    qtbot.addWidget(display)
+    trace_file = str(tmpdir.join("trace.json"))
+    tracing.save_trace(trace_file)
+    with open(trace_file) as f:
+        trace = json.load(f)
+    names = set(event["name"] for event in trace["traceEvents"])
+    for name in ("load_file", "create display", "merge_widget_stylesheet",
+                 "setupUi", "establish_queued_connections", "thread_name"):
+        assert name in names
@@ -0,0 +1,43 @@
+import numpy as np
+
+from ...utilities.decimation import minmax_indices, decimate_view
+
+
+def test_minmax_indices():
+    values = np.zeros(1000)
+    values[123] = 5
+    values[456] = -7
+    values[999] = 3
+    indices = minmax_indices(values, 10)
+    assert len(indices) <= 20
+    assert np.all(np.diff(indices) >= 0)
+    # The peaks are kept.
+    for peak in (123, 456, 999):
+        assert peak in indices
+    # Short ranges are left alone.
+    np.testing.assert_array_equal(minmax_indices(values, 10, 5, 20),
+                                  np.arange(5, 20))
+    # An incomplete last bucket is kept too.
+    indices = minmax_indices(np.arange(105.), 10)
+    assert indices[-1] == 104
+
+
+def test_decimate_view():
+    values = np.sin(np.linspace(0, 100, 100000))
+    values[10] = 10
+    values[-10] = -10
+    indices = decimate_view(values, 100, 40000, 60000)
+    assert len(indices) <= 2 * 100 + 8
+    # The extrema and the ends outside of the view are kept for the bounds
+    # of the data.
+    for index in (0, 10, len(values) - 10, len(values) - 1):
+        assert index in indices
+    # So are the points on each side of the view.
+    assert 39999 in indices and 60000 in indices
+    inside = indices[(indices >= 40000) & (indices < 60000)]
+    assert values[inside].max() == values[40000:60000].max()
+    assert values[inside].min() == values[40000:60000].min()
+    # The view may extend past the data.
+    np.testing.assert_array_equal(decimate_view(values, 100, 99990, 200000),
+                                  [0, 10, 36128] + list(range(99989, 100000)))
+    assert len(decimate_view(values[:0], 100, 0, 10)) == 0
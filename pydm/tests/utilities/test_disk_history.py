@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from ... import config
+from ...utilities import disk_history
+from ...utilities.disk_history import DiskHistory
+
+
+@pytest.fixture(autouse=True)
+def history_path(monkeypatch, tmpdir):
+    monkeypatch.setattr(config, 'HISTORY_PATH', str(tmpdir))
+    monkeypatch.setattr(disk_history, '_directory', None)
+    return tmpdir
+
+
+def test_append_and_read():
+    history = DiskHistory('ca://PV:1', segment_size=10, segments=3)
+    assert len(history) == 0
+    assert history.time_range() is None
+    assert history.read(0, 100).shape == (2, 0)
+    for i in range(25):
+        history.append((i, -i))
+    assert len(history) == 25
+    assert history.time_range() == (0, 24)
+    assert len(history.segments) == 3
+    assert all('ca___PV_1' in os.path.basename(path)
+               for path in history.segments)
+    # The samples are read across the files, the stop time excluded.
+    np.testing.assert_array_equal(history.read(5, 15),
+                                  [np.arange(5, 15), -np.arange(5, 15)])
+    history.close()
+
+
+def test_rotation_and_cleanup():
+    history = DiskHistory(segment_size=10, segments=2)
+    history.extend((np.arange(35.), np.arange(35.)))
+    assert len(history) == 15
+    assert history.time_range() == (20, 34)
+    paths = history.segments
+    assert all(os.path.exists(path) for path in paths)
+    assert len(os.listdir(os.path.dirname(paths[0]))) == 2
+    history.close()
+    assert not any(os.path.exists(path) for path in paths)
+    assert len(history) == 0
+
+
+def test_decimated_read():
+    history = DiskHistory(segment_size=1000, segments=10)
+    values = np.random.rand(5000)
+    values[1234] = 5
+    values[4321] = -5
+    history.extend((np.arange(5000.), values))
+    times, read = history.read(0, 5000, points=100)
+    assert len(times) <= 100 + 10
+    assert read.max() == 5 and read.min() == -5
+    np.testing.assert_array_equal(values[times.astype(int)], read)
+    history.close()
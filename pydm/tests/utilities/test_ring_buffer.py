@@ -0,0 +1,267 @@
+import time
+import pytest
+import numpy as np
+
+from ...utilities.ring_buffer import (RingBuffer, ExtremaRingBuffer,
+                                      PyramidRingBuffer, ColumnRingBuffer)
+
+
+def test_construct():
+    buf = RingBuffer(5, rows=2, fill=(1, 2))
+    assert buf.capacity == 5
+    assert buf.rows == 2
+    assert len(buf) == 0
+    assert buf.view().shape == (2, 5)
+    assert np.array_equal(buf.view()[0], np.ones(5))
+    assert np.array_equal(buf.view()[1], 2 * np.ones(5))
+    assert buf.valid().shape == (2, 0)
+
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+@pytest.mark.parametrize("capacity, samples", [
+    (1, 3),
+    (4, 2),
+    (4, 4),
+    (4, 11),
+    (100, 257),
+])
+def test_append_matches_roll(capacity, samples):
+    """
+    The ring buffer must produce exactly what the np.roll based buffers it
+    replaces used to produce.
+    """
+    buf = RingBuffer(capacity, rows=2)
+    expected = np.zeros((2, capacity))
+    for i in range(samples):
+        buf.append((i, -i))
+        expected = np.roll(expected, -1)
+        expected[:, -1] = (i, -i)
+        assert np.array_equal(buf.view(), expected)
+        assert np.array_equal(buf.latest(), (i, -i))
+
+    count = min(samples, capacity)
+    assert len(buf) == count
+    assert np.array_equal(buf.valid(), expected[:, -count:])
+    assert buf.view()[0].flags['C_CONTIGUOUS']
+
+
+def test_clear():
+    buf = RingBuffer(3)
+    for i in range(5):
+        buf.append(i)
+    buf.clear(7)
+    assert len(buf) == 0
+    assert buf.head == 0
+    assert np.array_equal(buf.view(), 7 * np.ones((1, 3)))
+
+
+@pytest.mark.parametrize("capacity", [1, 7, 64])
+def test_extrema_follow_window(capacity):
+    """
+    Running extrema must match a full scan of the samples held in the buffer,
+    including after the extreme values fall out of the window.
+    """
+    rng = np.random.RandomState(1234)
+    buf = ExtremaRingBuffer(capacity, rows=2)
+    assert np.isnan(buf.minimum(0)) and np.isnan(buf.maximum(1))
+    for i in range(5 * capacity + 3):
+        # A decreasing trend on row 0 makes old maxima expire constantly.
+        sample = (-i + rng.rand(), rng.randn())
+        buf.append(sample)
+        data = buf.valid()
+        assert buf.minimum(0) == np.amin(data[0])
+        assert buf.maximum(0) == np.amax(data[0])
+        assert buf.minimum(1) == np.amin(data[1])
+        assert buf.maximum(1) == np.amax(data[1])
+
+    buf.clear()
+    assert np.isnan(buf.minimum(0))
+
+
+@pytest.mark.parametrize("capacity, sizes", [
+    (5, [3, 1, 9, 2]),
+    (16, [20, 5]),
+    (100, [37, 0, 250, 1]),
+])
+def test_extend_matches_append(capacity, sizes):
+    appended = RingBuffer(capacity, rows=2)
+    extended = RingBuffer(capacity, rows=2)
+    count = 0
+    for size in sizes:
+        samples = np.arange(count, count + 2 * size).reshape(2, size)
+        for i in range(size):
+            appended.append(samples[:, i])
+        extended.extend(samples)
+        count += 2 * size
+        assert np.array_equal(extended.view(), appended.view())
+        assert len(extended) == len(appended)
+        assert extended.head == appended.head
+
+
+def test_extrema_ignore_nan():
+    buf = ExtremaRingBuffer(3)
+    buf.append(np.nan)
+    assert np.isnan(buf.minimum())
+    buf.append(2.0)
+    buf.append(np.nan)
+    assert buf.minimum() == buf.maximum() == 2.0
+
+
+def _append_cost(capacity, samples=20000):
+    buf = RingBuffer(capacity, rows=2)
+    start = time.time()
+    for i in range(samples):
+        buf.append((i, i))
+    return (time.time() - start) / samples
+
+
+@pytest.mark.benchmark
+def test_append_cost_independent_of_capacity():
+    """
+    Micro-benchmark: appending to a 1M sample buffer should cost about the
+    same as appending to a 100 sample one.  With np.roll the ratio would be
+    in the thousands.
+    """
+    small = min(_append_cost(100) for _ in range(3))
+    large = min(_append_cost(1000000) for _ in range(3))
+    print("Per-sample append cost: {:.2f} us (100), {:.2f} us (1M)".format(
+        small * 1e6, large * 1e6))
+
+
+@pytest.mark.parametrize("capacity, batch", [(7, 1), (100, 1), (100, 33),
+                                             (1000, 1), (1000, 700)])
+def test_pyramid_preserves_extrema(capacity, batch):
+    """
+    The points drawn for any range of time must be actual samples, and keep
+    the extrema of the range and of the whole buffer.
+    """
+    rng = np.random.RandomState(1234)
+    buf = PyramidRingBuffer(capacity)
+    count = 0
+    for _ in range(3 * capacity // batch + 5):
+        values = rng.randn(batch)
+        values[rng.rand(batch) < 0.05] = np.nan
+        if batch == 1:
+            buf.append((count, values[0]))
+        else:
+            buf.extend((np.arange(count, count + batch), values))
+        count += batch
+        data = buf.valid()
+        oldest, newest = data[0, 0], data[0, -1]
+        for start, stop, pixels in ((oldest, newest, 3),
+                                    (oldest + (newest - oldest) // 3,
+                                     oldest + (newest - oldest) // 2, 2),
+                                    (newest - 5, newest, 1)):
+            times, values = buf.decimated(start, stop, pixels)
+            assert np.all(np.diff(times) > 0)
+            indices = np.searchsorted(data[0], times)
+            assert np.array_equal(data[0, indices], times)
+            assert np.array_equal(data[1, indices], values, equal_nan=True)
+            assert np.nanmax(values) == np.nanmax(data[1])
+            assert np.nanmin(values) == np.nanmin(data[1])
+            visible = data[1, (data[0] >= start) & (data[0] <= stop)]
+            if not np.isnan(visible).all():
+                drawn = values[(times >= start) & (times <= stop)]
+                assert np.nanmax(drawn) == np.nanmax(visible)
+                assert np.nanmin(drawn) == np.nanmin(visible)
+
+
+def test_pyramid_point_count():
+    """
+    The number of points drawn depends on the number of pixels, not on the
+    number of samples.
+    """
+    buf = PyramidRingBuffer(1000000)
+    buf.extend((np.arange(1000000.), np.sin(np.arange(1000000.) / 1000)))
+    for start, stop in ((0, 999999), (500000, 600000), (500000, 500500)):
+        times, values = buf.decimated(start, stop, 1000)
+        in_range = (times >= start) & (times <= stop)
+        assert np.sum(in_range) <= min(2 * 1000 + 80, stop - start + 1)
+        assert times.size < 2 * 1000 + 200
+    # Small buffers are drawn as they are.
+    buf = PyramidRingBuffer(100)
+    buf.extend((np.arange(50.), np.arange(50.)))
+    assert buf.decimated(10, 20, 1000).shape == (2, 50)
+
+
+@pytest.mark.benchmark
+def test_pyramid_decimation_benchmark():
+    """
+    Micro-benchmark: time to select the points to draw from a 1M sample
+    buffer, compared with a copy of the samples.
+    """
+    buf = PyramidRingBuffer(1000000)
+    buf.extend((np.arange(1000000.), np.sin(np.arange(1000000.) / 1000)))
+    begin = time.time()
+    np.array(buf.valid())
+    print("Copy of the samples: {:.2f} ms".format((time.time() - begin) * 1e3))
+    for start, stop in ((0, 999999), (500000, 600000), (500000, 500500)):
+        begin = time.time()
+        times, values = buf.decimated(start, stop, 1000)
+        print("{} samples in range: {} points in {:.2f} ms".format(
+            stop - start, times.size, (time.time() - begin) * 1e3))
+
+
+def test_columns():
+    buf = ColumnRingBuffer(4, fill=10)
+    first = buf.add_column()
+    first.value = 1
+    buf.append_latest(100)
+    second = buf.add_column()
+    assert np.isnan(second.value)
+    for step in range(1, 5):
+        first.value = 1 + step
+        second.value = -step
+        buf.append_latest(100 + step)
+    assert len(buf) == 4 and len(first) == 4 and len(second) == 4
+    assert np.array_equal(first.valid(), [[101, 102, 103, 104], [2, 3, 4, 5]])
+    assert np.array_equal(second.valid(),
+                          [[101, 102, 103, 104], [-1, -2, -3, -4]])
+    # The columns are views of the storage of the buffer.
+    assert np.shares_memory(first.valid(), buf.valid())
+    assert np.shares_memory(second.view(), buf.view())
+    assert np.array_equal(second.latest(), [104, -4])
+
+    # A new column only holds the samples appended after it was added.
+    third = buf.add_column()
+    third.value = 7
+    buf.append_latest(105)
+    assert len(third) == 1
+    assert np.array_equal(third.valid(), [[105], [7]])
+    buf.remove_column(second)
+    assert buf.rows == 3 and buf.columns == [first, third]
+    assert np.array_equal(third.valid(), [[105], [7]])
+    assert np.array_equal(first.valid()[1], [3, 4, 5, 5])
+    buf.clear(fill=0)
+    assert len(first) == len(third) == 0
+
+
+def test_column_decimated():
+    buf = ColumnRingBuffer(10000)
+    column = buf.add_column()
+    values = np.sin(np.arange(10000) / 50.0)
+    values[5000] = 3
+    buf.extend(np.stack((np.arange(10000.0), values)))
+    points = column.decimated(1000, 9000, 100)
+    assert points.shape[1] < 2 * 100 + 60
+    assert points[1].max() == 3 and points[1].min() == values.min()
+    assert np.all(np.diff(points[0]) > 0)
+    # All the samples when there are few of them.
+    buf.clear()
+    buf.extend(np.stack((np.arange(50.0), values[:50])))
+    assert np.array_equal(column.decimated(0, 50, 100), column.valid())
+    # The same points as with the pyramid of a buffer of the column alone,
+    # also for a column added later and once the buffer wrapped around.
+    later = buf.add_column()
+    reference = PyramidRingBuffer(10000)
+    for step in range(3):
+        samples = np.stack((np.arange(10000.0) + 10000 * (step + 1),
+                            values[::-1], values))
+        buf.extend(samples)
+        reference.extend(samples[::2])
+        for start, stop, pixels in ((15000, 25000, 100), (0, 50000, 7)):
+            np.testing.assert_array_equal(
+                later.decimated(start, stop, pixels),
+                reference.decimated(start, stop, pixels))
@@ -0,0 +1,79 @@
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from ...utilities.shared_frames import (SharedFrameWriter, SharedFrameReader,
+                                        shared_frame_path)
+
+
+def test_shared_frame_path(tmpdir, monkeypatch):
+    monkeypatch.setattr('pydm.config.SHM_PATH', str(tmpdir))
+    assert shared_frame_path('camera') == str(tmpdir.join('camera'))
+    assert shared_frame_path('/tmp/camera') == '/tmp/camera'
+
+
+def test_write_read(tmpdir):
+    path = str(tmpdir.join('ring'))
+    writer = SharedFrameWriter(path, (3, 5), np.uint16, slots=3)
+    reader = SharedFrameReader(path)
+    assert reader.shape == (3, 5)
+    assert reader.dtype == np.uint16
+    assert reader.read() is None
+
+    for i in range(1, 8):
+        writer.write(np.full((3, 5), i))
+        frame = reader.read()
+        assert frame[0, 0] == i
+        # The frame is a read-only view of the ring, not a copy.
+        assert not frame.flags.writeable
+        assert frame.base is not None
+        # Nothing new until the next frame is written.
+        assert reader.read() is None
+
+    # Only the latest frame is read, the others are skipped.
+    writer.write(np.full((3, 5), 8))
+    writer.write(np.full((3, 5), 9))
+    assert reader.read()[0, 0] == 9
+    assert reader.counter == 9
+
+    # The producer overwriting the latest slot hides it.
+    writer.next_frame()
+    assert reader.read() is None
+
+    # Copies of the frames are not overwritten by the producer.
+    writer.write(np.full((3, 5), 10))
+    frame = reader.read(copy=True)
+    assert frame.base is None
+    assert reader.valid()
+    for i in range(11, 14):
+        writer.write(np.full((3, 5), i))
+    assert not reader.valid()
+    assert reader.valid(13)
+    assert frame[0, 0] == 10
+    writer.close()
+    assert reader.replaced()
+
+
+def test_invalid_ring(tmpdir):
+    path = tmpdir.join('not_a_ring')
+    path.write(b'\0' * 1024)
+    with pytest.raises(ValueError):
+        SharedFrameReader(str(path))
+    with pytest.raises((IOError, OSError)):
+        SharedFrameReader(str(tmpdir.join('missing')))
+
+
+def test_producer_process(tmpdir):
+    path = str(tmpdir.join('pattern'))
+    subprocess.check_call([sys.executable, '-m',
+                           'pydm.utilities.shared_frames', path,
+                           '--shape', '4', '6', '--dtype', 'int32',
+                           '--rate', '0', '--count', '5', '--keep'],
+                          stdout=subprocess.PIPE)
+    reader = SharedFrameReader(path)
+    assert reader.counter == 5
+    frame = reader.read()
+    np.testing.assert_array_equal(frame,
+                                  np.indices((4, 6)).sum(axis=0) + 4)
@@ -0,0 +1,84 @@
+import os
+import shutil
+import pytest
+
+from ...utilities.ui_cache import UiCache
+from ...display import Display
+
+# The paths to the .ui files used in these tests
+test_data_path = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "test_data")
+test_ui_path = os.path.join(test_data_path, "test.ui")
+template_ui_path = os.path.join(test_data_path, "template.ui")
+
+
+@pytest.fixture
+def ui_file(tmpdir):
+    path = str(tmpdir.join("display.ui"))
+    shutil.copy(test_ui_path, path)
+    return path
+
+
+def test_memory_cache(qtbot, ui_file):
+    cache = UiCache(path=None)
+    klass = cache.form_class(ui_file)
+    assert hasattr(klass, 'setupUi')
+    assert cache.misses == 1
+
+    assert cache.form_class(ui_file) is klass
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_disk_cache(qtbot, tmpdir, ui_file):
+    cache_dir = str(tmpdir.join("cache"))
+    cache = UiCache(path=cache_dir)
+    cache.form_class(ui_file)
+    assert cache.misses == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    # A new cache (e.g. a new process) reuses the generated code.
+    other_cache = UiCache(path=cache_dir)
+    klass = other_cache.form_class(ui_file)
+    assert hasattr(klass, 'setupUi')
+    assert other_cache.disk_hits == 1
+    assert other_cache.misses == 0
+
+
+def test_invalidated_on_change(qtbot, ui_file):
+    cache = UiCache(path=None)
+    cache.form_class(ui_file)
+    mtime = os.path.getmtime(ui_file)
+    os.utime(ui_file, (mtime + 10, mtime + 10))
+    cache.form_class(ui_file)
+    assert cache.hits == 0
+    assert cache.misses == 2
+
+
+def test_macros(qtbot, tmpdir):
+    cache = UiCache(path=str(tmpdir))
+    cache.form_class(template_ui_path, macros={'devname': 'A'})
+    cache.form_class(template_ui_path, macros={'devname': 'B'})
+    assert cache.misses == 2
+    cache.form_class(template_ui_path, macros={'devname': 'A'})
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_eviction(qtbot, tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    cache = UiCache(path=cache_dir, memory_size=1, disk_size=1)
+    cache.form_class(template_ui_path, macros={'devname': 'A'})
+    cache.form_class(template_ui_path, macros={'devname': 'B'})
+    assert len(os.listdir(cache_dir)) == 1
+    cache.form_class(template_ui_path, macros={'devname': 'A'})
+    assert cache.hits == 0
+    assert cache.misses == 3
+
+
+def test_display_uses_cache(qtbot):
+    first = Display(parent=None, ui_filename=test_ui_path)
+    qtbot.addWidget(first)
+    second = Display(parent=None, ui_filename=test_ui_path)
+    qtbot.addWidget(second)
+    assert first.retranslateUi.func is second.retranslateUi.func
@@ -0,0 +1,289 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from pyqtgraph import ImageItem, ViewBox
+
+from ...widgets.image import (PyDMImageView, ImageProcessor, ReadingOrder,
+                              ImageUpdateThread, downsample, map_to_colors,
+                              process_frame)
+from ...widgets.image_pipeline import ImagePipeline, Threshold
+
+
+def delete_image_view(image_view):
+    # The named views registered by pyqtgraph forget themselves through a
+    # slot connected to their own destroyed signal, which may crash the
+    # interpreter when the view is deleted.  Forget them beforehand, unless
+    # another view registered itself under the same name since.
+    for view_box in (image_view.getView().getViewBox(),
+                     image_view.ui.roiPlot.getPlotItem().getViewBox()):
+        view_box.destroyed.disconnect()
+        if ViewBox.NamedViews.get(view_box.name) is view_box:
+            view_box.unregister()
+    image_view.close()
+    image_view.deleteLater()
+
+
+@pytest.fixture(scope='module')
+def image_view():
+    image_view = PyDMImageView()
+    yield image_view
+    delete_image_view(image_view)
+
+
+def test_image_processing(qtbot, image_view):
+    image_view.readingOrder = ReadingOrder.Clike
+    image_view.imageWidth = 4
+    image_view.setColorMapLimits(0, 11)
+    processor = image_view.image_processor
+    processor.reset_statistics()
+    image_view.image_value_changed(np.arange(12.))
+    image_view.redrawImage()
+    qtbot.waitUntil(lambda: processor.displayed_count == 1, timeout=5000)
+    # The image is displayed as RGBA colors of the color map.
+    image = image_view.getImageItem().image
+    assert image.shape == (3, 4, 4)
+    assert image.dtype == np.ubyte
+    lut = image_view._lut
+    np.testing.assert_array_equal(image[0, 0], list(lut[0]) + [255])
+    np.testing.assert_array_equal(image[2, 3], list(lut[-1]) + [255])
+
+    # Without a new image, nothing is submitted.
+    image_view.redrawImage()
+    qtbot.wait(50)
+    assert processor.statistics()['processed'] == 1
+
+
+class InvertedImageView(PyDMImageView):
+    def process_image(self, image):
+        return image.max() - image
+
+
+def test_process_image_override(qtbot):
+    image_view = InvertedImageView()
+    try:
+        image_view.readingOrder = ReadingOrder.Clike
+        image_view.imageWidth = 4
+        image_view.setColorMapLimits(0, 11)
+        processor = image_view.image_processor
+        image_view.image_value_changed(np.arange(12.))
+        image_view.redrawImage()
+        qtbot.waitUntil(lambda: processor.displayed_count == 1,
+                        timeout=5000)
+        # The image is displayed as processed by the subclass.
+        image = image_view.getImageItem().image
+        lut = image_view._lut
+        np.testing.assert_array_equal(image[0, 0], list(lut[-1]) + [255])
+        np.testing.assert_array_equal(image[2, 3], list(lut[0]) + [255])
+
+        # And so by the deprecated update thread.
+        with pytest.warns(DeprecationWarning):
+            thread = ImageUpdateThread(image_view)
+        updates = []
+        thread.updateSignal.connect(updates.append)
+        thread.start()
+        qtbot.waitUntil(lambda: len(updates) == 1, timeout=5000)
+        thread.wait()
+        mini, maxi, image = updates[0][:3]
+        assert (mini, maxi) == (0, 11)
+        np.testing.assert_array_equal(image[0, 0], list(lut[-1]) + [255])
+    finally:
+        delete_image_view(image_view)
+
+
+def test_latest_frame_wins(qtbot, image_view, monkeypatch):
+    threads = set()
+
+    def slow_process_image(image):
+        threads.add(threading.current_thread().ident)
+        time.sleep(0.02)
+        return image
+
+    monkeypatch.setattr(image_view, 'process_image', slow_process_image)
+    image_view.imageWidth = 10
+    processor = image_view.image_processor
+    processor.reset_statistics()
+    frames = 100
+    for i in range(frames):
+        image_view.image_value_changed(np.full(100, float(i)))
+        # Redraw far faster than the images are processed.
+        if i % 2:
+            image_view.redrawImage()
+    qtbot.waitUntil(
+        lambda: processor.displayed_count + processor.dropped_count == frames,
+        timeout=10000)
+    stats = processor.statistics()
+    assert stats['received'] == frames
+    assert stats['dropped'] > 0
+    assert stats['processed'] < frames
+    # The last image is displayed, processed in a single pool thread.
+    last = map_to_colors(np.full((1, 1), frames - 1.),
+                         (image_view.cm_min, image_view.cm_max),
+                         image_view._lut)
+    np.testing.assert_array_equal(image_view.getImageItem().image[0, 0],
+                                  last[0, 0])
+    assert len(threads) == 1
+
+    processor.reset_statistics()
+    assert processor.statistics()['received'] == 0
+
+
+def test_pipeline_in_parallel(qtbot, monkeypatch):
+    # With a pipeline on two processes, two images are processed at a time.
+    pipeline = ImagePipeline([Threshold(10)], processes=2)
+    lock = threading.Lock()
+    running = [0, 0]
+    run = pipeline.run
+
+    def slow_run(image):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.1)
+        try:
+            return run(image)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(pipeline, 'run', slow_run)
+    lut = np.repeat(np.arange(256, dtype=np.ubyte)[:, None], 3, axis=1)
+    processor = ImageProcessor()
+    try:
+        for i in range(4):
+            processor.submit({'image': np.full(100, 20. + i), 'width': 10,
+                              'reading_order': ReadingOrder.Clike,
+                              'normalize': False, 'cm_min': 0,
+                              'cm_max': 30, 'lut': lut,
+                              'downsample': (1, 1),
+                              'process': lambda img: img,
+                              'pipeline': pipeline})
+            qtbot.wait(20)
+        qtbot.waitUntil(lambda: processor._workers == 0, timeout=10000)
+        assert running[1] == 2
+        stats = processor.statistics()
+        assert stats['processed'] + stats['dropped'] >= 4
+        # The latest image is the one ready to be displayed.
+        last = map_to_colors(np.full((1, 1), 23.), (0, 30), lut)
+        np.testing.assert_array_equal(processor.take()[2][0, 0], last[0, 0])
+    finally:
+        pipeline.close()
+
+
+def test_downsample():
+    image = np.arange(35.).reshape((5, 7))
+    # Blocks of 2 rows by 3 columns, the incomplete ones are left out.
+    result = downsample(image, 3, 2)
+    assert result.shape == (2, 2)
+    assert result[0, 0] == image[:2, :3].mean()
+    assert result[1, 1] == image[2:4, 3:6].mean()
+    assert downsample(image, 1, 1) is image
+    rgb = np.ones((4, 4, 3))
+    assert downsample(rgb, 2, 2).shape == (2, 2, 3)
+
+
+def test_map_to_colors():
+    lut = np.repeat(np.arange(256, dtype=np.ubyte)[:, None], 3, axis=1)
+    values = np.array([[0, 100, 200, 300]], dtype=np.uint16)
+    colors = map_to_colors(values, (100, 200), lut)
+    assert colors.shape == (1, 4, 4)
+    np.testing.assert_array_equal(colors[0, :, 0], [0, 0, 255, 255])
+    np.testing.assert_array_equal(colors[..., 3], 255)
+    # The table of the 16-bit images gives the same colors as the floats.
+    ramp = np.arange(0, 65536, 7, dtype=np.uint16).reshape((1, -1))
+    np.testing.assert_array_equal(
+        map_to_colors(ramp, (1000, 30000), lut),
+        map_to_colors(ramp.astype(float), (1000, 30000), lut))
+    floats = np.array([[np.nan, 0.5, 1.]])
+    np.testing.assert_array_equal(map_to_colors(floats, (0, 1), lut)[0, :, 0],
+                                  [0, 128, 255])
+    # Images with several channels are only scaled.
+    rgb = np.full((2, 2, 3), 50.)
+    np.testing.assert_array_equal(map_to_colors(rgb, (0, 100), lut), 128)
+
+
+def test_screen_downsampling(qtbot, image_view):
+    image_view.resize(300, 300)
+    with qtbot.waitExposed(image_view):
+        image_view.show()
+    image_view.readingOrder = ReadingOrder.Clike
+    image_view.imageWidth = 2000
+    processor = image_view.image_processor
+    processor.reset_statistics()
+    image_view.image_value_changed(np.zeros(2000 * 1200, dtype=np.uint16))
+    image_view.getView().getViewBox().setRange(xRange=(0, 2000),
+                                               yRange=(0, 1200), padding=0)
+    # Let the view apply the new range before computing the downsampling.
+    qtbot.wait(50)
+    image_view.redrawImage()
+    qtbot.waitUntil(lambda: processor.displayed_count == 1, timeout=5000)
+    item = image_view.getImageItem()
+    xds, yds = image_view._render_scale
+    assert xds > 1 and yds > 1
+    assert item.image.shape[:2] == (1200 // yds, 2000 // xds)
+    # The downsampled image covers the extent of the full image.
+    extent = item.mapRectToParent(item.boundingRect())
+    assert extent.width() == 2000 // xds * xds
+    assert extent.height() == 1200 // yds * yds
+
+    image_view.autoDownsample = False
+    image_view.redrawImage()
+    qtbot.waitUntil(lambda: processor.displayed_count == 2, timeout=5000)
+    assert item.image.shape[:2] == (1200, 2000)
+    assert item.mapRectToParent(item.boundingRect()).width() == 2000
+    image_view.autoDownsample = True
+    image_view.hide()
+
+
+def render_frame(image, size):
+    # Rendered for a 1024 pixels wide view.
+    lut = np.repeat(np.arange(256, dtype=np.ubyte)[:, None], 3, axis=1)
+    factor = max(1, size // 1024)
+    return process_frame({'image': image, 'width': size,
+                          'reading_order': ReadingOrder.Clike,
+                          'normalize': False, 'cm_min': 0, 'cm_max': 4095,
+                          'lut': lut, 'downsample': (factor, factor),
+                          'process': lambda img: img}), lut
+
+
+@pytest.mark.parametrize("size", [1024, 2048])
+def test_render(size):
+    image = np.random.randint(0, 4096, size * size).astype(np.uint16)
+    result, _ = render_frame(image, size)
+    assert result[:2] == [0, 4095]
+    assert result[2].shape == (1024, 1024, 4)
+    assert result[2].dtype == np.ubyte
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", [1024, 2048, 4096])
+def test_render_benchmark(size):
+    """
+    Micro-benchmark: rendering a 16-bit frame for a 1024 pixels wide view,
+    in the image processor and then in the GUI thread, versus rendering it
+    all in the GUI thread with pyqtgraph.
+    """
+    image = np.random.randint(0, 4096, size * size).astype(np.uint16)
+    start = time.time()
+    result, lut = render_frame(image, size)
+    worker = time.time() - start
+
+    item = ImageItem(axisOrder='row-major')
+    start = time.time()
+    item.setImage(result[2], autoLevels=False, autoDownsample=False)
+    item.render()
+    gui = time.time() - start
+
+    item = ImageItem(axisOrder='row-major')
+    start = time.time()
+    item.setLookupTable(lut)
+    item.setLevels([0, 4095])
+    item.setImage(image.reshape((size, size)), autoLevels=False,
+                  autoDownsample=False)
+    item.render()
+    gui_only = time.time() - start
+    print("{0}x{0}: worker {1:.1f} ms, GUI thread {2:.1f} ms, "
+          "GUI thread only {3:.1f} ms".format(size, worker * 1e3, gui * 1e3,
+                                              gui_only * 1e3))
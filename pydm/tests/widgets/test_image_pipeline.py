@@ -0,0 +1,153 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from ...widgets.image import ReadingOrder, process_frame
+from ...widgets.image_pipeline import (ImagePipeline, ImageStage,
+                                       BackgroundSubtraction, Threshold,
+                                       Centroid)
+
+
+class Scale(ImageStage):
+    """Stage returning a larger image than it was given."""
+    def process(self, image, outputs):
+        outputs['scaled'] = True
+        return image.astype(np.float64) * 2
+
+
+class Slow(ImageStage):
+    """Stage taking some time, returning the image plus one."""
+    def process(self, image, outputs):
+        time.sleep(0.2)
+        return image + 1
+
+
+@pytest.fixture
+def image():
+    image = np.zeros((40, 60), dtype=np.uint16)
+    image[10:20, 30:50] = 100
+    image[5, 5] = 3
+    return image
+
+
+def make_pipeline(processes):
+    background = np.ones((40, 60))
+    return ImagePipeline([BackgroundSubtraction(background), Threshold(10),
+                          Centroid()], processes=processes)
+
+
+def test_stages(image):
+    result = BackgroundSubtraction(np.ones((40, 60))).process(image, {})
+    assert result.dtype == np.float32
+    assert result[0, 0] == 0 and result[10, 30] == 99
+    # A background that does not match the image is ignored.
+    assert BackgroundSubtraction(np.ones(3)).process(image, {}) is image
+    outputs = {}
+    Centroid().process(Threshold(10).process(image.copy(), outputs), outputs)
+    np.testing.assert_allclose(outputs['centroid'], (39.5, 14.5))
+    Centroid().process(np.zeros((2, 2)), outputs)
+    assert outputs['centroid'] is None
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_pipeline(qtbot, image, processes):
+    pipeline = make_pipeline(processes)
+    try:
+        with qtbot.waitSignal(pipeline.outputsReady) as blocker:
+            result = pipeline.run(image)
+        assert result.shape == image.shape
+        assert result.dtype == np.float32
+        assert result[5, 5] == 0 and result[15, 40] == 99
+        np.testing.assert_allclose(blocker.args[0]['centroid'], (39.5, 14.5))
+        # The ring of frames follows changes of the shape of the images.
+        result = pipeline.run(np.full((4, 6), 5, dtype=np.uint16))
+        np.testing.assert_array_equal(result, 0)
+        pipeline.run(image.T)
+        stats = pipeline.statistics()
+        assert stats['images'] == 3
+        for name in ('BackgroundSubtraction', 'Threshold', 'Centroid',
+                     'pipeline'):
+            assert 0 <= stats[name]['last'] <= stats['pipeline']['mean'] * 3
+        pipeline.reset_statistics()
+        assert pipeline.statistics()['images'] == 0
+    finally:
+        pipeline.close()
+
+
+def test_pipeline_larger_result(image):
+    # Results that do not fit in the shared memory are sent back pickled.
+    pipeline = ImagePipeline([Scale()], processes=1)
+    try:
+        result = pipeline.run(image)
+        assert result.dtype == np.float64
+        np.testing.assert_array_equal(result, image * 2.)
+    finally:
+        pipeline.close()
+
+
+def test_image_view_pipeline(qtbot, image):
+    pipeline = make_pipeline(1)
+    lut = np.repeat(np.arange(256, dtype=np.ubyte)[:, None], 3, axis=1)
+    try:
+        with qtbot.waitSignal(pipeline.outputsReady):
+            result = process_frame({'image': image.ravel(), 'width': 60,
+                                    'reading_order': ReadingOrder.Clike,
+                                    'normalize': True, 'cm_min': 0,
+                                    'cm_max': 0, 'lut': lut,
+                                    'downsample': (1, 1),
+                                    'process': lambda img: img,
+                                    'pipeline': pipeline})
+        # The levels are the ones of the processed image.
+        assert result[:2] == [0, 99]
+        assert result[2][5, 5, 0] == 0
+        assert result[2][15, 40, 0] == 255
+    finally:
+        pipeline.close()
+
+
+def test_pipeline_change_while_running(image):
+    # The pool is only stopped once the image being processed is done.
+    pipeline = ImagePipeline([Slow()], processes=1)
+    results = []
+    try:
+        pipeline.run(image)
+        thread = threading.Thread(target=lambda: results.append(
+            pipeline.run(image)))
+        thread.start()
+        time.sleep(0.05)
+        pipeline.stages = [Threshold(10)]
+        pipeline.processes = 2
+        thread.join(10)
+        assert not thread.is_alive()
+        np.testing.assert_array_equal(results[0], image + 1)
+        np.testing.assert_array_equal(pipeline.run(image)[5, 5], 0)
+    finally:
+        pipeline.close()
+
+
+def test_pipeline_shared(image):
+    # Concurrent calls, e.g. from two views, use their own slot of the ring.
+    pipeline = ImagePipeline([Slow()], processes=2)
+    results = {}
+
+    def run(offset):
+        for _ in range(3):
+            results.setdefault(offset, []).append(
+                pipeline.run(image + offset))
+
+    try:
+        threads = [threading.Thread(target=run, args=(offset,))
+                   for offset in (0, 1, 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+            assert not thread.is_alive()
+        for offset, images in results.items():
+            assert len(images) == 3
+            for result in images:
+                np.testing.assert_array_equal(result, image + offset + 1)
+    finally:
+        pipeline.close()
@@ -174,3 +174,104 @@ def test_rules_invalid_expr(qtbot, caplog):
 
     dispatcher.unregister(widget)
     assert weakref.ref(widget) not in re.widget_map
+
+
+def test_rules_compiled_and_coalesced(qtbot):
+    """
+    Test that expressions are compiled at registration and that a burst of
+    triggers results in a single evaluation.
+
+    Parameters
+    ----------
+    qtbot : fixture
+        Parent of all the widgets
+    """
+    widget = PyDMLabel()
+    qtbot.addWidget(widget)
+
+    rules = [{'name': 'Rule #1', 'property': 'Opacity',
+              'expression': 'ch[0] / 10.0',
+              'channels': [{'channel': 'ca://MTEST:Float', 'trigger': True}]}]
+
+    dispatcher = RulesDispatcher()
+    dispatcher.register(widget, rules)
+
+    re = dispatcher.rules_engine
+    rule = re.widget_map[weakref.ref(widget)][0]
+    assert rule['code'] is not None
+    assert rule['env']['ch'] is rule['values']
+
+    batches = []
+    re.rules_signal.connect(batches.append)
+    try:
+        re.callback_conn(weakref.ref(widget), 0, 0, value=True)
+        with qtbot.waitSignal(re.rules_signal, timeout=1000):
+            for value in range(10):
+                re.callback_value(weakref.ref(widget), 0, 0, trigger=True,
+                                  value=value)
+        qtbot.wait(200)
+    finally:
+        re.rules_signal.disconnect(batches.append)
+        dispatcher.unregister(widget)
+
+    assert len(batches) == 1
+    assert len(batches[0]) == 1
+    assert batches[0][0]['value'] == 0.9
+
+
+def test_rules_batched(qtbot):
+    """
+    Test that the results of one evaluation cycle are sent in a single batch,
+    in the order of the rules, keeping only the value of the last rule
+    setting each widget property.
+
+    Parameters
+    ----------
+    qtbot : fixture
+        Parent of all the widgets
+    """
+    widget = PyDMLabel()
+    qtbot.addWidget(widget)
+    widget.show()
+
+    channels = [{'channel': 'ca://MTEST:Float', 'trigger': True}]
+    rules = [{'name': 'Rule #1', 'property': 'Visible',
+              'expression': 'True', 'channels': channels},
+             {'name': 'Rule #2', 'property': 'Visible',
+              'expression': 'False', 'channels': channels},
+             {'name': 'Rule #3', 'property': 'Opacity',
+              'expression': '0.5', 'channels': channels},
+             {'name': 'Rule #4', 'property': 'Opacity',
+              'expression': '0.5 +', 'channels': channels}]
+
+    dispatcher = RulesDispatcher()
+    dispatcher.register(widget, rules)
+    re = dispatcher.rules_engine
+    re.reset_statistics()
+
+    batches = []
+    payloads = []
+    re.rules_signal.connect(batches.append)
+    re.rule_signal.connect(payloads.append)
+    try:
+        with qtbot.waitSignal(re.rules_signal, timeout=1000):
+            for idx in reversed(range(len(rules))):
+                re.callback_conn(weakref.ref(widget), idx, 0, value=True)
+                re.callback_value(weakref.ref(widget), idx, 0, trigger=True,
+                                  value=1)
+        qtbot.wait(100)
+    finally:
+        re.rules_signal.disconnect(batches.append)
+        re.rule_signal.disconnect(payloads.append)
+        dispatcher.unregister(widget)
+
+    assert len(batches) == 1
+    assert [p['name'] for p in batches[0]] == ['Rule #2', 'Rule #3']
+    assert payloads == batches[0]
+    assert not widget.isVisible()
+
+    stats = re.statistics()
+    assert stats['evaluated'] == 3
+    assert stats['coalesced'] == 1
+    assert stats['dispatched'] == 2
+    assert stats['evaluated_per_second'] > 0
@@ -1,7 +1,7 @@
 import os
 import pytest
 from qtpy.QtCore import Qt
-from qtpy.QtWidgets import QApplication
+from qtpy.QtWidgets import QApplication, QScrollArea, QScrollBar
 from ...widgets import PyDMSlider, PyDMTemplateRepeater
 
 test_template_path = os.path.join(
@@ -19,4 +19,164 @@ def test_template_file(qtbot):
     assert template_repeater.count() == len(test_data)
     slider = template_repeater.findChild(PyDMSlider, "bCtrlSlider")
     assert slider is not None
-    assert slider.channel == "ca://{}:BCTRL".format(test_data[0]["devname"])
\ No newline at end of file
+    assert slider.channel == "ca://{}:BCTRL".format(test_data[0]["devname"])
+
+
+@pytest.fixture
+def simple_template(tmpdir):
+    # A template without icon widgets, with one label showing a macro.
+    test_ui_path = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "../test_data", "test.ui")
+    with open(test_ui_path) as f:
+        text = f.read()
+    path = str(tmpdir.join("simple_template.ui"))
+    with open(path, "w") as f:
+        f.write(text.replace("TextLabel", "${NAME}"))
+    return path
+
+
+def test_template_reloaded_when_modified(qtbot, simple_template):
+    # The parsed template is reused until the file is modified.
+    template_repeater = PyDMTemplateRepeater()
+    qtbot.addWidget(template_repeater)
+    template = template_repeater.template_for_file(simple_template)
+    assert template_repeater.template_for_file(simple_template) is template
+    mtime = os.path.getmtime(simple_template)
+    os.utime(simple_template, (mtime + 10, mtime + 10))
+    assert template_repeater.template_for_file(simple_template) is not template
+
+
+def test_incremental_updates(qtbot, simple_template):
+    # Test that only the instances of added or changed items are rebuilt.
+    template_repeater = PyDMTemplateRepeater()
+    qtbot.addWidget(template_repeater)
+    template_repeater.incrementalUpdates = True
+    template_repeater.dataKey = "id"
+    template_repeater.templateFilename = simple_template
+    template_repeater.data = [{"id": 1, "NAME": "a"},
+                              {"id": 2, "NAME": "b"},
+                              {"id": 3, "NAME": "c"}]
+    assert template_repeater.count() == 3
+    first, second, third = [w for _, _, w in template_repeater._instances]
+
+    template_repeater.data = [{"id": 3, "NAME": "c"},
+                              {"id": 1, "NAME": "a"},
+                              {"id": 2, "NAME": "B"},
+                              {"id": 4, "NAME": "d"}]
+    assert template_repeater.count() == 4
+    widgets = [w for _, _, w in template_repeater._instances]
+    assert widgets[0] is third
+    assert widgets[1] is first
+    assert widgets[2] is not second
+    assert widgets[3] not in (first, second, third)
+    assert [template_repeater.layout().itemAt(i).widget()
+            for i in range(4)] == widgets
+
+
+def test_removed_instances_closed(qtbot, simple_template, monkeypatch):
+    # Test that the instances removed are disconnected and taken out of the
+    # widget right away, before they are deleted.
+    closed = []
+    monkeypatch.setattr(
+        'pydm.widgets.template_repeater.close_widget_connections',
+        closed.append)
+    template_repeater = PyDMTemplateRepeater()
+    qtbot.addWidget(template_repeater)
+    template_repeater.incrementalUpdates = True
+    template_repeater.dataKey = "id"
+    template_repeater.templateFilename = simple_template
+    template_repeater.data = [{"id": 1, "NAME": "a"}, {"id": 2, "NAME": "b"}]
+    first, second = [w for _, _, w in template_repeater._instances]
+    template_repeater.data = [{"id": 1, "NAME": "a"}]
+    assert closed == [second]
+    assert second.parent() is None
+    assert second.isHidden()
+
+    template_repeater.clear()
+    assert closed == [second, first]
+    assert first.parent() is None
+
+
+def test_full_rebuild_by_default(qtbot, simple_template):
+    template_repeater = PyDMTemplateRepeater()
+    qtbot.addWidget(template_repeater)
+    template_repeater.templateFilename = simple_template
+    template_repeater.data = [{"NAME": "a"}]
+    first = template_repeater._instances[0][2]
+    template_repeater.data = [{"NAME": "a"}]
+    assert template_repeater._instances[0][2] is not first
+
+
+def test_virtualized(qtbot, simple_template):
+    # Test that only the instances in the visible area are created, and that
+    # instances scrolled out of view are cached for their row.
+    scroll_area = QScrollArea()
+    qtbot.addWidget(scroll_area)
+    scroll_area.setWidgetResizable(True)
+    scroll_area.resize(300, 200)
+    template_repeater = PyDMTemplateRepeater()
+    template_repeater.virtualized = True
+    template_repeater.overscan = 1
+    template_repeater.rowCacheLimit = 5
+    template_repeater.templateFilename = simple_template
+    scroll_area.setWidget(template_repeater)
+    template_repeater.data = [{"NAME": str(i)} for i in range(1000)]
+    scroll_area.show()
+    qtbot.waitExposed(scroll_area)
+    qtbot.wait(50)
+
+    first, last = template_repeater.visible_range()
+    assert first == 0
+    assert 1 < template_repeater.count() < 1000
+    assert sorted(template_repeater._materialized) == list(range(first,
+                                                                 last + 1))
+    assert template_repeater.minimumHeight() > 1000 * template_repeater._row_extent
+
+    bar = scroll_area.verticalScrollBar()
+    bar.setValue(bar.maximum())
+    qtbot.wait(50)
+    first, last = template_repeater.visible_range()
+    assert last == 999
+    assert sorted(template_repeater._materialized) == list(range(first,
+                                                                 last + 1))
+    assert len(template_repeater._row_cache) == 5
+
+    # Scrolling back reuses the cached instances of the rows.
+    cached = dict(template_repeater._row_cache)
+    bar.setValue(0)
+    qtbot.wait(50)
+    for index, widget in cached.items():
+        if index in template_repeater._materialized:
+            assert template_repeater._materialized[index] is widget
+
+    template_repeater.data = [{"NAME": str(i)} for i in range(20)]
+    template_repeater.virtualized = False
+    assert template_repeater.count() == 20
+
+
+def test_virtualized_scrollbars_disconnected(qtbot, simple_template):
+    # Test that the scroll bars watched while virtualized are disconnected
+    # when the repeater stops being virtualized or is deleted.
+    scroll_area = QScrollArea()
+    qtbot.addWidget(scroll_area)
+    # Only the receivers of the objects created from Python can be counted.
+    bar = QScrollBar()
+    scroll_area.setVerticalScrollBar(bar)
+    receivers = bar.receivers(bar.valueChanged)
+    template_repeater = PyDMTemplateRepeater()
+    template_repeater.virtualized = True
+    template_repeater.templateFilename = simple_template
+    scroll_area.setWidget(template_repeater)
+    template_repeater.data = [{"NAME": str(i)} for i in range(100)]
+    assert bar in template_repeater._watched_scrollbars
+    assert bar.receivers(bar.valueChanged) == receivers + 1
+
+    template_repeater.virtualized = False
+    assert template_repeater._watched_scrollbars == []
+    assert bar.receivers(bar.valueChanged) == receivers
+
+    template_repeater.virtualized = True
+    assert bar.receivers(bar.valueChanged) == receivers + 1
+    scroll_area.takeWidget().deleteLater()
+    qtbot.waitUntil(lambda: bar.receivers(bar.valueChanged) == receivers,
+                    timeout=2000)
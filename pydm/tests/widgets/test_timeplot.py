@@ -1,3 +1,5 @@
+import os
+import time
 import pytest
 from pyqtgraph import AxisItem
 from ...widgets.timeplot import TimePlotCurveItem, PyDMTimePlot, TimeAxisItem, MINIMUM_BUFFER_SIZE, DEFAULT_BUFFER_SIZE
@@ -216,3 +218,163 @@ def test_pydmtimeplot_construct(qtbot):
     assert isinstance(pydm_timeplot._bottom_axis, AxisItem)
     assert pydm_timeplot._bottom_axis.orientation == "bottom"
     assert pydm_timeplot._left_axis.orientation == "left"
+
+
+def test_pydmtimeplot_decimated_redraw(qtbot):
+    """
+    Long histories are drawn with a number of points proportional to the
+    width of the plot, at a finer resolution when the time span is shorter.
+    """
+    pydm_timeplot = PyDMTimePlot()
+    qtbot.addWidget(pydm_timeplot)
+    pydm_timeplot.resize(400, 300)
+    with qtbot.waitExposed(pydm_timeplot):
+        pydm_timeplot.show()
+    pydm_timeplot.setBufferSize(100000)
+    curve = pydm_timeplot.addYChannel(y_channel=None)
+    now = time.time()
+    times = now - 100000 + np.arange(100000.)
+    values = np.random.rand(100000)
+    values[12345] = 10
+    curve._buffer.extend((times, values))
+    pydm_timeplot.setTimeSpan(100000)
+    pydm_timeplot.redrawPlot()
+    x, y = curve.getData()
+    pixels = curve.getViewBox().width()
+    assert len(x) < 2 * pixels + 100
+    assert y.max() == 10
+
+    pydm_timeplot.setTimeSpan(100)
+    pydm_timeplot.set_needs_redraw()
+    pydm_timeplot.redrawPlot()
+    x, y = curve.getData()
+    assert np.sum(x >= times[-1] - 100) == 101
+    assert y.max() == 10
+
+
+def test_pydmtimeplot_disk_history(qtbot, monkeypatch, tmpdir):
+    """
+    With the history on disk, the samples older than the data buffer are
+    read back from the files for the visible range.
+    """
+    from ... import config
+    from ...utilities import disk_history
+    monkeypatch.setattr(config, 'HISTORY_PATH', str(tmpdir))
+    monkeypatch.setattr(disk_history, '_directory', None)
+    pydm_timeplot = PyDMTimePlot()
+    qtbot.addWidget(pydm_timeplot)
+    pydm_timeplot.resize(400, 300)
+    with qtbot.waitExposed(pydm_timeplot):
+        pydm_timeplot.show()
+    pydm_timeplot.setBufferSize(100)
+    pydm_timeplot.diskHistory = True
+    curve = pydm_timeplot.addYChannel(y_channel=None)
+    assert curve.diskHistory
+    for value in range(1000):
+        curve.receiveNewValue(value)
+    assert curve.points_accumulated == 100
+    pydm_timeplot.setTimeSpan(3600)
+    pydm_timeplot.set_needs_redraw()
+    pydm_timeplot.redrawPlot()
+    x, y = curve.getData()
+    assert y[0] == 0 and y[-1] == 999
+    pixels = curve.getViewBox().width()
+    assert 2 * pixels < 1000
+    assert len(x) <= 2 * pixels + 100
+    assert np.all(np.diff(x) >= 0)
+    paths = curve._history.segments
+    assert all(os.path.exists(path) for path in paths)
+
+    pydm_timeplot.removeYChannel(curve)
+    assert not curve.diskHistory
+    assert not any(os.path.exists(path) for path in paths)
+
+
+@pytest.mark.parametrize("async_update", [False, True])
+def test_timeplotcurveitem_receive_values(qtbot, async_update):
+    """
+    A batch of samples is appended at once, with the timestamps of their
+    source, to the data buffer and to the history on disk.
+    """
+    curve = TimePlotCurveItem()
+    curve.setBufferSize(100)
+    curve.setUpdatesAsynchronously(async_update)
+    timestamps = 1000.0 + np.arange(10)
+    values = np.arange(10, dtype=float) - 5
+    curve.receiveNewValues(timestamps, values)
+    assert curve.minY == -5 and curve.maxY == 4
+    if async_update:
+        assert curve.points_accumulated == 0
+        assert curve.latest_value == 4
+    else:
+        assert curve.points_accumulated == 10
+        np.testing.assert_array_equal(curve.data_buffer[:, -10:],
+                                      [timestamps, values])
+        assert curve.max_x() == 1009
+    curve.receiveNewValues(np.empty(0), np.empty(0))
+    assert curve.points_accumulated == (0 if async_update else 10)
+
+
+def test_timeplotcurveitem_channel_samples(qtbot):
+    """
+    The numeric values of the plugins are delivered to the curve in batches.
+    """
+    from ...data_plugins.plugin import PyDMConnection
+    curve = TimePlotCurveItem(channel_address="tst://samples")
+    curve.setBufferSize(200)
+    connection = PyDMConnection(curve.channel, "samples")
+    connection.add_listener(curve.channel)
+    connection.set_coalescing(10, deliver_all=True)
+    start = time.time()
+    for value in range(100):
+        connection.new_value_signal[float].emit(float(value))
+    qtbot.waitUntil(lambda: curve.points_accumulated == 100, timeout=1000)
+    x, y = curve._buffer.valid()
+    np.testing.assert_array_equal(y, np.arange(100))
+    assert start <= x[0] and np.all(np.diff(x) >= 0)
+    connection.remove_listener(curve.channel)
+
+
+def test_pydmtimeplot_async_columns(qtbot):
+    """
+    In Asynchronous mode, the curves share one buffer which records the
+    latest value of each of them at once.
+    """
+    pydm_timeplot = PyDMTimePlot()
+    qtbot.addWidget(pydm_timeplot)
+    pydm_timeplot.setBufferSize(50)
+    pydm_timeplot.updatesAsynchronously = True
+    curves = [pydm_timeplot.addYChannel(y_channel=None) for _ in range(100)]
+    for tick in range(3):
+        for index, curve in enumerate(curves):
+            curve.receiveNewValue(float(index + tick))
+        pydm_timeplot._record_columns()
+    for index, curve in enumerate(curves):
+        assert curve.points_accumulated == 3
+        np.testing.assert_array_equal(curve.data_buffer[1, -3:],
+                                      [index, index + 1, index + 2])
+    # One timestamp row for all the curves, viewed by each of them.
+    np.testing.assert_array_equal(curves[0].data_buffer[0],
+                                  curves[99].data_buffer[0])
+    assert np.shares_memory(curves[0].data_buffer, curves[99].data_buffer)
+
+    pydm_timeplot.removeYChannel(curves[50])
+    pydm_timeplot._record_columns()
+    assert curves[51].data_buffer[1, -1] == 53
+    assert curves[50].points_accumulated == 0
+
+    # A curve switched to Synchronous mode on its own leaves the buffer.
+    curves[1].setUpdatesAsynchronously(False)
+    assert curves[1]._column is None
+    assert len(pydm_timeplot._columns.columns) == 98
+    curves[1].receiveNewValue(5.0)
+    pydm_timeplot._record_columns()
+    assert curves[1].points_accumulated == 1
+    assert curves[1].data_buffer[1, -1] == 5.0
+
+    # The curves get their own buffers back in Synchronous mode.
+    pydm_timeplot.updatesAsynchronously = False
+    assert curves[0]._column is None
+    curves[0].receiveNewValue(1.0)
+    assert curves[0].points_accumulated == 1
+    assert not np.shares_memory(curves[0].data_buffer, curves[1].data_buffer)
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import pytest
+
+from ...widgets.waveformplot import PyDMWaveformPlot, WaveformCurveItem
+
+
+@pytest.fixture
+def plot(qtbot):
+    plot = PyDMWaveformPlot()
+    qtbot.addWidget(plot)
+    plot.resize(500, 300)
+    with qtbot.waitExposed(plot):
+        plot.show()
+    plot.addChannel(y_channel=None)
+    return plot
+
+
+def test_decimation(qtbot, plot):
+    curve = plot.curveAtIndex(0)
+    waveform = np.zeros(1000000, dtype=np.int32)
+    waveform[123456] = 100
+    waveform[654321] = -50
+    curve.receiveYWaveform(waveform)
+    plot.redrawPlot()
+    x, y = curve.getData()
+    pixels = curve.getViewBox().width()
+    assert len(x) <= 2 * pixels + 8
+    assert y.dtype == float
+    assert y.max() == 100 and y.min() == -50
+    np.testing.assert_array_equal(waveform[x.astype(int)], y)
+
+    # Zooming in draws the visible points at a finer resolution.
+    curve.getViewBox().setRange(xRange=(123300, 123700), padding=0)
+    qtbot.waitUntil(lambda: np.sum((curve.getData()[0] >= 123300) &
+                                   (curve.getData()[0] <= 123700)) == 401,
+                    timeout=5000)
+    x, y = curve.getData()
+    assert y.max() == 100 and y.min() == -50
+    assert x[0] == 0 and x[-1] == len(waveform) - 1
+    # The curve is not redrawn while its visible part stays the same.
+    plot.redrawPlot()
+    plot._view_changed()
+    assert not plot._needs_redraw
+
+    curve.decimation = False
+    curve.redrawCurve()
+    assert len(curve.getData()[0]) == len(waveform)
+    assert WaveformCurveItem(**curve.to_dict()).decimation is False
+
+
+def test_float_waveform_not_copied(plot):
+    curve = plot.curveAtIndex(0)
+    waveform = np.linspace(0, 1, 100)
+    curve.receiveYWaveform(waveform)
+    plot.redrawPlot()
+    assert np.shares_memory(curve.getData()[1], waveform)
+
+
+def test_sorted_x_waveform(qtbot, plot):
+    curve = plot.curveAtIndex(0)
+    x = np.linspace(0, 1, 100000)
+    curve.receiveXWaveform(x)
+    curve.receiveYWaveform(np.random.rand(100000))
+    curve.getViewBox().setRange(xRange=(0.25, 0.5), padding=0)
+    qtbot.wait(50)
+    pixels, start, stop = curve.decimation_window()
+    assert x[start] >= 0.25 and x[start - 1] < 0.25
+    assert x[stop - 1] <= 0.5 and x[stop] > 0.5
+    # Unsorted waveforms are not decimated, as the points are scattered.
+    curve.receiveXWaveform(x[::-1].copy())
+    assert curve.decimation_window() is None
+
+
+def test_symbols_not_decimated(qtbot, plot):
+    curve = plot.curveAtIndex(0)
+    waveform = np.random.rand(100000)
+    curve.receiveYWaveform(waveform)
+    plot.redrawPlot()
+    assert curve.decimation_window() is not None
+    # Every point gets its symbol.
+    curve.symbol = 'o'
+    assert curve.decimation_window() is None
+    assert len(curve.getData()[1]) == len(waveform)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("length", [10000, 100000, 1000000])
+def test_redraw_benchmark(plot, length):
+    """
+    Micro-benchmark: redrawing and painting a waveform with and without
+    decimation.
+    """
+    curve = plot.curveAtIndex(0)
+    waveform = np.random.randint(0, 1000, length).astype(np.int16)
+    times = []
+    for decimation in (True, False):
+        curve.decimation = decimation
+        curve.receiveYWaveform(waveform)
+        plot.redrawPlot()
+        start = time.time()
+        for _ in range(5):
+            curve.receiveYWaveform(waveform)
+            plot.redrawPlot()
+            plot.grab()
+        times.append((time.time() - start) / 5)
+    print("{} points: decimated {:.1f} ms, full {:.1f} ms".format(
+        length, times[0] * 1e3, times[1] * 1e3))
@@ -0,0 +1,249 @@
+"""
+Span tracing of the startup of PyDM and of the loading of displays.
+
+Tracing is disabled by default, in which case `trace_span` returns a shared
+no-op object and costs a single function call.  Once `enable_tracing` is
+called, the spans are recorded in memory and can be saved with `save_trace`
+as Chrome trace events, which can be opened with chrome://tracing or
+https://ui.perfetto.dev.
+
+Usage::
+
+    from pydm import tracing
+
+    with tracing.trace_span("load display", file=filename):
+        ...
+"""
+import os
+import json
+import time
+import logging
+import threading
+import functools
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+
+
+class Tracer(object):
+    """
+    Records the spans, as Chrome trace events.
+
+    Parameters
+    ----------
+    start : float, optional
+        Time from which the timestamps of the events are counted, as given by
+        time.time().  Defaults to now.
+    """
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.pid = os.getpid()
+        self.events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, end, category="pydm", args=None):
+        """
+        Record a span.
+
+        Parameters
+        ----------
+        name : str
+        start : float
+            Start of the span, as given by time.time().
+        end : float
+            End of the span, as given by time.time().
+        category : str, optional
+        args : dict, optional
+            Details shown with the span.
+        """
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X",
+                 "ts": (start - self.start) * 1e6,
+                 "dur": (end - start) * 1e6,
+                 "pid": self.pid, "tid": thread.ident}
+        if args:
+            event["args"] = dict((key, str(value))
+                                 for key, value in args.items())
+        with self._lock:
+            self._thread_names[thread.ident] = thread.name
+            self.events.append(event)
+
+    def trace_events(self):
+        """
+        The recorded events, with the names of the threads.
+
+        Returns
+        -------
+        list of dict
+        """
+        with self._lock:
+            events = list(self.events)
+            names = dict(self._thread_names)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid,
+                     "tid": tid, "args": {"name": name}}
+                    for tid, name in names.items()]
+        return metadata + events
+
+    def save(self, filename):
+        """
+        Save the recorded events as a Chrome trace file.
+
+        Parameters
+        ----------
+        filename : str
+        """
+        with open(filename, 'w') as f:
+            json.dump({"traceEvents": self.trace_events(),
+                       "displayTimeUnit": "ms"}, f)
+
+
+class Span(object):
+    """
+    A span being timed.  Use it as a context manager, or call `begin` and
+    `end`.
+    """
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def begin(self):
+        self.start = time.time()
+        return self
+
+    def end(self):
+        if self.start is not None:
+            self.tracer.add_span(self.name, self.start, time.time(),
+                                 self.category, self.args)
+            self.start = None
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, *exc_info):
+        self.end()
+        return False
+
+
+class _NullSpan(object):
+    """The span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def begin(self):
+        return self
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def trace_span(name, category="pydm", **args):
+    """
+    A span to time a block of code, as a context manager.
+
+    Parameters
+    ----------
+    name : str
+    category : str, optional
+    **args
+        Details shown with the span, e.g. the file being loaded.
+
+    Returns
+    -------
+    Span
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, category, args)
+
+
+def traced(name=None, category="pydm"):
+    """
+    Decorator tracing every call of a function as a span.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the span. Defaults to the name of the function.
+    category : str, optional
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, category, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable_tracing(start=None):
+    """
+    Start recording the spans.
+
+    Parameters
+    ----------
+    start : float, optional
+        Time from which the timestamps of the events are counted, as given by
+        time.time().  Defaults to now.
+
+    Returns
+    -------
+    Tracer
+    """
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(start)
+    return _tracer
+
+
+def disable_tracing():
+    """
+    Stop recording the spans and discard the recorded ones.
+    """
+    global _tracer
+    _tracer = None
+
+
+def is_tracing():
+    """
+    Whether or not the spans are being recorded.
+
+    Returns
+    -------
+    bool
+    """
+    return _tracer is not None
+
+
+def save_trace(filename):
+    """
+    Save the recorded spans as a Chrome trace file.
+
+    Parameters
+    ----------
+    filename : str
+    """
+    if _tracer is None:
+        logger.warning("Tracing is not enabled, %s was not written.",
+                       filename)
+        return
+    _tracer.save(filename)
+    logger.info("Trace written to %s", filename)
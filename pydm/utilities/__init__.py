@@ -13,6 +13,9 @@ from . import colors
 from .remove_protocol import remove_protocol, protocol_and_address
 from .connection import establish_widget_connections, close_widget_connections
 from .iconfont import IconFont
+from .ring_buffer import (RingBuffer, ExtremaRingBuffer, PyramidRingBuffer,
+                          ColumnRingBuffer, RingBufferColumn)
+from .decimation import minmax_indices, decimate_view
 from ..qtdesigner import DesignerHooks
 
 from . import shortcuts
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def minmax_indices(values, buckets, start=0, stop=None):
+    """
+    Indices of the samples to draw for a peak-preserving decimation of a
+    range of values.
+
+    The range is split into ``buckets`` buckets of consecutive samples and
+    the minimum and the maximum of each bucket are kept, in the order they
+    appear, so that the envelope of the signal and its peaks are drawn as
+    they would be with all the samples.  The work is done by NumPy on
+    reshaped views of the values, without Python loops.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values, as a 1D array.
+    buckets : int
+        The number of buckets, e.g. the number of pixels the range spans.
+        At most twice that number of indices are returned.
+    start : int, optional
+        The index of the first sample of the range.
+    stop : int, optional
+        The index after the last sample of the range, by default the end of
+        the values.
+
+    Returns
+    -------
+    numpy.ndarray
+        The indices of the samples to keep, in increasing order.
+    """
+    stop = len(values) if stop is None else stop
+    count = stop - start
+    if count <= 2 * buckets or count <= 2:
+        return np.arange(start, stop)
+    size = -(-count // max(int(buckets), 1))
+    full = count // size * size
+    blocks = values[start:start + full].reshape(-1, size)
+    offsets = np.arange(start, start + full, size)
+    lows = blocks.argmin(axis=1)
+    highs = blocks.argmax(axis=1)
+    indices = np.empty((len(offsets), 2), dtype=np.intp)
+    indices[:, 0] = np.minimum(lows, highs)
+    indices[:, 1] = np.maximum(lows, highs)
+    indices += offsets[:, None]
+    indices = indices.ravel()
+    if full < count:
+        tail = values[start + full:stop]
+        low, high = sorted((tail.argmin(), tail.argmax()))
+        indices = np.append(indices, (start + full + low, start + full + high))
+    return indices
+
+
+def decimate_view(values, buckets, start, stop, context=1):
+    """
+    Indices of the samples to draw for a view of a range of values.
+
+    The range is decimated with `minmax_indices` to ``buckets`` buckets.  The
+    samples before and after it are each reduced to their minimum and
+    maximum, plus the first and last samples, so that the bounds of the
+    data, used to scale the axes of the plot, are the same as with all the
+    samples.  ``context`` samples are kept on each side of the range so that
+    the lines reach the edges of the view.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values, as a 1D array.
+    buckets : int
+        The number of buckets for the range.
+    start : int
+        The index of the first sample of the range.
+    stop : int
+        The index after the last sample of the range.
+    context : int, optional
+        The number of samples kept as is on each side of the range.
+
+    Returns
+    -------
+    numpy.ndarray
+        The indices of the samples to keep, in increasing order.
+    """
+    count = len(values)
+    start = min(max(start - context, 0), count)
+    stop = max(min(stop + context, count), start)
+    if count == 0:
+        return np.arange(0)
+    return np.unique(np.concatenate((
+        [0], minmax_indices(values, 1, 0, start),
+        minmax_indices(values, buckets, start, stop),
+        minmax_indices(values, 1, stop, count), [count - 1])))
@@ -0,0 +1,231 @@
+"""
+History of (timestamp, value) samples kept in memory-mapped files, so that
+plots can keep hours of data for many curves without holding it in memory.
+
+The samples are appended to segment files of HISTORY_SEGMENT_SIZE samples,
+in a directory of HISTORY_PATH created for the process.  When a segment is
+full a new one is started, and the oldest one is removed once there are
+more than HISTORY_SEGMENTS of them.  The pages of the full segments are
+released from memory and only read back from the files when older samples
+are requested.  The files are removed when the history is closed, or when
+the process exits.
+"""
+import os
+import mmap
+import atexit
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+
+from .. import config
+from .decimation import minmax_indices
+
+logger = logging.getLogger(__name__)
+
+_RECORD_SIZE = 16
+_directory = None
+
+
+def _history_directory():
+    global _directory
+    if _directory is None or not os.path.isdir(_directory):
+        _directory = tempfile.mkdtemp(prefix='pydm-history-',
+                                      dir=config.HISTORY_PATH)
+    return _directory
+
+
+@atexit.register
+def _remove_history_directory():
+    if _directory is not None:
+        shutil.rmtree(_directory, ignore_errors=True)
+
+
+class _Segment(object):
+    """
+    A file of samples, mapped in memory.
+    """
+    def __init__(self, prefix, size):
+        fd, self.path = tempfile.mkstemp(prefix=prefix, suffix='.hist',
+                                         dir=_history_directory())
+        try:
+            os.ftruncate(fd, size * _RECORD_SIZE)
+            self._mmap = mmap.mmap(fd, size * _RECORD_SIZE)
+        finally:
+            os.close(fd)
+        self.samples = np.frombuffer(self._mmap, dtype='<f8').reshape(-1, 2)
+        self.count = 0
+
+    @property
+    def capacity(self):
+        return self.samples.shape[0]
+
+    def valid(self):
+        return self.samples[:self.count]
+
+    def release(self):
+        # The segment is full: write it out and drop its pages, they are read
+        # back from the file if needed.
+        self._mmap.flush()
+        if hasattr(self._mmap, 'madvise'):
+            self._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        self.samples = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Samples read without a copy are still referenced, the mapping
+            # is released with them.
+            pass
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DiskHistory(object):
+    """
+    History of (timestamp, value) samples in memory-mapped files, with
+    increasing timestamps.
+
+    Parameters
+    ----------
+    name : str, optional
+        A name included in the names of the files, e.g. the address of the
+        channel, to recognize them.
+    segment_size : int, optional
+        The number of samples per file, HISTORY_SEGMENT_SIZE by default.
+    segments : int, optional
+        The number of files kept, HISTORY_SEGMENTS by default.
+    """
+    def __init__(self, name='', segment_size=None, segments=None):
+        safe_name = ''.join(c if c.isalnum() else '_' for c in str(name))
+        self._prefix = 'pydm-{}-'.format(safe_name[:64])
+        self._segment_size = max(int(segment_size or
+                                     config.HISTORY_SEGMENT_SIZE), 1)
+        self._max_segments = max(int(segments or config.HISTORY_SEGMENTS), 1)
+        self._segments = []
+
+    def __len__(self):
+        return sum(segment.count for segment in self._segments)
+
+    @property
+    def segments(self):
+        """
+        The paths of the files of the history, from the oldest to the newest.
+
+        Returns
+        -------
+        list of str
+        """
+        return [segment.path for segment in self._segments]
+
+    def time_range(self):
+        """
+        The timestamps of the oldest and of the newest samples.
+
+        Returns
+        -------
+        tuple (float, float) or None
+            The timestamps, or None if the history is empty.
+        """
+        if not len(self):
+            return None
+        return (float(self._segments[0].samples[0, 0]),
+                float(self._segments[-1].samples[self._segments[-1].count - 1,
+                                                 0]))
+
+    def append(self, sample):
+        """
+        Add a sample to the history.
+
+        Parameters
+        ----------
+        sample : sequence
+            The timestamp and the value.
+        """
+        segment = self._writable_segment()
+        segment.samples[segment.count] = sample
+        segment.count += 1
+
+    def extend(self, samples):
+        """
+        Add several samples to the history at once.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            The timestamps and the values, with shape (2, number of samples).
+        """
+        samples = np.asarray(samples, dtype=float).reshape(2, -1)
+        written = 0
+        while written < samples.shape[1]:
+            segment = self._writable_segment()
+            count = min(segment.capacity - segment.count,
+                        samples.shape[1] - written)
+            segment.samples[segment.count:segment.count + count] = \
+                samples[:, written:written + count].T
+            segment.count += count
+            written += count
+
+    def _writable_segment(self):
+        if self._segments and (self._segments[-1].count <
+                               self._segments[-1].capacity):
+            return self._segments[-1]
+        if self._segments:
+            self._segments[-1].release()
+        segment = _Segment(self._prefix, self._segment_size)
+        self._segments.append(segment)
+        while len(self._segments) > self._max_segments:
+            self._segments.pop(0).close()
+        logger.debug("Started the history file %s.", segment.path)
+        return segment
+
+    def read(self, start_time, stop_time, points=None):
+        """
+        The samples with timestamps from ``start_time`` up to, but not
+        including, ``stop_time``.
+
+        Parameters
+        ----------
+        start_time : float
+        stop_time : float
+        points : int, optional
+            If given, the samples are decimated to the minimum and the maximum
+            of each of about ``points / 2`` buckets.
+
+        Returns
+        -------
+        numpy.ndarray
+            A new array with shape (2, number of samples), with the
+            timestamps and the values.
+        """
+        slices = []
+        for segment in self._segments:
+            samples = segment.valid()
+            if not len(samples) or samples[-1, 0] < start_time:
+                continue
+            if samples[0, 0] >= stop_time:
+                break
+            start, stop = np.searchsorted(samples[:, 0],
+                                          (start_time, stop_time))
+            if stop > start:
+                slices.append(samples[start:stop])
+        total = sum(len(part) for part in slices)
+        if points is not None and total > points:
+            decimated = []
+            for part in slices:
+                buckets = max(int(points * len(part) // (2 * total)), 1)
+                decimated.append(part[minmax_indices(part[:, 1], buckets)])
+            slices = decimated
+        if not slices:
+            return np.empty((2, 0))
+        return np.concatenate(slices).T.copy()
+
+    def close(self):
+        """
+        Remove the files of the history.
+        """
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
@@ -30,6 +30,29 @@ def substitute_in_file(file_path, macros):
 
 
 def replace_macros_in_template(template, macros):
+    expanded_text = _expand_template(template, macros)
+    return io.StringIO(six.text_type(expanded_text))
+
+
+def substitute_in_string(text, macros):
+    """
+    Substitute the macros given by ${name} at the given string with the entries on the `macros` dictionary.
+
+    Parameters
+    ----------
+    text : str
+        The string in which to substitute
+    macros : dict
+        Dictionary containing macro name as key and value as what will be substituted.
+    Returns
+    -------
+    str
+        The string with the proper substitutions.
+    """
+    return _expand_template(Template(text), macros)
+
+
+def _expand_template(template, macros):
     curr_template = template
     prev_template = Template("")
     expanded_text = ""
@@ -39,7 +62,7 @@ def replace_macros_in_template(template, macros):
             break
         prev_template = curr_template
         curr_template = Template(expanded_text)
-    return io.StringIO(six.text_type(expanded_text))
+    return expanded_text
 
 
 def template_for_file(file_path):
@@ -0,0 +1,699 @@
+from collections import deque
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Fixed capacity circular buffer of columns, backed by a NumPy array.
+
+    Each column holds one sample made of ``rows`` values (e.g. a timestamp
+    and a value).  Appending a sample is O(1) regardless of the capacity:
+    instead of shifting the whole array with ``np.roll``, every sample is
+    written twice, once at the head position and once at the same position
+    in a mirror half of the storage.  Thanks to that, the last ``capacity``
+    samples are always available as a single contiguous, chronologically
+    ordered view of the storage, so no copy is needed to read them back.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of samples kept in the buffer.
+    rows : int, optional
+        The number of values stored per sample.  Defaults to 1.
+    dtype : numpy.dtype, optional
+        The data type of the storage.  Defaults to float.
+    fill : scalar or sequence, optional
+        The initial value for the storage.  A sequence with one entry per
+        row can be used to fill each row with a different value.
+    """
+    def __init__(self, capacity, rows=1, dtype=float, fill=0):
+        capacity = int(capacity)
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1.")
+        self._capacity = capacity
+        self._rows = int(rows)
+        self._storage = np.empty((self._rows, 2 * capacity), dtype=dtype)
+        self._head = 0
+        self._count = 0
+        self.clear(fill)
+
+    @property
+    def capacity(self):
+        """
+        The maximum number of samples kept in the buffer.
+
+        Returns
+        -------
+        int
+        """
+        return self._capacity
+
+    @property
+    def rows(self):
+        """
+        The number of values stored per sample.
+
+        Returns
+        -------
+        int
+        """
+        return self._rows
+
+    @property
+    def head(self):
+        """
+        The storage index where the next sample will be written.
+
+        Returns
+        -------
+        int
+        """
+        return self._head
+
+    @property
+    def dtype(self):
+        return self._storage.dtype
+
+    def __len__(self):
+        return self._count
+
+    def clear(self, fill=0):
+        """
+        Discard all samples and reset the storage to the given fill value.
+
+        Parameters
+        ----------
+        fill : scalar or sequence, optional
+            The value used to fill the storage.  A sequence with one entry
+            per row can be used to fill each row with a different value.
+        """
+        if np.ndim(fill) == 0:
+            self._storage.fill(fill)
+        else:
+            self._storage[:] = np.asarray(fill).reshape(self._rows, 1)
+        self._head = 0
+        self._count = 0
+
+    def append(self, sample):
+        """
+        Add a sample to the buffer, overwriting the oldest one if the buffer
+        is full.
+
+        Parameters
+        ----------
+        sample : scalar or sequence
+            The sample to add, with one value per row.
+        """
+        head = self._head
+        self._storage[:, head] = sample
+        self._storage[:, head + self._capacity] = sample
+        head += 1
+        if head == self._capacity:
+            head = 0
+        self._head = head
+        if self._count < self._capacity:
+            self._count += 1
+
+    def extend(self, samples):
+        """
+        Add several samples to the buffer at once, overwriting the oldest
+        ones if the buffer is full.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            The samples to add, with shape (rows, number of samples), from
+            the oldest to the newest.
+        """
+        samples = np.asarray(samples).reshape(self._rows, -1)
+        count = samples.shape[1]
+        if count == 0:
+            return
+        kept = samples[:, -self._capacity:]
+        positions = (self._head + count - kept.shape[1] +
+                     np.arange(kept.shape[1])) % self._capacity
+        self._storage[:, positions] = kept
+        self._storage[:, positions + self._capacity] = kept
+        self._head = (self._head + count) % self._capacity
+        self._count = min(self._count + count, self._capacity)
+
+    def view(self):
+        """
+        The whole buffer, from the oldest to the newest storage slot.
+
+        Slots which were never written hold the fill value.  The returned
+        array is a view into the storage, so it must not be kept around
+        across appends.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array with shape (rows, capacity).
+        """
+        return self._storage[:, self._head:self._head + self._capacity]
+
+    def valid(self):
+        """
+        The samples accumulated so far, from the oldest to the newest.
+
+        Returns
+        -------
+        numpy.ndarray
+            A view with shape (rows, len(self)).
+        """
+        end = self._head + self._capacity
+        return self._storage[:, end - self._count:end]
+
+    def latest(self):
+        """
+        The most recently written storage slot.
+
+        Returns
+        -------
+        numpy.ndarray
+            A view with shape (rows,).
+        """
+        return self._storage[:, self._head + self._capacity - 1]
+
+
+class ExtremaRingBuffer(RingBuffer):
+    """
+    RingBuffer which also keeps track of the minimum and maximum value of
+    each row over the samples it currently holds.
+
+    The extrema are maintained incrementally with one monotonic queue per row
+    and per extremum, so both appending a sample and querying the extrema are
+    O(1) (amortized), and values are correctly forgotten when the sample
+    holding them is overwritten.  NaN values are ignored.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of samples kept in the buffer.
+    rows : int, optional
+        The number of values stored per sample.  Defaults to 1.
+    dtype : numpy.dtype, optional
+        The data type of the storage.  Defaults to float.
+    fill : scalar or sequence, optional
+        The initial value for the storage.
+    """
+    def __init__(self, capacity, rows=1, dtype=float, fill=0):
+        self._serial = 0
+        self._min_queues = []
+        self._max_queues = []
+        super(ExtremaRingBuffer, self).__init__(capacity, rows=rows,
+                                                dtype=dtype, fill=fill)
+
+    def clear(self, fill=0):
+        super(ExtremaRingBuffer, self).clear(fill)
+        self._serial = 0
+        self._min_queues = [deque() for _ in range(self._rows)]
+        self._max_queues = [deque() for _ in range(self._rows)]
+
+    def append(self, sample):
+        super(ExtremaRingBuffer, self).append(sample)
+        serial = self._serial
+        self._serial += 1
+        oldest = serial - self._capacity
+        # Read back the values as stored, so they are already cast to dtype.
+        values = self.latest().tolist()
+        for row in range(self._rows):
+            value = values[row]
+            min_q = self._min_queues[row]
+            max_q = self._max_queues[row]
+            if value == value:
+                while min_q and min_q[-1][1] >= value:
+                    min_q.pop()
+                min_q.append((serial, value))
+                while max_q and max_q[-1][1] <= value:
+                    max_q.pop()
+                max_q.append((serial, value))
+            if min_q and min_q[0][0] <= oldest:
+                min_q.popleft()
+            if max_q and max_q[0][0] <= oldest:
+                max_q.popleft()
+
+    def extend(self, samples):
+        samples = np.asarray(samples).reshape(self._rows, -1)
+        for index in range(samples.shape[1]):
+            self.append(samples[:, index])
+
+    def minimum(self, row=0):
+        """
+        The minimum value of a row over the samples held in the buffer.
+
+        Parameters
+        ----------
+        row : int, optional
+            The row to inspect.  Defaults to 0.
+
+        Returns
+        -------
+        float
+            The minimum, or NaN if there are no (non-NaN) samples.
+        """
+        queue = self._min_queues[row]
+        return queue[0][1] if queue else np.nan
+
+    def maximum(self, row=0):
+        """
+        The maximum value of a row over the samples held in the buffer.
+
+        Parameters
+        ----------
+        row : int, optional
+            The row to inspect.  Defaults to 0.
+
+        Returns
+        -------
+        float
+            The maximum, or NaN if there are no (non-NaN) samples.
+        """
+        queue = self._max_queues[row]
+        return queue[0][1] if queue else np.nan
+
+
+def _merge_minmax(times, values):
+    """
+    Keep the minimum and the maximum of each row of candidate points, in the
+    order they appear, as the rows of timestamps and values of the first
+    extrema and then of the second ones, or as a list for a single row.  NaN
+    values are only kept if all the values of a row are NaN.
+    """
+    if len(values) == 1:
+        # Without the overhead of NumPy for the samples appended one by one.
+        row_times = times[0].tolist()
+        row_values = values[0].tolist()
+        finite = [i for i, value in enumerate(row_values) if value == value]
+        if not finite:
+            finite = [0]
+        low = min(finite, key=row_values.__getitem__)
+        high = max(finite, key=row_values.__getitem__)
+        first, second = min(low, high), max(low, high)
+        return [row_times[first], row_values[first],
+                row_times[second], row_values[second]]
+    nans = np.isnan(values)
+    lows = np.where(nans, np.inf, values).argmin(axis=1)
+    highs = np.where(nans, -np.inf, values).argmax(axis=1)
+    picks = np.sort(np.stack((lows, highs), axis=1), axis=1)
+    rows = np.arange(len(values))[:, None]
+    merged = np.empty((4, len(values)))
+    merged[0::2] = times[rows, picks].T
+    merged[1::2] = values[rows, picks].T
+    return merged
+
+
+class _MinMaxPyramid(object):
+    """
+    The min/max pyramid of a buffer of (timestamp, value) samples, see
+    PyramidRingBuffer.  The buffer provides `capacity`, `valid` and ``len``,
+    and calls `_clear_levels` when it is cleared and `_update_levels` when
+    samples are appended.
+    """
+    MIN_LEVEL = 2
+
+    @property
+    def levels(self):
+        """
+        The levels of the pyramid, the one of index ``i`` summarizing the
+        buckets of ``2 ** (i + MIN_LEVEL)`` samples.
+
+        Returns
+        -------
+        list of RingBuffer
+            Ring buffers with the timestamp and the value of the first
+            extremum of each bucket, then those of the second.
+        """
+        return self._levels
+
+    def _clear_levels(self):
+        self._total = 0
+        self._levels = []
+        level = self.MIN_LEVEL
+        while 2 ** level <= self.capacity:
+            self._levels.append(
+                RingBuffer(self.capacity // 2 ** level + 1, rows=4))
+            level += 1
+
+    def _update_levels(self, count):
+        old = self._total
+        self._total += count
+        new = self._total
+        for index, buckets in enumerate(self._levels):
+            level = index + self.MIN_LEVEL
+            added = min((new >> level) - (old >> level), buckets.capacity)
+            if added == 0:
+                # The levels above can not have new buckets either.
+                break
+            if index == 0:
+                # From the samples, leaving out the incomplete bucket.
+                source = self.valid()
+                end = source.shape[1] - new % 2 ** level
+                # Buckets with samples which were already overwritten are
+                # left out.
+                added = min(added, end // 4)
+                chunk = source[:, end - 4 * added:end]
+                times = chunk[0].reshape(added, 4)
+                values = chunk[1].reshape(added, 4)
+            else:
+                # From pairs of buckets of the level below.
+                source = self._levels[index - 1].valid()
+                end = source.shape[1] - ((new >> (level - 1)) -
+                                         2 * (new >> level))
+                added = min(added, end // 2)
+                chunk = source[:, end - 2 * added:end]
+                times = chunk[0::2].T.reshape(added, 4)
+                values = chunk[1::2].T.reshape(added, 4)
+            merged = _merge_minmax(times, values)
+            if added == 1:
+                buckets.append(merged)
+            else:
+                buckets.extend(merged)
+
+    def _level_points(self, index, first, last):
+        # The extrema of the buckets first to last - 1 of a level, as rows of
+        # timestamps and values.
+        level = self._levels[index]
+        total = self._total >> (index + self.MIN_LEVEL)
+        data = level.valid()[:, len(level) - (total - first):
+                             len(level) - (total - last)]
+        return np.stack((data[0::2].T.ravel(), data[1::2].T.ravel()))
+
+    def _cover(self, start, stop, level, pieces):
+        # Summarize the samples start to stop - 1, counted from the first one
+        # ever appended, with the buckets of a level, and with those of the
+        # levels below for the samples at the ends of the range which are in
+        # incomplete buckets.
+        if stop <= start:
+            return
+        if level < self.MIN_LEVEL:
+            offset = len(self) - self._total
+            pieces.append(self.valid()[:, start + offset:stop + offset])
+            return
+        size = 2 ** level
+        first = -(-start // size)
+        last = stop // size
+        if first >= last:
+            self._cover(start, stop, level - 1, pieces)
+            return
+        self._cover(start, first * size, level - 1, pieces)
+        pieces.append(self._level_points(level - self.MIN_LEVEL, first, last))
+        self._cover(last * size, stop, level - 1, pieces)
+
+    def decimated(self, start_time, stop_time, pixels):
+        """
+        The samples to draw for a range of time spanning a number of pixels.
+
+        The samples in the range are summarized by the finest level of the
+        pyramid with at most about ``pixels`` buckets in the range, the ones
+        before and after it by the coarsest levels, so that the bounds of
+        the data stay the same as with all the samples.  The timestamps are
+        assumed to increase.
+
+        Parameters
+        ----------
+        start_time : float
+        stop_time : float
+        pixels : int
+
+        Returns
+        -------
+        numpy.ndarray
+            A new array with shape (2, number of points), with the timestamps
+            and the values to draw.  All the samples are returned if the
+            buffer holds at most twice as many samples as pixels.
+        """
+        valid = self.valid()
+        count = valid.shape[1]
+        pixels = max(int(pixels), 1)
+        if count <= 2 * pixels or not self._levels:
+            return np.array(valid)
+        start = int(np.searchsorted(valid[0], start_time, side='left'))
+        stop = int(np.searchsorted(valid[0], stop_time, side='right'))
+        stop = max(start, stop)
+        top = len(self._levels) - 1 + self.MIN_LEVEL
+        level = 0
+        if stop - start > 2 * pixels:
+            level = int(np.ceil(np.log2(float(stop - start) / pixels)))
+            level = min(max(level, self.MIN_LEVEL), top)
+        # The samples next to the range are kept as is, so that the lines
+        # reach the edges of the view.
+        before = max(start - 1, 0)
+        after = min(stop + 1, count)
+        offset = self._total - count
+        pieces = []
+        self._cover(offset, offset + before, top, pieces)
+        pieces.append(valid[:, before:start])
+        self._cover(offset + start, offset + stop, level, pieces)
+        pieces.append(valid[:, stop:after])
+        self._cover(offset + after, self._total, top, pieces)
+        return np.concatenate(pieces, axis=1)
+
+
+class PyramidRingBuffer(_MinMaxPyramid, RingBuffer):
+    """
+    RingBuffer of (timestamp, value) samples which also maintains a min/max
+    pyramid of the samples, to draw any range of them with a number of
+    points proportional to the number of pixels it spans rather than to the
+    number of samples.
+
+    Level ``k`` of the pyramid summarizes each bucket of ``2 ** k``
+    consecutive samples, counted from the first sample ever appended, with
+    its minimum and its maximum.  A bucket is added to a level when its last
+    sample is appended, from the two buckets of the level below, so
+    appending a sample is O(1) amortized.  The levels are ring buffers too,
+    holding as many buckets as needed to cover the samples of the buffer.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of samples kept in the buffer.
+    fill : scalar or sequence, optional
+        The initial value for the storage.
+    """
+    def __init__(self, capacity, fill=0):
+        self._total = 0
+        self._levels = []
+        super(PyramidRingBuffer, self).__init__(capacity, rows=2,
+                                                dtype=float, fill=fill)
+
+    def clear(self, fill=0):
+        super(PyramidRingBuffer, self).clear(fill)
+        self._clear_levels()
+
+    def append(self, sample):
+        super(PyramidRingBuffer, self).append(sample)
+        self._update_levels(1)
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=float).reshape(2, -1)
+        super(PyramidRingBuffer, self).extend(samples)
+        self._update_levels(samples.shape[1])
+
+
+class ColumnRingBuffer(RingBuffer):
+    """
+    RingBuffer of the samples of several channels taken at the same times.
+
+    The first row holds the timestamps, shared by all the channels, and each
+    of the next rows the values of one channel, called a column of the
+    buffer.  The value of each column is set whenever it changes, and
+    `append_latest` then records the values of all the columns with a single
+    timestamp, in a single write to the storage, whatever the number of
+    columns.  Each column is read through its `RingBufferColumn`, which
+    behaves as a buffer of (timestamp, value) samples viewing the storage.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of samples kept in the buffer.
+    fill : float, optional
+        The initial value of the timestamps.  The values are initially NaN.
+    """
+    def __init__(self, capacity, fill=np.nan):
+        self._columns = []
+        self._latest = np.full(1, np.nan)
+        super(ColumnRingBuffer, self).__init__(capacity, rows=1, dtype=float,
+                                               fill=fill)
+
+    @property
+    def columns(self):
+        """
+        The columns of the buffer, in the order of their rows.
+
+        Returns
+        -------
+        list of RingBufferColumn
+        """
+        return list(self._columns)
+
+    def clear(self, fill=np.nan):
+        super(ColumnRingBuffer, self).clear(np.nan)
+        self._storage[0] = fill
+        for column in self._columns:
+            column._clear_levels()
+
+    def add_column(self):
+        """
+        Add a column to the buffer.  Its values are NaN until it is set.
+
+        Returns
+        -------
+        RingBufferColumn
+            The column, holding the samples appended from now on.
+        """
+        self._storage = np.vstack((self._storage,
+                                   np.full((1, self._storage.shape[1]),
+                                           np.nan)))
+        self._rows += 1
+        self._latest = np.append(self._latest, np.nan)
+        column = RingBufferColumn(self)
+        self._columns.append(column)
+        return column
+
+    def remove_column(self, column):
+        """
+        Remove a column and its samples from the buffer.
+
+        Parameters
+        ----------
+        column : RingBufferColumn
+        """
+        row = self.row(column)
+        self._columns.remove(column)
+        self._storage = np.delete(self._storage, row, axis=0)
+        self._latest = np.delete(self._latest, row)
+        self._rows -= 1
+        column._buffer = None
+
+    def row(self, column):
+        """
+        The row of the storage holding the values of a column.
+
+        Parameters
+        ----------
+        column : RingBufferColumn
+
+        Returns
+        -------
+        int
+        """
+        return self._columns.index(column) + 1
+
+    def append(self, sample):
+        super(ColumnRingBuffer, self).append(sample)
+        for column in self._columns:
+            column._update_levels(1)
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=float).reshape(self._rows, -1)
+        super(ColumnRingBuffer, self).extend(samples)
+        for column in self._columns:
+            column._update_levels(samples.shape[1])
+
+    def append_latest(self, timestamp):
+        """
+        Add a sample with the current value of every column.
+
+        Parameters
+        ----------
+        timestamp : float
+        """
+        self._latest[0] = timestamp
+        self.append(self._latest)
+
+
+class RingBufferColumn(_MinMaxPyramid):
+    """
+    A column of a ColumnRingBuffer, read as a buffer of (timestamp, value)
+    samples.  The arrays returned are views of the storage of the
+    ColumnRingBuffer, as with a RingBuffer, except for `decimated`.  Each
+    column maintains a min/max pyramid of its samples, as a
+    PyramidRingBuffer, updated when the ColumnRingBuffer is appended to.
+
+    Parameters
+    ----------
+    buffer : ColumnRingBuffer
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._clear_levels()
+
+    @property
+    def value(self):
+        """
+        The value of the column recorded by the next
+        `ColumnRingBuffer.append_latest`.
+
+        Returns
+        -------
+        float
+        """
+        return self._buffer._latest[self._buffer.row(self)]
+
+    @value.setter
+    def value(self, value):
+        if value is None:
+            value = np.nan
+        self._buffer._latest[self._buffer.row(self)] = value
+
+    @property
+    def capacity(self):
+        """
+        The maximum number of samples kept in the column.
+
+        Returns
+        -------
+        int
+        """
+        return self._buffer.capacity
+
+    def __len__(self):
+        return min(len(self._buffer), self._total)
+
+    def _rows(self, data):
+        # Rows 0 and row as a view: a slice with a step instead of a copy.
+        row = self._buffer.row(self)
+        return data[0:row + 1:row]
+
+    def view(self):
+        """
+        The whole column, from the oldest to the newest storage slot.
+
+        Returns
+        -------
+        numpy.ndarray
+            A view with shape (2, capacity).
+        """
+        return self._rows(self._buffer.view())
+
+    def valid(self):
+        """
+        The samples of the column, from the oldest to the newest.
+
+        Returns
+        -------
+        numpy.ndarray
+            A view with shape (2, len(self)).
+        """
+        valid = self._rows(self._buffer.valid())
+        return valid[:, valid.shape[1] - len(self):]
+
+    def latest(self):
+        """
+        The most recently written storage slot.
+
+        Returns
+        -------
+        numpy.ndarray
+            A view with shape (2,).
+        """
+        return self._rows(self._buffer.latest())
+
+    def remove(self):
+        """
+        Remove the column and its samples from its buffer, if it was not
+        removed already.
+        """
+        if self._buffer is not None:
+            self._buffer.remove_column(self)
@@ -0,0 +1,402 @@
+"""
+Ring of frames in shared memory, written by a local producer and read by the
+shm data plugin without copying.
+
+The ring is a file, by default in /dev/shm so that it lives in memory, which
+is mapped by the producer and by the readers.  It starts with a header::
+
+    offset  size  content
+         0     8  magic, b'PYDMSHM1'
+         8     4  number of dimensions of the frames (uint32)
+        12     4  number of slots of the ring (uint32)
+        16     8  size of a slot in bytes (uint64)
+        24     8  number of frames written so far (uint64)
+        32    16  dtype of the frames, e.g. b'<u2'
+        48    32  shape of the frames, up to 4 dimensions (uint64)
+
+followed by the number of the frame held by each slot (uint64 per slot) and
+then by the slots.  Frame ``n`` (counting from 1) is written in slot
+``(n - 1) % slots``.  The producer marks the slot as empty, writes the frame,
+records its number in the slot table and then updates the frame counter, so
+a reader always finds the latest complete frame in the slot given by the
+counter.  A frame read as a view stays valid until the producer wraps around
+the ring, so use enough slots for the readers to be done with a frame before
+it is overwritten, or read copies of the frames.  `SharedFrameReader.valid`
+tells whether the frame last read was overwritten since.
+
+Running this module writes a test pattern::
+
+    python -m pydm.utilities.shared_frames camera --shape 480 640 --rate 30
+"""
+import os
+import sys
+import mmap
+import time
+import struct
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+
+from .. import config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PYDMSHM1'
+MAX_DIMS = 4
+_HEADER = struct.Struct('<8sIIQQ16s{}Q'.format(MAX_DIMS))
+_COUNTER_OFFSET = 24
+_SLOT_TABLE_OFFSET = 128
+_ALIGNMENT = 64
+
+
+def shared_frame_path(name):
+    """
+    The path of the file holding a ring of frames.
+
+    Parameters
+    ----------
+    name : str
+        The name of the ring, relative to SHM_PATH, or an absolute path.
+
+    Returns
+    -------
+    str
+    """
+    if os.path.isabs(name):
+        return name
+    return os.path.join(config.SHM_PATH, name)
+
+
+def _align(size):
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _layout(slots, slot_size):
+    data_offset = _align(_SLOT_TABLE_OFFSET + 8 * slots)
+    return data_offset, data_offset + slots * slot_size
+
+
+def _slot_view(ring, slot, shape, dtype):
+    if not 0 <= slot < ring.slots:
+        raise IndexError("No slot {} in a ring of {}.".format(slot,
+                                                             ring.slots))
+    shape = ring.shape if shape is None else tuple(shape)
+    dtype = ring.dtype if dtype is None else np.dtype(dtype)
+    count = int(np.prod(shape))
+    if count * dtype.itemsize > ring.slot_size:
+        raise ValueError("A {} {} array does not fit in a slot of {} bytes."
+                         "".format(shape, dtype, ring.slot_size))
+    offset = ring.data_offset + slot * ring.slot_size
+    return np.frombuffer(ring._mmap, dtype=dtype, count=count,
+                         offset=offset).reshape(shape)
+
+
+class SharedFrameWriter(object):
+    """
+    Producer side of a ring of frames in shared memory.
+
+    The file is created, replacing any previous one, when the writer is
+    created.
+
+    Parameters
+    ----------
+    name : str
+        The name of the ring, relative to SHM_PATH, or an absolute path.
+    shape : tuple
+        The shape of the frames.
+    dtype : numpy.dtype, optional
+        The data type of the frames.
+    slots : int, optional
+        The number of frames kept in the ring.
+    """
+    def __init__(self, name, shape, dtype=np.uint16, slots=4):
+        self.path = shared_frame_path(name)
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        if not 0 < len(self.shape) <= MAX_DIMS:
+            raise ValueError("Frames must have 1 to {} dimensions."
+                             "".format(MAX_DIMS))
+        if slots < 1:
+            raise ValueError("The ring must have at least one slot.")
+        self.slots = int(slots)
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.slot_size = _align(max(frame_size, 1))
+        self.data_offset, size = _layout(self.slots, self.slot_size)
+        self.counter = 0
+
+        # Write the header to a temporary file that is then renamed, so that
+        # readers never find a partially initialized ring.
+        directory = os.path.dirname(self.path) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.pydmshm')
+        try:
+            os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        shape_field = self.shape + (0,) * (MAX_DIMS - len(self.shape))
+        _HEADER.pack_into(self._mmap, 0, MAGIC, len(self.shape), self.slots,
+                          self.slot_size, 0, self.dtype.str.encode('ascii'),
+                          *shape_field)
+        os.rename(temp_path, self.path)
+        self._slot_table = np.frombuffer(self._mmap, dtype='<u8',
+                                         count=self.slots,
+                                         offset=_SLOT_TABLE_OFFSET)
+
+    def view(self, slot, shape=None, dtype=None):
+        """
+        A writable view of a slot of the ring.
+
+        Parameters
+        ----------
+        slot : int
+        shape : tuple, optional
+            The shape of the view, by default the shape of the frames.
+        dtype : numpy.dtype, optional
+            The data type of the view, by default the one of the frames.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        return _slot_view(self, slot, shape, dtype)
+
+    def next_frame(self):
+        """
+        The slot of the next frame, to be filled in place before calling
+        `publish`.
+
+        Returns
+        -------
+        np.ndarray
+            A writable view of the slot.
+        """
+        slot = self.counter % self.slots
+        self._slot_table[slot] = 0
+        return self.view(slot)
+
+    def publish(self):
+        """
+        Make the frame filled in the slot given by `next_frame` available to
+        the readers.
+        """
+        self.counter += 1
+        self._slot_table[(self.counter - 1) % self.slots] = self.counter
+        struct.pack_into('<Q', self._mmap, _COUNTER_OFFSET, self.counter)
+
+    def write(self, frame):
+        """
+        Copy a frame to the ring and make it available to the readers.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            A frame with the shape of the ring.
+        """
+        self.next_frame()[...] = frame
+        self.publish()
+
+    def close(self, unlink=True):
+        """
+        Unmap the ring.
+
+        Parameters
+        ----------
+        unlink : bool, optional
+            Whether to remove the file.  Readers keep their mapping.
+        """
+        self._slot_table = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views of the slots are still alive, the mapping is released
+            # with them.
+            pass
+        if unlink and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SharedFrameReader(object):
+    """
+    Reader side of a ring of frames in shared memory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the ring, relative to SHM_PATH, or an absolute path.
+    writable : bool, optional
+        Whether the frames can be modified in place, e.g. by a process
+        working on them for the producer.
+
+    Raises
+    ------
+    IOError, OSError
+        If the file can not be opened.
+    ValueError
+        If the file is not a ring of frames.
+    """
+    def __init__(self, name, writable=False):
+        self.path = shared_frame_path(name)
+        with open(self.path, 'r+b' if writable else 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _SLOT_TABLE_OFFSET:
+                raise ValueError("{} is not a ring of frames."
+                                 "".format(self.path))
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._mmap = mmap.mmap(f.fileno(), 0, access=access)
+        self._identity = (stat.st_ino, stat.st_size)
+        fields = _HEADER.unpack_from(self._mmap, 0)
+        magic, ndim, self.slots, self.slot_size = fields[:4]
+        if magic != MAGIC or not 0 < ndim <= MAX_DIMS or self.slots < 1:
+            raise ValueError("{} is not a ring of frames.".format(self.path))
+        self.dtype = np.dtype(fields[5].rstrip(b'\0').decode('ascii'))
+        self.shape = tuple(int(n) for n in fields[6:6 + ndim])
+        self.data_offset, size = _layout(self.slots, self.slot_size)
+        if len(self._mmap) < size:
+            raise ValueError("{} is truncated.".format(self.path))
+        self._slot_table = np.frombuffer(self._mmap, dtype='<u8',
+                                         count=self.slots,
+                                         offset=_SLOT_TABLE_OFFSET)
+        self.last_counter = 0
+
+    @property
+    def counter(self):
+        """
+        The number of frames written so far.
+
+        Returns
+        -------
+        int
+        """
+        return struct.unpack_from('<Q', self._mmap, _COUNTER_OFFSET)[0]
+
+    def replaced(self):
+        """
+        Whether the file was replaced or removed since it was opened, e.g.
+        because the producer started again.
+
+        Returns
+        -------
+        bool
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_ino, stat.st_size) != self._identity
+
+    def read(self, copy=False):
+        """
+        The latest frame, if it is newer than the one previously read.
+
+        Parameters
+        ----------
+        copy : bool, optional
+            Whether to return a copy of the frame instead of a view of the
+            ring, which the producer overwrites when it wraps around.
+
+        Returns
+        -------
+        np.ndarray or None
+            A read-only view or a copy of the frame in the ring, or None if
+            there is no new frame or if it was overwritten while copied.
+        """
+        counter = self.counter
+        if counter == self.last_counter or counter == 0:
+            return None
+        slot = (counter - 1) % self.slots
+        if self._slot_table[slot] != counter:
+            # The producer is already writing over it.
+            return None
+        self.last_counter = counter
+        frame = self.view(slot)
+        if copy:
+            frame = frame.copy()
+            if not self.valid():
+                # The copy may mix two frames.
+                return None
+        return frame
+
+    def valid(self, counter=None):
+        """
+        Whether a frame is still in its slot, i.e. the producer did not
+        start to write over it since it was read.
+
+        Parameters
+        ----------
+        counter : int, optional
+            The number of the frame, by default the one last read.
+
+        Returns
+        -------
+        bool
+        """
+        if counter is None:
+            counter = self.last_counter
+        if counter == 0:
+            return False
+        return self._slot_table[(counter - 1) % self.slots] == counter
+
+    def view(self, slot, shape=None, dtype=None):
+        """
+        A view of a slot of the ring, read-only unless the ring was opened
+        as writable.
+
+        Parameters
+        ----------
+        slot : int
+        shape : tuple, optional
+            The shape of the view, by default the shape of the frames.
+        dtype : numpy.dtype, optional
+            The data type of the view, by default the one of the frames.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        return _slot_view(self, slot, shape, dtype)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Write a test pattern to a ring of frames in shared "
+                    "memory, for the shm:// data plugin.")
+    parser.add_argument('name', help="Name of the ring, relative to "
+                                     "PYDM_SHM_PATH, or absolute path.")
+    parser.add_argument('--shape', type=int, nargs='+', default=[480, 640],
+                        help="Shape of the frames.")
+    parser.add_argument('--dtype', default='uint16',
+                        help="Data type of the frames.")
+    parser.add_argument('--slots', type=int, default=4,
+                        help="Number of frames kept in the ring.")
+    parser.add_argument('--rate', type=float, default=10,
+                        help="Frames written per second.")
+    parser.add_argument('--count', type=int, default=0,
+                        help="Number of frames to write, 0 for no limit.")
+    parser.add_argument('--keep', action='store_true',
+                        help="Keep the ring when done.")
+    options = parser.parse_args(args)
+
+    writer = SharedFrameWriter(options.name, options.shape, options.dtype,
+                               options.slots)
+    axes = np.indices(writer.shape).sum(axis=0)
+    period = 1.0 / options.rate if options.rate > 0 else 0
+    try:
+        while not options.count or writer.counter < options.count:
+            start = time.time()
+            # The pattern moves by one element at every frame, so that the
+            # frame number can be told from any element.
+            writer.next_frame()[...] = axes + writer.counter
+            writer.publish()
+            sys.stdout.write("{}\n".format(writer.counter))
+            sys.stdout.flush()
+            time.sleep(max(period - (time.time() - start), 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close(unlink=not options.keep)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ import logging
 from qtpy.QtWidgets import QApplication
 
 from ..config import STYLESHEET, STYLESHEET_INCLUDE_DEFAULT
+from .. import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ def clear_cache():
     __style_data = None
 
 
+@tracing.traced()
 def merge_widget_stylesheet(widget, stylesheet_file_path=None):
     curr_style = widget.styleSheet() or ""
     env_style = _get_style_data(stylesheet_file_path) or ""
@@ -0,0 +1,252 @@
+import io
+import os
+import sys
+import json
+import logging
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import six
+import qtpy
+from qtpy import uic
+
+from . import macro
+from .. import config
+from .. import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class UiCache(object):
+    """
+    Cache of the form classes generated by uic from .ui files.
+
+    Compiling a .ui file means parsing the XML, generating Python code and
+    executing it, which dominates the time needed to open a large display.
+    This cache keeps the generated form classes in memory, keyed by the file
+    path, its modification time and the macros used, and keeps the generated
+    Python code on disk, keyed by the file path, its modification time and a
+    hash of the macro-substituted text.  Both levels are bounded in size and
+    evict the least recently used entries.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory used for the on-disk cache.  If None or empty, only the
+        in-memory cache is used.
+    memory_size : int, optional
+        Maximum number of form classes kept in memory.
+    disk_size : int, optional
+        Maximum number of generated files kept on disk.
+    """
+    def __init__(self, path=None, memory_size=64, disk_size=1024):
+        self.path = path or None
+        self.memory_size = max(int(memory_size), 0)
+        self.disk_size = max(int(disk_size), 0)
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """
+        Discard the in-memory entries.  The on-disk entries are kept.
+        """
+        self._memory.clear()
+
+    def form_class(self, uifile, macros=None):
+        """
+        Get the form class for a .ui file, compiling it only if needed.
+
+        Parameters
+        ----------
+        uifile : str or file-like
+            The path to the .ui file or a file-like object with its contents.
+        macros : dict, optional
+            The macros to substitute in the file.  If None, no substitution
+            is performed.
+
+        Returns
+        -------
+        klass : type
+            The form class, which provides the setupUi and retranslateUi
+            methods.
+        """
+        if not isinstance(uifile, six.string_types):
+            return self._compile_text(uifile.read(), None)
+
+        file_path = os.path.abspath(uifile)
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            # Let the read below report the missing file.
+            mtime = None
+
+        memory_key = None
+        if mtime is not None:
+            memory_key = (file_path, mtime, self._macros_key(macros))
+            klass = self._memory.pop(memory_key, None)
+            if klass is not None:
+                self.hits += 1
+                self._memory[memory_key] = klass
+                return klass
+
+        if macros is not None:
+            with tracing.trace_span("macro.substitute_in_file", file=uifile):
+                text = macro.substitute_in_file(uifile, macros).read()
+        else:
+            with tracing.trace_span("read ui file", file=uifile):
+                with io.open(uifile, encoding='utf-8') as f:
+                    text = f.read()
+
+        klass = self._compile_text(text, file_path, mtime)
+        if memory_key is not None and self.memory_size > 0:
+            self._memory[memory_key] = klass
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+        return klass
+
+    @staticmethod
+    def _macros_key(macros):
+        if macros is None:
+            return None
+        return json.dumps(macros, sort_keys=True, default=str)
+
+    def _disk_file(self, text, file_path, mtime):
+        if not self.path or self.disk_size < 1:
+            return None
+        text_hash = hashlib.sha1(six.text_type(text).encode('utf-8'))
+        key = "|".join([str(file_path), repr(mtime), text_hash.hexdigest(),
+                        qtpy.API_NAME, str(qtpy.QT_VERSION),
+                        "{}.{}".format(*sys.version_info[:2])])
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + ".py")
+
+    def _compile_text(self, text, file_path, mtime=None):
+        disk_file = self._disk_file(text, file_path, mtime)
+        source = None
+        if disk_file is not None and os.path.isfile(disk_file):
+            try:
+                with io.open(disk_file, encoding='utf-8') as f:
+                    source = f.read()
+                # Refresh the timestamp used for the eviction.
+                os.utime(disk_file, None)
+                self.disk_hits += 1
+            except (IOError, OSError):
+                source = None
+
+        if source is None:
+            self.misses += 1
+            with tracing.trace_span("uic compile", file=file_path):
+                source = generate_ui_source(text)
+                if source is None:
+                    # No code generator available, let uic do all the work.
+                    klass, _ = uic.loadUiType(io.StringIO(six.text_type(text)))
+                    return klass
+            if disk_file is not None:
+                self._store(disk_file, source)
+
+        with tracing.trace_span("load form class", file=file_path):
+            code = compile(source, disk_file or "<ui>", 'exec')
+            return form_class_from_code(code, file_path)
+
+    def _store(self, disk_file, source):
+        try:
+            if not os.path.isdir(self.path):
+                # The cached code is executed: keep it private to the user.
+                os.makedirs(self.path, 0o700)
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+            with io.open(fd, 'w', encoding='utf-8') as f:
+                f.write(source)
+            if os.path.exists(disk_file):
+                os.remove(disk_file)
+            os.rename(temp_path, disk_file)
+        except (IOError, OSError):
+            logger.debug("Could not write the ui cache file %s.", disk_file,
+                         exc_info=True)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            entries = [os.path.join(self.path, f)
+                       for f in os.listdir(self.path) if f.endswith('.py')]
+            excess = len(entries) - self.disk_size
+            if excess <= 0:
+                return
+            entries.sort(key=os.path.getmtime)
+            for entry in entries[:excess]:
+                os.remove(entry)
+        except (IOError, OSError):
+            logger.debug("Could not evict ui cache files.", exc_info=True)
+
+
+def generate_ui_source(text):
+    """
+    Generate the Python code for the contents of a .ui file.
+
+    Parameters
+    ----------
+    text : str
+        The contents of the .ui file.
+
+    Returns
+    -------
+    source : str or None
+        The generated code, or None if the Qt binding in use does not
+        provide a code generator.
+    """
+    compile_ui = getattr(uic, 'compileUi', None)
+    if compile_ui is None:
+        return None
+    code_stream = six.StringIO()
+    compile_ui(io.StringIO(six.text_type(text)), code_stream)
+    return six.text_type(code_stream.getvalue())
+
+
+def form_class_from_code(code, file_path=None, namespace=None):
+    """
+    Execute the code generated from a .ui file and return its form class.
+
+    Parameters
+    ----------
+    code : code object
+        The compiled code.
+    file_path : str, optional
+        The .ui file the code was generated from, for error reporting.
+    namespace : dict, optional
+        Names made available to the generated code.
+
+    Returns
+    -------
+    klass : type
+    """
+    namespace = dict(namespace or {})
+    exec(code, namespace)
+    for name, obj in namespace.items():
+        if name.startswith('Ui_') and hasattr(obj, 'setupUi'):
+            return obj
+    raise ValueError("No form class found in the code generated for "
+                     "{}.".format(file_path or "the .ui data"))
+
+
+_ui_cache = None
+
+
+def get_ui_cache():
+    """
+    Get the UiCache shared by the application, configured with the
+    PYDM_UI_CACHE_PATH, PYDM_UI_CACHE_MEMORY_SIZE and
+    PYDM_UI_CACHE_DISK_SIZE environment variables.
+
+    Returns
+    -------
+    UiCache
+    """
+    global _ui_cache
+    if _ui_cache is None:
+        _ui_cache = UiCache(path=config.UI_CACHE_PATH,
+                            memory_size=config.UI_CACHE_MEMORY_SIZE,
+                            disk_size=config.UI_CACHE_DISK_SIZE)
+    return _ui_cache
@@ -1,25 +1,61 @@
-from .byte import PyDMByteIndicator
+import sys
+import importlib
 
-from .checkbox import PyDMCheckbox
-from .drawing import (PyDMDrawingLine, PyDMDrawingRectangle, PyDMDrawingTriangle,
-                      PyDMDrawingEllipse, PyDMDrawingCircle, PyDMDrawingArc,
-                      PyDMDrawingPie, PyDMDrawingChord, PyDMDrawingImage)
+# Widget class -> module defining it.  The widget modules are only imported
+# when their widget is first used, so that e.g. a display made of labels does
+# not import pyqtgraph for the plots.
+_WIDGET_MODULES = {
+    'PyDMByteIndicator': '.byte',
+    'PyDMCheckbox': '.checkbox',
+    'PyDMDrawingLine': '.drawing',
+    'PyDMDrawingRectangle': '.drawing',
+    'PyDMDrawingTriangle': '.drawing',
+    'PyDMDrawingEllipse': '.drawing',
+    'PyDMDrawingCircle': '.drawing',
+    'PyDMDrawingArc': '.drawing',
+    'PyDMDrawingPie': '.drawing',
+    'PyDMDrawingChord': '.drawing',
+    'PyDMDrawingImage': '.drawing',
+    'PyDMEmbeddedDisplay': '.embedded_display',
+    'PyDMEnumComboBox': '.enum_combo_box',
+    'PyDMImageView': '.image',
+    'PyDMLabel': '.label',
+    'PyDMLineEdit': '.line_edit',
+    'PyDMPushButton': '.pushbutton',
+    'PyDMRelatedDisplayButton': '.related_display_button',
+    'PyDMShellCommand': '.shell_command',
+    'PyDMSlider': '.slider',
+    'PyDMSpinbox': '.spinbox',
+    'PyDMSymbol': '.symbol',
+    'PyDMWaveformTable': '.waveformtable',
+    'PyDMScaleIndicator': '.scale',
+    'PyDMTimePlot': '.timeplot',
+    'PyDMWaveformPlot': '.waveformplot',
+    'PyDMScatterPlot': '.scatterplot',
+    'PyDMTabWidget': '.tab_bar',
+    'PyDMTemplateRepeater': '.template_repeater',
+}
 
-from .embedded_display import PyDMEmbeddedDisplay
-from .enum_combo_box import PyDMEnumComboBox
-from .image import PyDMImageView
-from .label import PyDMLabel
-from .line_edit import PyDMLineEdit
-from .pushbutton import PyDMPushButton
-from .related_display_button import PyDMRelatedDisplayButton
-from .shell_command import PyDMShellCommand
-from .slider import PyDMSlider
-from .spinbox import PyDMSpinbox
-from .symbol import PyDMSymbol
-from .waveformtable import PyDMWaveformTable
-from .scale import PyDMScaleIndicator
-from .timeplot import PyDMTimePlot
-from .waveformplot import PyDMWaveformPlot
-from .scatterplot import PyDMScatterPlot
-from .tab_bar import PyDMTabWidget
-from .template_repeater import PyDMTemplateRepeater
\ No newline at end of file
+__all__ = sorted(_WIDGET_MODULES)
+
+
+def _load_widget(name):
+    module = importlib.import_module(_WIDGET_MODULES[name], __name__)
+    widget = getattr(module, name)
+    globals()[name] = widget
+    return widget
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in _WIDGET_MODULES:
+            raise AttributeError("module {!r} has no attribute {!r}"
+                                 "".format(__name__, name))
+        return _load_widget(name)
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    # Module attributes can not be loaded lazily before Python 3.7.
+    for _name in __all__:
+        _load_widget(_name)
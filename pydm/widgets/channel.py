@@ -58,6 +58,16 @@ class PyDMChannel(object):
     value_slot : Slot, optional
         A function to be run when the value updates
 
+    values_slot : callable, optional
+        A function to be run with the timestamps and the values, as arrays,
+        of the numeric values received since it was last called.  When given,
+        the numeric values are no longer passed to the value_slot.
+
+    deliver_all : bool, optional
+        Whether every value must be delivered to the slots, even when the
+        connection coalesces its values, e.g. for plots which need every
+        sample.  By default only the latest value may be delivered.
+
     severity_slot : Slot, optional
         A function to be run when the severity changes
 
@@ -82,12 +92,14 @@ class PyDMChannel(object):
                  severity_slot=None, write_access_slot=None,
                  enum_strings_slot=None, unit_slot=None, prec_slot=None,
                  upper_ctrl_limit_slot=None, lower_ctrl_limit_slot=None,
-                 value_signal=None):
+                 value_signal=None, values_slot=None, deliver_all=False):
         self._address = None
         self.address = address
 
         self.connection_slot = connection_slot
         self.value_slot = value_slot
+        self.values_slot = values_slot
+        self.deliver_all = deliver_all
         self.severity_slot = severity_slot
         self.write_access_slot = write_access_slot
         self.enum_strings_slot = enum_strings_slot
@@ -130,6 +142,7 @@ class PyDMChannel(object):
         if is_qt_designer() and not config.DESIGNER_ONLINE:
             return
         try:
+            pydm.data_plugins.cancel_queued_connection(self)
             plugin = pydm.data_plugins.plugin_for_address(self.address)
             if not plugin:
                 return
@@ -143,6 +156,7 @@ class PyDMChannel(object):
             address_matched = self.address == other.address
             connection_slot_matched = self.connection_slot == other.connection_slot
             value_slot_matched = self.value_slot == other.value_slot
+            values_slot_matched = self.values_slot == other.values_slot
             severity_slot_matched = self.severity_slot == other.severity_slot
             enum_strings_slot_matched = self.enum_strings_slot == other.enum_strings_slot
             unit_slot_matched = self.unit_slot == other.unit_slot
@@ -158,6 +172,7 @@ class PyDMChannel(object):
             return (address_matched and
                     connection_slot_matched and
                     value_slot_matched and
+                    values_slot_matched and
                     severity_slot_matched and
                     enum_strings_slot_matched and
                     unit_slot_matched and
@@ -1,11 +1,17 @@
 from qtpy.QtWidgets import QActionGroup
-from qtpy.QtCore import Signal, Slot, Property, QTimer, Q_ENUMS, QThread
+from qtpy.QtCore import (Signal, Slot, Property, QTimer, Q_ENUMS, QObject,
+                         QRunnable, QThreadPool, QThread, QPointF)
+from qtpy.QtGui import QTransform
 from pyqtgraph import ImageView, PlotItem
 from pyqtgraph import ColorMap
 from pyqtgraph.graphicsItems.ViewBox.ViewBoxMenu import ViewBoxMenu
 import numpy as np
 import threading
 import logging
+import math
+import time
+import warnings
+from collections import OrderedDict
 from .channel import PyDMChannel
 from .colormaps import cmaps, cmap_names, PyDMColorMap
 from .base import PyDMWidget
@@ -19,54 +25,377 @@ class ReadingOrder(object):
     Clike = 1
 
 
+def downsample(image, xds, yds):
+    """
+    Downsample a row-major image by averaging blocks of pixels.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        The image, with the rows as the first axis.
+    xds : int
+        Number of columns averaged together.
+    yds : int
+        Number of rows averaged together.
+
+    Returns
+    -------
+    np.ndarray
+    """
+    if xds <= 1 and yds <= 1:
+        return image
+    rows = image.shape[0] // yds * yds
+    cols = image.shape[1] // xds * xds
+    image = image[:rows, :cols]
+    # Summing strided slices is much faster than averaging over the axes of
+    # a reshaped array.
+    rows_sum = image[0::yds].astype(np.result_type(image.dtype, np.float32))
+    for i in range(1, yds):
+        rows_sum += image[i::yds]
+    result = rows_sum[:, 0::xds].copy()
+    for i in range(1, xds):
+        result += rows_sum[:, i::xds]
+    result /= xds * yds
+    return result
+
+
+def map_to_colors(image, levels, lut):
+    """
+    Scale an image to its levels and map it to RGBA colors.
+
+    Single channel images are mapped through the lookup table of the color
+    map.  8 and 16-bit images are mapped through a table combining the
+    levels and the lookup table, indexed directly by the pixel values.
+    Images with several channels are only scaled to their levels.
+
+    Parameters
+    ----------
+    image : np.ndarray
+    levels : tuple
+        The values mapped to the first and the last color.
+    lut : np.ndarray
+        The lookup table of the color map, with a row of RGB or RGBA values
+        per color.
+
+    Returns
+    -------
+    np.ndarray
+        The RGBA image, as unsigned bytes.
+    """
+    mini = float(levels[0])
+    maxi = float(levels[1])
+    if image.ndim != 2:
+        scale = 256. / max(maxi - mini, 1e-12)
+        image = np.nan_to_num((image - mini) * scale)
+        return np.clip(image, 0, 255).astype(np.ubyte)
+    colors = np.empty((len(lut), 4), dtype=np.ubyte)
+    colors[:, 3] = 255
+    colors[:, :lut.shape[1]] = lut
+    # Each color is looked up as a single 32-bit word.
+    colors = colors.view(np.uint32).ravel()
+    scale = len(colors) / max(maxi - mini, 1e-12)
+    if image.dtype in (np.uint8, np.uint16):
+        values = np.arange(np.iinfo(image.dtype).max + 1)
+        indexes = np.clip((values - mini) * scale, 0, len(colors) - 1)
+        rgba = colors.take(indexes.astype(np.intp)).take(image)
+    else:
+        indexes = np.clip(np.nan_to_num((image - mini) * scale),
+                          0, len(colors) - 1)
+        rgba = colors.take(indexes.astype(np.intp))
+    return rgba.view(np.ubyte).reshape(image.shape + (4,))
+
+
+def process_frame(frame):
+    """
+    Reshape, process and render an image submitted to an ImageProcessor.
+
+    The image is scaled to the levels, downsampled and mapped to the colors
+    of the color map, so that it only has to be drawn by the GUI thread.
+
+    Parameters
+    ----------
+    frame : dict
+        The image and the settings of the view needed to draw it.
+
+    Returns
+    -------
+    list or None
+        The color map limits, the RGBA image and the downsampling factors
+        along x and y, or None if the image can not be drawn.
+    """
+    img = frame['image']
+    width = frame['width']
+    if len(img.shape) == 1:
+        if width < 1:
+            # We don't have a width for this image yet, so we can't draw it
+            logger.debug("ImageProcessor - no width available. Aborting.")
+            return None
+        try:
+            if frame['reading_order'] == ReadingOrder.Clike:
+                img = img.reshape((-1, width), order='C')
+            else:
+                img = img.reshape((width, -1), order='F')
+        except ValueError:
+            logger.error("Invalid width for image during reshape: %d", width)
+
+    if len(img) <= 0:
+        return None
+    img = frame['process'](img)
+    pipeline = frame.get('pipeline')
+    if pipeline is not None:
+        img = pipeline.run(img)
+    if frame['normalize']:
+        mini = img.min()
+        maxi = img.max()
+    else:
+        mini = frame['cm_min']
+        maxi = frame['cm_max']
+    xds, yds = frame['downsample']
+    if img.ndim < 2:
+        xds = yds = 1
+    else:
+        xds = max(1, min(xds, img.shape[1]))
+        yds = max(1, min(yds, img.shape[0]))
+    img = downsample(img, xds, yds)
+    return [mini, maxi, map_to_colors(img, (mini, maxi), frame['lut']),
+            (xds, yds)]
+
+
+_image_pool = None
+
+
+def image_thread_pool():
+    """
+    The pool of threads shared by the image views to process their images.
+    The threads are kept alive, so that no thread is created per image.
+
+    Returns
+    -------
+    QThreadPool
+    """
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = QThreadPool()
+        _image_pool.setExpiryTimeout(-1)
+    return _image_pool
+
+
+class _ImageProcessorTask(QRunnable):
+    def __init__(self, processor):
+        super(_ImageProcessorTask, self).__init__()
+        self.processor = processor
+
+    def run(self):
+        self.processor.drain()
+
+
 class ImageUpdateThread(QThread):
+    """
+    Processes the current image of a PyDMImageView once.
+
+    .. deprecated::
+       The images are processed by the `ImageProcessor` of the view, in the
+       shared image thread pool.  This thread is only kept for the code
+       which runs it directly.
+
+    `updateSignal` is emitted with the color map limits, the RGBA image and
+    the downsampling factors, as returned by `process_frame`.
+
+    Parameters
+    ----------
+    image_view : PyDMImageView
+        The view whose image is processed.
+    """
     updateSignal = Signal(list)
 
     def __init__(self, image_view):
+        warnings.warn("'ImageUpdateThread' is deprecated, the images are "
+                      "processed by 'PyDMImageView.image_processor'.",
+                      DeprecationWarning, stacklevel=2)
         QThread.__init__(self)
         self.image_view = image_view
+        self._frame = None
+
+    def start(self, *args):
+        # The settings of the view are read in the GUI thread.
+        self._frame = self.image_view._frame()
+        QThread.start(self, *args)
 
     def run(self):
-        img = self.image_view.image_waveform
-        needs_redraw = self.image_view.needs_redraw
-        image_dimensions = len(img.shape)
-        width = self.image_view.imageWidth
-        reading_order = self.image_view.readingOrder
-        normalize_data = self.image_view._normalize_data
-        cm_min = self.image_view.cm_min
-        cm_max = self.image_view.cm_max
-
-        if not needs_redraw:
-            logging.debug("ImageUpdateThread - needs redraw is False. Aborting.")
+        if self._frame is None:
             return
-        if image_dimensions == 1:
-            if width < 1:
-                # We don't have a width for this image yet, so we can't draw it
-                logging.debug(
-                    "ImageUpdateThread - no width available. Aborting.")
+        data = process_frame(self._frame)
+        if data is not None:
+            self.updateSignal.emit(data)
+
+
+class ImageProcessor(QObject):
+    """
+    Processes the images of a PyDMImageView in the shared image thread pool.
+
+    The images are submitted to a single slot: an image submitted before the
+    previous one was picked up by the worker replaces it, so that the worker
+    always processes the latest image.  The output is double-buffered: the
+    worker writes the processed image to the ready buffer while the view
+    displays the previous one, and `frameReady` is emitted when the ready
+    buffer is filled.  An image replaced in either slot before it is
+    displayed is counted as dropped.
+
+    When the images go through an ImagePipeline running on processes, up to
+    one image per process is processed at a time, so that the processes work
+    on consecutive images in parallel.  An image whose processing ends after
+    the one of a newer image is dropped.
+
+    Signals
+    -------
+    frameReady
+        Emitted when a processed image is ready to be taken with `take`.
+    """
+    frameReady = Signal()
+
+    def __init__(self, parent=None):
+        super(ImageProcessor, self).__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._ready = None
+        # Number of workers draining the images, their maximum, and order of
+        # the submitted and of the latest processed images.
+        self._workers = 0
+        self._max_workers = 1
+        self._submitted = 0
+        self._latest = 0
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        """
+        Reset the counters of received, processed, displayed and dropped
+        images.
+        """
+        with self._lock:
+            self.statistics_start = time.time()
+            self.received_count = 0
+            self.processed_count = 0
+            self.displayed_count = 0
+            self.dropped_count = 0
+
+    def statistics(self):
+        """
+        The counters of images received by the view, processed by the
+        worker, displayed, and dropped because a newer image replaced them
+        or because they could not be drawn, since the last call to
+        `reset_statistics`.
+
+        Returns
+        -------
+        dict
+            The counters and their rates per second.
+        """
+        with self._lock:
+            elapsed = max(time.time() - self.statistics_start, 1e-6)
+            stats = OrderedDict()
+            for name in ('received', 'processed', 'displayed', 'dropped'):
+                count = getattr(self, '{}_count'.format(name))
+                stats[name] = count
+                stats['{}_per_second'.format(name)] = count / elapsed
+        return stats
+
+    def receive(self, replaced=False):
+        """
+        Count an image received by the view.
+
+        Parameters
+        ----------
+        replaced : bool, optional
+            Whether the image replaced one that was not submitted yet.
+        """
+        with self._lock:
+            self.received_count += 1
+            if replaced:
+                self.dropped_count += 1
+
+    def submit(self, frame):
+        """
+        Submit an image to be processed, replacing the one waiting for the
+        worker, if any.
+
+        Parameters
+        ----------
+        frame : dict
+            The image and the settings needed to draw it, see
+            `process_frame`.
+        """
+        pipeline = frame.get('pipeline')
+        with self._lock:
+            if self._pending is not None:
+                self.dropped_count += 1
+            self._submitted += 1
+            self._pending = (self._submitted, frame)
+            self._max_workers = 1
+            if pipeline is not None and pipeline.stages:
+                self._max_workers = max(pipeline.processes, 1)
+            if self._workers >= self._max_workers:
                 return
+            self._workers += 1
+        pool = image_thread_pool()
+        if pool.maxThreadCount() < self._max_workers:
+            # The threads mostly wait for the processes of the pipeline.
+            pool.setMaxThreadCount(self._max_workers)
+        pool.start(_ImageProcessorTask(self))
+
+    def drain(self):
+        """
+        Process the submitted images until there are no more.  This runs in
+        the image thread pool.
+        """
+        while True:
+            with self._lock:
+                pending = self._pending
+                if pending is None or self._workers > self._max_workers:
+                    # Done, or more workers than needed after the pipeline
+                    # changed: the pending image is left to the others.
+                    self._workers -= 1
+                    return
+                self._pending = None
+            number, frame = pending
             try:
-                if reading_order == ReadingOrder.Clike:
-                    img = img.reshape((-1, width), order='C')
-                else:
-                    img = img.reshape((width, -1), order='F')
-            except ValueError:
-                logger.error("Invalid width for image during reshape: %d", width)
-
-        if len(img) <= 0:
-            return
-        logging.debug("ImageUpdateThread - Will Process Image")
-        img = self.image_view.process_image(img)
-        if normalize_data:
-            mini = img.min()
-            maxi = img.max()
-        else:
-            mini = cm_min
-            maxi = cm_max
-        logging.debug("ImageUpdateThread - Emit Update Signal")
-        self.updateSignal.emit([mini, maxi, img])
-        logging.debug("ImageUpdateThread - Set Needs Redraw -> False")
-        self.image_view.needs_redraw = False
+                result = process_frame(frame)
+            except Exception:
+                logger.exception("Error while processing the image.")
+                result = None
+            with self._lock:
+                self.processed_count += 1
+                if result is None or number < self._latest:
+                    # Not drawable, or a newer image was processed first.
+                    self.dropped_count += 1
+                    continue
+                self._latest = number
+                notify = self._ready is None
+                if not notify:
+                    self.dropped_count += 1
+                self._ready = result
+            if notify:
+                try:
+                    self.frameReady.emit()
+                except RuntimeError:
+                    # The view was deleted.
+                    pass
+
+    def take(self):
+        """
+        Take the latest processed image.
+
+        Returns
+        -------
+        list or None
+            The color map limits and the image, or None if no new image was
+            processed.
+        """
+        with self._lock:
+            result = self._ready
+            self._ready = None
+            if result is not None:
+                self.displayed_count += 1
+        return result
 
 
 class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
@@ -113,6 +442,11 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         self._normalize_data = False
         self._auto_downsample = True
         self._show_axes = False
+        self._lut = np.repeat(np.arange(256, dtype=np.ubyte)[:, None], 3,
+                              axis=1)
+        self._render_scale = (1, 1)
+        self._needs_render = False
+        self._pipeline = None
 
         # Set default reading order of numpy array data to Fortranlike.
         self._reading_order = ReadingOrder.Fortranlike
@@ -127,10 +461,13 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         ImageView.__init__(self, parent, view=plot_item)
         PyDMWidget.__init__(self)
         self._channels = [None, None]
-        self.thread = None
+        self.image_processor = ImageProcessor(self)
+        self.image_processor.frameReady.connect(self.__updateDisplay)
         self.axes = dict({'t': None, "x": 0, "y": 1, "c": None})
         self.showAxes = self._show_axes
         self.imageItem.setOpts(axisOrder="row-major")
+        self.getView().getViewBox().sigTransformChanged.connect(
+            self._view_transform_changed)
 
         # Hide some itens of the widget.
         self.ui.histogram.hide()
@@ -315,8 +652,10 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
             pos = np.linspace(0.0, 1.0, num=len(self._cm_colors))
             cmap = ColorMap(pos, self._cm_colors)
         self.getView().getViewBox().setBackgroundColor(cmap.map(0))
-        lut = cmap.getLookupTable(0.0, 1.0, alpha=False)
-        self.getImageItem().setLookupTable(lut)
+        # The colors are applied by the image processor, render the current
+        # image again with the new ones.
+        self._lut = cmap.getLookupTable(0.0, 1.0, alpha=False)
+        self._needs_render = self.image_waveform.size > 0
 
     @Slot(bool)
     def image_connection_state_changed(self, conn):
@@ -351,6 +690,7 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         if new_image is None or new_image.size == 0:
             return
         logging.debug("ImageView Received New Image - Needs Redraw -> True")
+        self.image_processor.receive(replaced=self.needs_redraw)
         self.image_waveform = new_image
         self.needs_redraw = True
 
@@ -375,8 +715,8 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         displayed at the widget.
 
         .. warning::
-           This code runs in a separated QThread so it **MUST** not try to write
-           to QWidgets.
+           This code runs in a thread of the image thread pool so it **MUST**
+           not try to write to QWidgets.
 
         Parameters
         ----------
@@ -390,37 +730,118 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         """
         return image
 
+    @property
+    def pipeline(self):
+        """
+        The pipeline of processing stages run on the images after
+        `process_image`, in the image thread pool or in its own processes.
+
+        Returns
+        -------
+        ImagePipeline or None
+        """
+        return self._pipeline
+
+    @pipeline.setter
+    def pipeline(self, pipeline):
+        """
+        The pipeline of processing stages run on the images after
+        `process_image`, in the image thread pool or in its own processes.
+
+        Parameters
+        ----------
+        pipeline : ImagePipeline or None
+        """
+        self._pipeline = pipeline
+        self._needs_render = self.image_waveform.size > 0
+
     def redrawImage(self):
         """
         Set the image data into the ImageItem, if needed.
 
-        If necessary, reshape the image to 2D first.
+        If necessary, reshape the image to 2D first.  The image is processed
+        by the image processor of the view, in a thread of the image thread
+        pool, which also scales it to the color map limits, downsamples it to
+        the resolution of the screen and maps it to the colors of the color
+        map.  It is displayed when it is ready.
         """
-        if self.thread is not None and not self.thread.isFinished():
-            logger.warning(
-                "Image processing has taken longer than the refresh rate.")
+        if not (self.needs_redraw or self._needs_render):
             return
-        self.thread = ImageUpdateThread(self)
-        self.thread.updateSignal.connect(self.__updateDisplay)
-        logging.debug("ImageView RedrawImage Thread Launched")
-        self.thread.start()
+        self.needs_redraw = False
+        self._needs_render = False
+        logging.debug("ImageView RedrawImage Submit Image")
+        self.image_processor.submit(self._frame())
 
-    @Slot(list)
-    def __updateDisplay(self, data):
+    def _frame(self):
+        """
+        The current image and the settings of the view needed to draw it,
+        as submitted to the image processor.
+
+        Returns
+        -------
+        dict
+        """
+        return {'image': self.image_waveform,
+                'width': self.imageWidth,
+                'reading_order': self.readingOrder,
+                'normalize': self._normalize_data,
+                'cm_min': self.cm_min,
+                'cm_max': self.cm_max,
+                'lut': self._lut,
+                'downsample': self._downsample_factors(),
+                'process': self.process_image,
+                'pipeline': self._pipeline}
+
+    def _downsample_factors(self):
+        """
+        The number of image pixels per screen pixel along x and y, with
+        which the image is downsampled if autoDownsample is enabled.
+
+        Returns
+        -------
+        tuple
+        """
+        if not self._auto_downsample:
+            return (1, 1)
+        item = self.getImageItem()
+        origin = item.mapToDevice(QPointF(0, 0))
+        if origin is None:
+            return (1, 1)
+        factors = []
+        # The item is scaled by the downsampling of the displayed image.
+        for point, scale in ((QPointF(1, 0), self._render_scale[0]),
+                             (QPointF(0, 1), self._render_scale[1])):
+            delta = item.mapToDevice(point) - origin
+            length = math.hypot(delta.x(), delta.y()) / scale
+            factors.append(max(1, int(1.0 / length)) if length > 0 else 1)
+        return tuple(factors)
+
+    def _view_transform_changed(self, *args):
+        # Render the image again if zooming or resizing changed how much it
+        # must be downsampled.
+        if (self._auto_downsample and self.image_waveform.size > 0 and
+                self._downsample_factors() != self._render_scale):
+            self._needs_render = True
+
+    @Slot()
+    def __updateDisplay(self):
+        data = self.image_processor.take()
+        if data is None:
+            return
         logging.debug("ImageView Update Display with new image")
-        mini, maxi = data[0], data[1]
-        img = data[2]
-        self.getImageItem().setLevels([mini, maxi])
-        self.getImageItem().setImage(
-            img,
-            autoLevels=False,
-            autoDownsample=self.autoDownsample)
+        img, scale = data[2], data[3]
+        if scale != self._render_scale:
+            # Draw the downsampled image over the extent of the full image.
+            self._render_scale = scale
+            self.getImageItem().setTransform(QTransform.fromScale(*scale))
+        self.getImageItem().setImage(img, autoLevels=False,
+                                     autoDownsample=False)
 
     @Property(bool)
     def autoDownsample(self):
         """
-        Return if we should or not apply the
-        autoDownsample option to PyQtGraph.
+        Return if we should or not downsample the images to the
+        resolution of the screen before displaying them.
 
         Return
         ------
@@ -431,8 +852,9 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
     @autoDownsample.setter
     def autoDownsample(self, new_value):
         """
-        Whether we should or not apply the
-        autoDownsample option to PyQtGraph.
+        Whether we should or not downsample the images to the
+        resolution of the screen before displaying them.  The ImageItem then
+        holds the downsampled image, scaled to the extent of the full image.
 
         Parameters
         ----------
@@ -440,6 +862,7 @@ class PyDMImageView(ImageView, PyDMWidget, PyDMColorMap, ReadingOrder):
         """
         if new_value != self._auto_downsample:
             self._auto_downsample = new_value
+            self._needs_render = self.image_waveform.size > 0
 
     @Property(int)
     def imageWidth(self):
@@ -0,0 +1,431 @@
+"""
+Processing pipelines for the images of PyDMImageView.
+
+A pipeline is a list of stages run on every image, after it is reshaped and
+before it is displayed.  Stages return the processed image and may publish
+scalar outputs, e.g. a centroid, which are delivered to the GUI thread by the
+`ImagePipeline.outputsReady` signal.
+
+By default the stages run in the image thread.  CPU-heavy stages can instead
+run in a pool of processes, so that they are not limited by the GIL and do
+not slow down the GUI.  The images are then passed to the processes through
+a ring of frames in shared memory, with one slot per process, and the
+processed image is written back in place when it fits.  The image views keep
+up to one image per process in flight, so that consecutive images are
+processed in parallel, and the processed images and the outputs are
+delivered to the GUI thread as they are ready.  The processes are started
+as new interpreters rather than forked from the display, and the stages are
+sent to them once, when the pool is started, so they must be picklable.
+
+Usage::
+
+    from pydm.widgets.image_pipeline import (ImagePipeline,
+                                             BackgroundSubtraction, Centroid)
+
+    pipeline = ImagePipeline([BackgroundSubtraction(background), Centroid()],
+                             processes=2)
+    pipeline.outputsReady.connect(show_centroid)
+    image_view.pipeline = pipeline
+"""
+import os
+import time
+import logging
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+import numpy as np
+from qtpy.QtCore import QObject, Signal
+from qtpy.QtWidgets import QApplication
+
+from ..utilities.shared_frames import SharedFrameWriter, SharedFrameReader
+
+logger = logging.getLogger(__name__)
+
+
+class ImageStage(object):
+    """
+    A stage of an ImagePipeline.
+
+    Subclasses implement `process`.  Stages run in the processes of the pool
+    of a pipeline must be picklable, e.g. defined at the top level of a
+    module.
+    """
+    @property
+    def name(self):
+        """
+        The name of the stage, used for its timing and its outputs.
+
+        Returns
+        -------
+        str
+        """
+        return type(self).__name__
+
+    def process(self, image, outputs):
+        """
+        Process an image.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image, as a 2D array.  It may be modified in place.
+        outputs : dict
+            Scalar outputs of the pipeline for this image, to which the stage
+            can add its own.
+
+        Returns
+        -------
+        np.ndarray
+            The processed image.
+        """
+        return image
+
+
+class BackgroundSubtraction(ImageStage):
+    """
+    Subtract a background image, clipping the result at zero.
+
+    Parameters
+    ----------
+    background : np.ndarray
+    """
+    def __init__(self, background):
+        self.background = np.asarray(background)
+
+    def process(self, image, outputs):
+        if image.shape != self.background.shape:
+            logger.debug("Background of shape %s does not match the image "
+                         "of shape %s.", self.background.shape, image.shape)
+            return image
+        result = image.astype(np.result_type(image.dtype, np.float32))
+        result -= self.background
+        np.maximum(result, 0, out=result)
+        return result
+
+
+class Threshold(ImageStage):
+    """
+    Set the pixels below a level to zero.
+
+    Parameters
+    ----------
+    level : float
+    """
+    def __init__(self, level):
+        self.level = level
+
+    def process(self, image, outputs):
+        if not image.flags.writeable:
+            image = image.copy()
+        image[image < self.level] = 0
+        return image
+
+
+class Centroid(ImageStage):
+    """
+    Compute the intensity-weighted centroid of the image, published as the
+    ``centroid`` output: the column and the row, or None for a blank image.
+    """
+    def process(self, image, outputs):
+        total = float(image.sum())
+        if total == 0:
+            outputs['centroid'] = None
+            return image
+        rows = image.sum(axis=1, dtype=float)
+        cols = image.sum(axis=0, dtype=float)
+        outputs['centroid'] = (np.dot(cols, np.arange(len(cols))) / total,
+                               np.dot(rows, np.arange(len(rows))) / total)
+        return image
+
+
+def run_stages(stages, image):
+    """
+    Run stages on an image.
+
+    Parameters
+    ----------
+    stages : list of ImageStage
+    image : np.ndarray
+
+    Returns
+    -------
+    tuple (np.ndarray, dict, dict)
+        The processed image, the outputs of the stages, and the time spent
+        in each stage, in seconds.
+    """
+    outputs = OrderedDict()
+    timings = OrderedDict()
+    for stage in stages:
+        start = time.time()
+        image = stage.process(image, outputs)
+        timings[stage.name] = time.time() - start
+    return image, outputs, timings
+
+
+# State of the pool processes: the stages of their pipeline and the rings
+# of frames they mapped.
+_worker_stages = None
+_worker_rings = {}
+
+
+def _init_worker(stages):
+    global _worker_stages
+    _worker_stages = stages
+
+
+def _process_in_worker(path, slot):
+    ring = _worker_rings.get(path)
+    if ring is None:
+        # Forget the rings the pipeline replaced.
+        for old_path in list(_worker_rings):
+            if _worker_rings[old_path].replaced():
+                del _worker_rings[old_path]
+        ring = _worker_rings[path] = SharedFrameReader(path, writable=True)
+    image, outputs, timings = run_stages(_worker_stages, ring.view(slot))
+    image = np.asarray(image)
+    if image.nbytes <= ring.slot_size:
+        # Send the processed image back through the shared memory.
+        ring.view(slot, image.shape, image.dtype)[...] = image
+        return None, image.shape, image.dtype.str, outputs, timings
+    return image, image.shape, image.dtype.str, outputs, timings
+
+
+class ImagePipeline(QObject):
+    """
+    A pipeline of processing stages for the images of a PyDMImageView.
+
+    `run` is called by the image processor of the view, in the image thread,
+    for every image.  It can be called from several threads at once, e.g. by
+    several views sharing the pipeline: each call uses its own slot of the
+    ring of frames, and waits for one if they are all in use.  The pool and
+    the ring are only stopped or replaced when no image is being processed.
+
+    Parameters
+    ----------
+    stages : list of ImageStage, optional
+    processes : int, optional
+        The number of processes in which the stages run.  With 0, the stages
+        run in the image thread.
+
+    Signals
+    -------
+    outputsReady : dict
+        Emitted with the outputs of the stages for every image processed.
+    """
+    outputsReady = Signal(object)
+
+    _ids = itertools.count()
+
+    def __init__(self, stages=None, processes=0, parent=None):
+        super(ImagePipeline, self).__init__(parent)
+        self._lock = threading.Lock()
+        self._slot_released = threading.Condition(self._lock)
+        self._stages = list(stages or [])
+        self._processes = max(int(processes), 0)
+        self._pool = None
+        self._ring = None
+        self._free_slots = []
+        self._ring_name = 'pydm-pipeline-{}-{}'.format(os.getpid(),
+                                                       next(self._ids))
+        # Images being processed by the pool, and the pools and rings to
+        # stop when there are none.
+        self._in_flight = 0
+        self._retired = []
+        self.reset_statistics()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    @property
+    def stages(self):
+        """
+        The stages of the pipeline, run in order.
+
+        Returns
+        -------
+        list of ImageStage
+        """
+        return list(self._stages)
+
+    @stages.setter
+    def stages(self, stages):
+        with self._lock:
+            self._stages = list(stages)
+            self._stop_pool()
+
+    @property
+    def processes(self):
+        """
+        The number of processes in which the stages run, 0 to run them in
+        the image thread.
+
+        Returns
+        -------
+        int
+        """
+        return self._processes
+
+    @processes.setter
+    def processes(self, processes):
+        with self._lock:
+            self._processes = max(int(processes), 0)
+            self._stop_pool()
+
+    def reset_statistics(self):
+        """
+        Reset the counters and timings of the stages.
+        """
+        with self._lock:
+            self.image_count = 0
+            self._timings = OrderedDict()
+            self._total = 0.0
+            self._last_total = 0.0
+
+    def statistics(self):
+        """
+        The time spent in each stage since the last call to
+        `reset_statistics`.
+
+        Returns
+        -------
+        dict
+            The number of images processed, and for each stage and for the
+            whole pipeline, including the transfers to the processes, the
+            mean and last durations, in seconds.
+        """
+        with self._lock:
+            count = max(self.image_count, 1)
+            stats = OrderedDict()
+            stats['images'] = self.image_count
+            for name, (total, last) in self._timings.items():
+                stats[name] = OrderedDict([('mean', total / count),
+                                           ('last', last)])
+            stats['pipeline'] = OrderedDict([('mean', self._total / count),
+                                             ('last', self._last_total)])
+        return stats
+
+    def run(self, image):
+        """
+        Run the stages on an image.  This runs in the image thread.
+
+        Parameters
+        ----------
+        image : np.ndarray
+
+        Returns
+        -------
+        np.ndarray
+            The processed image.
+        """
+        start = time.time()
+        image = np.asarray(image)
+        with self._lock:
+            stages = self._stages
+            in_pool = self._processes > 0 and bool(stages)
+            if in_pool:
+                ring, slot = self._acquire_slot(image)
+                pool = self._start_pool()
+                self._in_flight += 1
+        if in_pool:
+            try:
+                ring.view(slot)[...] = image
+                result, shape, dtype, outputs, timings = pool.apply(
+                    _process_in_worker, (ring.path, slot))
+                if result is None:
+                    # The slot is reused once released.
+                    result = ring.view(slot, shape, dtype).copy()
+            finally:
+                self._release_slot(ring, slot)
+        else:
+            result, outputs, timings = run_stages(stages, image)
+        elapsed = time.time() - start
+        with self._lock:
+            self.image_count += 1
+            for name, duration in timings.items():
+                total, _ = self._timings.get(name, (0.0, 0.0))
+                self._timings[name] = (total + duration, duration)
+            self._total += elapsed
+            self._last_total = elapsed
+        if outputs:
+            try:
+                self.outputsReady.emit(outputs)
+            except RuntimeError:
+                # The pipeline was deleted.
+                pass
+        return result
+
+    def _start_pool(self):
+        if self._pool is None:
+            # Forking a process running Qt threads may leave the child
+            # waiting on locks held by the other threads: start fresh
+            # interpreters instead, where the start method can be chosen.
+            context = multiprocessing
+            if hasattr(multiprocessing, 'get_context'):
+                context = multiprocessing.get_context('spawn')
+            self._pool = context.Pool(self._processes,
+                                      initializer=_init_worker,
+                                      initargs=(self._stages,))
+        return self._pool
+
+    def _acquire_slot(self, image):
+        # Called with the lock held.  A slot of a ring matching the image,
+        # used by the caller until it is released.
+        while True:
+            ring = self._ring
+            if (ring is None or ring.shape != image.shape or
+                    ring.dtype != image.dtype):
+                self._retire(ring)
+                ring = self._ring = SharedFrameWriter(
+                    '{}-{}'.format(self._ring_name, next(self._ids)),
+                    image.shape, image.dtype, slots=self._processes)
+                self._free_slots = list(range(ring.slots))
+            if self._free_slots:
+                return ring, self._free_slots.pop()
+            self._slot_released.wait()
+
+    def _release_slot(self, ring, slot):
+        with self._lock:
+            self._in_flight -= 1
+            if ring is self._ring:
+                self._free_slots.append(slot)
+            if self._in_flight == 0:
+                retired, self._retired = self._retired, []
+                for resource in retired:
+                    self._stop(resource)
+            self._slot_released.notify()
+
+    def _retire(self, resource):
+        # Stop a pool or close a ring, once the images being processed are
+        # done with it.
+        if resource is None:
+            return
+        if self._in_flight:
+            self._retired.append(resource)
+        else:
+            self._stop(resource)
+
+    @staticmethod
+    def _stop(resource):
+        if isinstance(resource, SharedFrameWriter):
+            resource.close()
+        else:
+            resource.terminate()
+
+    def _stop_pool(self):
+        # Called with the lock held.  The ring is replaced too, as its number
+        # of slots follows the number of processes.
+        self._retire(self._pool)
+        self._retire(self._ring)
+        self._pool = None
+        self._ring = None
+        self._slot_released.notify_all()
+
+    def close(self):
+        """
+        Stop the processes and remove the shared memory of the pipeline, as
+        soon as the images being processed are done.
+        """
+        with self._lock:
+            self._stop_pool()
@@ -18,6 +18,9 @@ for each PyDMDesignerPlugin that Qt Designer tries to use. This will not
 affect any of your widgets, but it will be annoying.
 
 """
+import importlib
+
+import six
 from qtpy import QtGui, QtDesigner
 from .qtplugin_extensions import PyDMExtensionFactory
 from ..qtdesigner import DesignerHooks
@@ -39,12 +42,14 @@ def qtplugin_factory(cls, is_container=False, group='PyDM Widgets',
     """
     Helper function to create a generic PyDMDesignerPlugin class.
 
-    :param cls: Widget class
-    :type cls:  QWidget
+    :param cls: Widget class, or its full name, e.g.
+                "pydm.widgets.label.PyDMLabel", to only import the widget
+                module when Qt Designer first creates the widget.
+    :type cls:  QWidget or str
     """
 
     class Plugin(PyDMDesignerPlugin):
-        __doc__ = "PyDMDesigner Plugin for {}".format(cls.__name__)
+        __doc__ = "PyDMDesigner Plugin for {}".format(split_class_name(cls)[1])
 
         def __init__(self):
             super(Plugin, self).__init__(cls, is_container, group, extensions,
@@ -53,6 +58,34 @@ def qtplugin_factory(cls, is_container=False, group='PyDM Widgets',
     return Plugin
 
 
+def split_class_name(cls):
+    """
+    Module and name of a class, given the class or its full name.
+
+    :param cls: Class, or its full name as "module.ClassName"
+    :type cls:  type or str
+    :rtype: tuple
+    """
+    if isinstance(cls, six.string_types):
+        module, _, name = cls.rpartition('.')
+        return module, name
+    return cls.__module__, cls.__name__
+
+
+def import_class(cls):
+    """
+    Import a class given its full name. Classes are returned as they are.
+
+    :param cls: Class, or its full name as "module.ClassName"
+    :type cls:  type or str
+    :rtype: type
+    """
+    if not isinstance(cls, six.string_types):
+        return cls
+    module, name = split_class_name(cls)
+    return getattr(importlib.import_module(module), name)
+
+
 class PyDMDesignerPlugin(QtDesigner.QPyDesignerCustomWidgetPlugin):
     """
     Parent class to standardize how pydm plugins are accessed in qt designer.
@@ -64,18 +97,27 @@ class PyDMDesignerPlugin(QtDesigner.QPyDesignerCustomWidgetPlugin):
         """
         Set up the plugin using the class info in cls
 
-        :param cls: Class of the widget to use
-        :type cls:  QWidget
+        :param cls: Class of the widget to use, or its full name
+        :type cls:  QWidget or str
         """
         QtDesigner.QPyDesignerCustomWidgetPlugin.__init__(self)
         self.initialized = False
         self.is_container = is_container
-        self.cls = cls
+        self._cls = cls
         self._group = group
         self._icon = icon or QtGui.QIcon()
         self.extensions = extensions
         self.manager = None
 
+    @property
+    def cls(self):
+        """
+        The class of the widget, imported the first time it is needed.
+        """
+        if isinstance(self._cls, six.string_types):
+            self._cls = import_class(self._cls)
+        return self._cls
+
     def initialize(self, core):
         """
         Override this function if you need special initialization instructions.
@@ -125,7 +167,7 @@ class PyDMDesignerPlugin(QtDesigner.QPyDesignerCustomWidgetPlugin):
         """
         Return the class name of the widget.
         """
-        return self.cls.__name__
+        return split_class_name(self._cls)[1]
 
     def group(self):
         """
@@ -177,4 +219,4 @@ class PyDMDesignerPlugin(QtDesigner.QPyDesignerCustomWidgetPlugin):
         """
         Include the class module for the generated qt code
         """
-        return self.cls.__module__
+        return split_class_name(self._cls)[0]
@@ -1,13 +1,11 @@
+import importlib
+
+import six
 from qtpy.QtDesigner import QExtensionFactory, QPyDesignerTaskMenuExtension
 from qtpy import QtWidgets, QtCore
 
 from ..widgets.base import PyDMPrimitiveWidget
 
-from ..widgets.rules_editor import RulesEditor
-from ..widgets.waveformplot_curve_editor import WaveformPlotCurveEditorDialog
-from ..widgets.timeplot_curve_editor import TimePlotCurveEditorDialog
-from ..widgets.scatterplot_curve_editor import ScatterPlotCurveEditorDialog
-
 
 class PyDMExtensionFactory(QExtensionFactory):
     def __init__(self, parent=None):
@@ -73,6 +71,7 @@ class RulesExtension(PyDMExtension):
         self.edit_rules_action.triggered.connect(self.edit_rules)
 
     def edit_rules(self, state):
+        from ..widgets.rules_editor import RulesEditor
         edit_rules_dialog = RulesEditor(self.widget, parent=None)
         edit_rules_dialog.exec_()
 
@@ -89,7 +88,13 @@ class BasePlotExtension(PyDMExtension):
         self.edit_curves_action.triggered.connect(self.edit_curves)
 
     def edit_curves(self, state):
-        edit_curves_dialog = self.curve_editor_class(self.widget, parent=self.widget)
+        # The editors are only imported when they are used.
+        curve_editor_class = self.curve_editor_class
+        if isinstance(curve_editor_class, six.string_types):
+            module, _, name = curve_editor_class.rpartition('.')
+            curve_editor_class = getattr(
+                importlib.import_module(module), name)
+        edit_curves_dialog = curve_editor_class(self.widget, parent=self.widget)
         edit_curves_dialog.exec_()
 
     def actions(self):
@@ -98,14 +103,23 @@ class BasePlotExtension(PyDMExtension):
 
 class WaveformCurveEditorExtension(BasePlotExtension):
     def __init__(self, widget):
-        super(WaveformCurveEditorExtension, self).__init__(widget, WaveformPlotCurveEditorDialog)
+        super(WaveformCurveEditorExtension, self).__init__(
+            widget,
+            'pydm.widgets.waveformplot_curve_editor.'
+            'WaveformPlotCurveEditorDialog')
 
 
 class TimeCurveEditorExtension(BasePlotExtension):
     def __init__(self, widget):
-        super(TimeCurveEditorExtension, self).__init__(widget, TimePlotCurveEditorDialog)
+        super(TimeCurveEditorExtension, self).__init__(
+            widget,
+            'pydm.widgets.timeplot_curve_editor.'
+            'TimePlotCurveEditorDialog')
 
 
 class ScatterCurveEditorExtension(BasePlotExtension):
     def __init__(self, widget):
-        super(ScatterCurveEditorExtension, self).__init__(widget, ScatterPlotCurveEditorDialog)
+        super(ScatterCurveEditorExtension, self).__init__(
+            widget,
+            'pydm.widgets.scatterplot_curve_editor.'
+            'ScatterPlotCurveEditorDialog')
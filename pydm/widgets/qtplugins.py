@@ -6,188 +6,187 @@ from .qtplugin_extensions import (RulesExtension, WaveformCurveEditorExtension,
                                   TimeCurveEditorExtension,
                                   ScatterCurveEditorExtension)
 from .tab_bar_qtplugin import TabWidgetPlugin
-from .byte import PyDMByteIndicator
-
-from .checkbox import PyDMCheckbox
-from .datetime import (PyDMDateTimeEdit, PyDMDateTimeLabel)
-from .drawing import (PyDMDrawingLine, PyDMDrawingRectangle,
-                      PyDMDrawingTriangle,
-                      PyDMDrawingEllipse, PyDMDrawingCircle, PyDMDrawingArc,
-                      PyDMDrawingPie, PyDMDrawingChord, PyDMDrawingImage,
-                      PyDMDrawingPolygon)
-
-from .embedded_display import PyDMEmbeddedDisplay
-from .enum_button import PyDMEnumButton
-from .enum_combo_box import PyDMEnumComboBox
-from .frame import PyDMFrame
-from .image import PyDMImageView
-from .label import PyDMLabel
-from .line_edit import PyDMLineEdit
-from .logdisplay import PyDMLogDisplay
-from .pushbutton import PyDMPushButton
-from .related_display_button import PyDMRelatedDisplayButton
-from .shell_command import PyDMShellCommand
-from .slider import PyDMSlider
-from .spinbox import PyDMSpinbox
-from .symbol import PyDMSymbol
-from .waveformtable import PyDMWaveformTable
-from .scale import PyDMScaleIndicator
-from .timeplot import PyDMTimePlot
-from .waveformplot import PyDMWaveformPlot
-from .scatterplot import PyDMScatterPlot
-from .template_repeater import PyDMTemplateRepeater
 
 
 BASE_EXTENSIONS = [RulesExtension]
 
+# The widgets are given by their full name, so that their modules are only
+# imported when Qt Designer first creates them.
 # Label plugin
-PyDMLabelPlugin = qtplugin_factory(PyDMLabel, group=WidgetCategory.DISPLAY,
+PyDMLabelPlugin = qtplugin_factory('pydm.widgets.label.PyDMLabel',
+                                   group=WidgetCategory.DISPLAY,
                                    extensions=BASE_EXTENSIONS)
 # Time Plot plugin
-PyDMTimePlotPlugin = qtplugin_factory(PyDMTimePlot, group=WidgetCategory.PLOT,
+PyDMTimePlotPlugin = qtplugin_factory('pydm.widgets.timeplot.PyDMTimePlot',
+                                      group=WidgetCategory.PLOT,
                                       extensions=[TimeCurveEditorExtension,
                                                   RulesExtension])
 
 # Waveform Plot plugin
-PyDMWaveformPlotPlugin = qtplugin_factory(PyDMWaveformPlot,
-                                          group=WidgetCategory.PLOT,
-                                          extensions=[
-                                              WaveformCurveEditorExtension,
-                                              RulesExtension])
+PyDMWaveformPlotPlugin = qtplugin_factory(
+    'pydm.widgets.waveformplot.PyDMWaveformPlot',
+    group=WidgetCategory.PLOT,
+    extensions=[WaveformCurveEditorExtension, RulesExtension])
 
 # Scatter Plot plugin
-PyDMScatterPlotPlugin = qtplugin_factory(PyDMScatterPlot,
-                                         group=WidgetCategory.PLOT,
-                                         extensions=[
-                                             ScatterCurveEditorExtension,
-                                             RulesExtension])
+PyDMScatterPlotPlugin = qtplugin_factory(
+    'pydm.widgets.scatterplot.PyDMScatterPlot',
+    group=WidgetCategory.PLOT,
+    extensions=[ScatterCurveEditorExtension, RulesExtension])
 
 # Byte plugin
-PyDMByteIndicatorPlugin = qtplugin_factory(PyDMByteIndicator,
-                                           group=WidgetCategory.DISPLAY,
-                                           extensions=BASE_EXTENSIONS)
+PyDMByteIndicatorPlugin = qtplugin_factory(
+    'pydm.widgets.byte.PyDMByteIndicator',
+    group=WidgetCategory.DISPLAY,
+    extensions=BASE_EXTENSIONS)
 
 # Checkbox plugin
-PyDMCheckboxPlugin = qtplugin_factory(PyDMCheckbox, group=WidgetCategory.INPUT,
+PyDMCheckboxPlugin = qtplugin_factory('pydm.widgets.checkbox.PyDMCheckbox',
+                                      group=WidgetCategory.INPUT,
                                       extensions=BASE_EXTENSIONS)
 
 # Date/Time plugins
-PyDMDateTimeEditPlugin = qtplugin_factory(PyDMDateTimeEdit,
-                                          group=WidgetCategory.INPUT,
-                                          extensions=BASE_EXTENSIONS)
+PyDMDateTimeEditPlugin = qtplugin_factory(
+    'pydm.widgets.datetime.PyDMDateTimeEdit',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
-PyDMDateTimeLabelPlugin = qtplugin_factory(PyDMDateTimeLabel,
-                                           group=WidgetCategory.DISPLAY,
-                                           extensions=BASE_EXTENSIONS)
+PyDMDateTimeLabelPlugin = qtplugin_factory(
+    'pydm.widgets.datetime.PyDMDateTimeLabel',
+    group=WidgetCategory.DISPLAY,
+    extensions=BASE_EXTENSIONS)
 
 # Drawing plugins
-PyDMDrawingArcPlugin = qtplugin_factory(PyDMDrawingArc,
+PyDMDrawingArcPlugin = qtplugin_factory('pydm.widgets.drawing.PyDMDrawingArc',
                                         group=WidgetCategory.DRAWING,
                                         extensions=BASE_EXTENSIONS)
-PyDMDrawingChordPlugin = qtplugin_factory(PyDMDrawingChord,
-                                          group=WidgetCategory.DRAWING,
-                                          extensions=BASE_EXTENSIONS)
-PyDMDrawingCirclePlugin = qtplugin_factory(PyDMDrawingCircle,
-                                           group=WidgetCategory.DRAWING,
-                                           extensions=BASE_EXTENSIONS)
-PyDMDrawingEllipsePlugin = qtplugin_factory(PyDMDrawingEllipse,
-                                            group=WidgetCategory.DRAWING,
-                                            extensions=BASE_EXTENSIONS)
-PyDMDrawingImagePlugin = qtplugin_factory(PyDMDrawingImage,
-                                          group=WidgetCategory.DRAWING,
-                                          extensions=BASE_EXTENSIONS)
-PyDMDrawingLinePlugin = qtplugin_factory(PyDMDrawingLine,
-                                         group=WidgetCategory.DRAWING,
-                                         extensions=BASE_EXTENSIONS)
-PyDMDrawingPiePlugin = qtplugin_factory(PyDMDrawingPie,
+PyDMDrawingChordPlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingChord',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingCirclePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingCircle',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingEllipsePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingEllipse',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingImagePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingImage',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingLinePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingLine',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingPiePlugin = qtplugin_factory('pydm.widgets.drawing.PyDMDrawingPie',
                                         group=WidgetCategory.DRAWING,
                                         extensions=BASE_EXTENSIONS)
-PyDMDrawingRectanglePlugin = qtplugin_factory(PyDMDrawingRectangle,
-                                              group=WidgetCategory.DRAWING,
-                                              extensions=BASE_EXTENSIONS)
-PyDMDrawingTrianglePlugin = qtplugin_factory(PyDMDrawingTriangle,
-                                             group=WidgetCategory.DRAWING,
-                                             extensions=BASE_EXTENSIONS)
-
-PyDMDrawingPolygonPlugin = qtplugin_factory(PyDMDrawingPolygon,
-                                            group=WidgetCategory.DRAWING,
-                                            extensions=BASE_EXTENSIONS)
+PyDMDrawingRectanglePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingRectangle',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+PyDMDrawingTrianglePlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingTriangle',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
+
+PyDMDrawingPolygonPlugin = qtplugin_factory(
+    'pydm.widgets.drawing.PyDMDrawingPolygon',
+    group=WidgetCategory.DRAWING,
+    extensions=BASE_EXTENSIONS)
 
 # Embedded Display plugin
-PyDMEmbeddedDisplayPlugin = qtplugin_factory(PyDMEmbeddedDisplay,
-                                             group=WidgetCategory.CONTAINER,
-                                             extensions=BASE_EXTENSIONS)
+PyDMEmbeddedDisplayPlugin = qtplugin_factory(
+    'pydm.widgets.embedded_display.PyDMEmbeddedDisplay',
+    group=WidgetCategory.CONTAINER,
+    extensions=BASE_EXTENSIONS)
 
 # Enum Button plugin
-PyDMEnumButtonPlugin = qtplugin_factory(PyDMEnumButton,
-                                        group=WidgetCategory.INPUT,
-                                        extensions=BASE_EXTENSIONS)
+PyDMEnumButtonPlugin = qtplugin_factory(
+    'pydm.widgets.enum_button.PyDMEnumButton',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
 # Enum Combobox plugin
-PyDMEnumComboBoxPlugin = qtplugin_factory(PyDMEnumComboBox,
-                                          group=WidgetCategory.INPUT,
-                                          extensions=BASE_EXTENSIONS)
+PyDMEnumComboBoxPlugin = qtplugin_factory(
+    'pydm.widgets.enum_combo_box.PyDMEnumComboBox',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
 # Frame plugin
-PyDMFramePlugin = qtplugin_factory(PyDMFrame, group=WidgetCategory.CONTAINER,
+PyDMFramePlugin = qtplugin_factory('pydm.widgets.frame.PyDMFrame',
+                                   group=WidgetCategory.CONTAINER,
                                    is_container=True,
                                    extensions=BASE_EXTENSIONS)
 
 # Image plugin
-PyDMImageViewPlugin = qtplugin_factory(PyDMImageView,
+PyDMImageViewPlugin = qtplugin_factory('pydm.widgets.image.PyDMImageView',
                                        group=WidgetCategory.DISPLAY,
                                        extensions=BASE_EXTENSIONS)
 
 # Line Edit plugin
-PyDMLineEditPlugin = qtplugin_factory(PyDMLineEdit, group=WidgetCategory.INPUT,
+PyDMLineEditPlugin = qtplugin_factory('pydm.widgets.line_edit.PyDMLineEdit',
+                                      group=WidgetCategory.INPUT,
                                       extensions=BASE_EXTENSIONS)
 
 # Log Viewer
-PyDMLogDisplayPlugin = qtplugin_factory(PyDMLogDisplay,
-                                        group=WidgetCategory.DISPLAY,
-                                        extensions=BASE_EXTENSIONS)
+PyDMLogDisplayPlugin = qtplugin_factory(
+    'pydm.widgets.logdisplay.PyDMLogDisplay',
+    group=WidgetCategory.DISPLAY,
+    extensions=BASE_EXTENSIONS)
 
 # Push Button plugin
-PyDMPushButtonPlugin = qtplugin_factory(PyDMPushButton,
-                                        group=WidgetCategory.INPUT,
-                                        extensions=BASE_EXTENSIONS)
+PyDMPushButtonPlugin = qtplugin_factory(
+    'pydm.widgets.pushbutton.PyDMPushButton',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
 # Related Display Button plugin
-PyDMRelatedDisplayButtonPlugin = qtplugin_factory(PyDMRelatedDisplayButton,
-                                                  group=WidgetCategory.DISPLAY,
-                                                  extensions=BASE_EXTENSIONS)
+PyDMRelatedDisplayButtonPlugin = qtplugin_factory(
+    'pydm.widgets.related_display_button.PyDMRelatedDisplayButton',
+    group=WidgetCategory.DISPLAY,
+    extensions=BASE_EXTENSIONS)
 
 # Shell Command plugin
-PyDMShellCommandPlugin = qtplugin_factory(PyDMShellCommand,
-                                          group=WidgetCategory.INPUT,
-                                          extensions=BASE_EXTENSIONS)
+PyDMShellCommandPlugin = qtplugin_factory(
+    'pydm.widgets.shell_command.PyDMShellCommand',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
 # Slider plugin
-PyDMSliderPlugin = qtplugin_factory(PyDMSlider, group=WidgetCategory.INPUT,
+PyDMSliderPlugin = qtplugin_factory('pydm.widgets.slider.PyDMSlider',
+                                    group=WidgetCategory.INPUT,
                                     extensions=BASE_EXTENSIONS)
 
 # Spinbox plugin
-PyDMSpinboxplugin = qtplugin_factory(PyDMSpinbox, group=WidgetCategory.INPUT,
+PyDMSpinboxplugin = qtplugin_factory('pydm.widgets.spinbox.PyDMSpinbox',
+                                     group=WidgetCategory.INPUT,
                                      extensions=BASE_EXTENSIONS)
 
 # Scale Indicator plugin
-PyDMScaleIndicatorPlugin = qtplugin_factory(PyDMScaleIndicator,
-                                            group=WidgetCategory.DISPLAY,
-                                            extensions=BASE_EXTENSIONS)
+PyDMScaleIndicatorPlugin = qtplugin_factory(
+    'pydm.widgets.scale.PyDMScaleIndicator',
+    group=WidgetCategory.DISPLAY,
+    extensions=BASE_EXTENSIONS)
 
 # Symbol plugin
-PyDMSymbolPlugin = qtplugin_factory(PyDMSymbol, group=WidgetCategory.DISPLAY,
+PyDMSymbolPlugin = qtplugin_factory('pydm.widgets.symbol.PyDMSymbol',
+                                    group=WidgetCategory.DISPLAY,
                                     extensions=BASE_EXTENSIONS)
 
 # Waveform Table plugin
-PyDMWaveformTablePlugin = qtplugin_factory(PyDMWaveformTable,
-                                           group=WidgetCategory.INPUT,
-                                           extensions=BASE_EXTENSIONS)
+PyDMWaveformTablePlugin = qtplugin_factory(
+    'pydm.widgets.waveformtable.PyDMWaveformTable',
+    group=WidgetCategory.INPUT,
+    extensions=BASE_EXTENSIONS)
 
 # Tab Widget plugin
 PyDMTabWidgetPlugin = TabWidgetPlugin(extensions=BASE_EXTENSIONS)
 
 # Tab Widget plugin
-PyDMTemplateRepeaterPlugin = qtplugin_factory(PyDMTemplateRepeater,
-                                             group=WidgetCategory.CONTAINER,
-                                             extensions=BASE_EXTENSIONS)
+PyDMTemplateRepeaterPlugin = qtplugin_factory(
+    'pydm.widgets.template_repeater.PyDMTemplateRepeater',
+    group=WidgetCategory.CONTAINER,
+    extensions=BASE_EXTENSIONS)
@@ -2,19 +2,28 @@ import json
 import logging
 import functools
 import weakref
+import time
+from collections import deque, OrderedDict
 
-from qtpy.QtCore import QThread, QMutex, Signal, QMutexLocker
+from qtpy.QtCore import (QThread, QMutex, Signal, QMutexLocker,
+                         QWaitCondition)
 from qtpy.QtWidgets import QWidget, QApplication
 
 from .channel import PyDMChannel
 
 import pydm.data_plugins
+from .. import tracing
 
 import numpy as np
 import math
 
 logger = logging.getLogger(__name__)
 
+# Names available to every rule expression. Built only once and copied into
+# each rule's evaluation environment at registration time.
+EVAL_BASE_ENV = {k: v for k, v in math.__dict__.items() if k[0] != '_'}
+EVAL_BASE_ENV['np'] = np
+
 
 def unregister_widget_rules(widget):
     """
@@ -36,6 +45,7 @@ def unregister_widget_rules(widget):
             pass
 
 
+@tracing.traced()
 def register_widget_rules(widget):
     """
     Given a widget to start from, traverse the tree of child widgets,
@@ -68,7 +78,7 @@ class RulesDispatcher(object):
         if self.__initialized:
             return
         self.rules_engine = RulesEngine()
-        self.rules_engine.rule_signal.connect(self.dispatch)
+        self.rules_engine.rules_signal.connect(self.dispatch_batch)
         self.rules_engine.start()
         self.__initialized = True
 
@@ -93,7 +103,8 @@ class RulesDispatcher(object):
         -------
         None
         """
-        self.rules_engine.register(widget, rules)
+        with tracing.trace_span("register rules", widget=widget.objectName()):
+            self.rules_engine.register(widget, rules)
 
     def unregister(self, widget):
         """
@@ -110,6 +121,20 @@ class RulesDispatcher(object):
         else:
             self.rules_engine.unregister(weakref.ref(widget))
 
+    def dispatch_batch(self, payloads):
+        """
+        Callback invoked when the RulesEngine finishes an evaluation cycle.
+        All the payloads produced by the cycle are applied in one pass.
+
+        Parameters
+        ----------
+        payloads : list
+            List of payload dictionaries, see `dispatch`.
+        """
+        for payload in payloads:
+            self.dispatch(payload)
+        self.rules_engine.count_dispatched(len(payloads))
+
     def dispatch(self, payload):
         """
         Callback invoked when the RulesEngine evaluate a rule and send new value
@@ -141,12 +166,28 @@ class RulesEngine(QThread):
     RulesEngine inherits from QThread and is responsible evaluating the rules
     for all the widgets in the application.
 
+    The expression of each rule is compiled only once, when the rule is
+    registered.  The engine thread sleeps until a trigger channel marks a rule
+    as dirty, and then evaluates every dirty rule once per frame, so an idle
+    display costs no CPU.
+
+    All the values calculated in one evaluation cycle are sent to the GUI
+    thread together, in the order of the rules.  When several rules of a
+    widget set the same property, only the value of the last one is sent.
+
     Signals
     -------
     rule_signal : dict
         Emitted when a new value for the property is calculated by the engine.
+    rules_signal : list
+        Emitted at the end of an evaluation cycle with the list of payloads
+        for the new property values calculated by the engine.
     """
     rule_signal = Signal(dict)
+    rules_signal = Signal(list)
+
+    # Time given to a burst of triggers to accumulate before evaluating.
+    FRAME_INTERVAL = 33  # 30Hz
 
     def __init__(self):
         QThread.__init__(self)
@@ -154,6 +195,58 @@ class RulesEngine(QThread):
         self.app.aboutToQuit.connect(self.requestInterruption)
         self.map_lock = QMutex()
         self.widget_map = dict()
+        self.dirty_lock = QMutex()
+        self.dirty_condition = QWaitCondition()
+        self.dirty_rules = deque()
+        self.statistics_lock = QMutex()
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        """
+        Reset the counters of evaluated, coalesced and dispatched rules.
+        """
+        with QMutexLocker(self.statistics_lock):
+            self.statistics_start = time.time()
+            self.evaluated_count = 0
+            self.coalesced_count = 0
+            self.dispatched_count = 0
+
+    def count_dispatched(self, count):
+        """
+        Count rule results applied to the widgets by the RulesDispatcher.
+
+        Parameters
+        ----------
+        count : int
+        """
+        with QMutexLocker(self.statistics_lock):
+            self.dispatched_count += count
+
+    def statistics(self):
+        """
+        The counters of rules evaluated by the engine, of results discarded
+        because a newer value for the same widget property was calculated in
+        the same cycle, and of results dispatched to the widgets, since the
+        last call to `reset_statistics`.
+
+        Returns
+        -------
+        dict
+            The counters and their rates per second.
+        """
+        with QMutexLocker(self.statistics_lock):
+            elapsed = max(time.time() - self.statistics_start, 1e-6)
+            stats = OrderedDict()
+            for name in ('evaluated', 'coalesced', 'dispatched'):
+                count = getattr(self, '{}_count'.format(name))
+                stats[name] = count
+                stats['{}_per_second'.format(name)] = count / elapsed
+        return stats
+
+    def requestInterruption(self):
+        QThread.requestInterruption(self)
+        with QMutexLocker(self.dirty_lock):
+            self.dirty_condition.wakeAll()
 
     def widget_destroyed(self, ref):
         self.unregister(ref)
@@ -173,6 +266,8 @@ class RulesEngine(QThread):
             item['values'] = [None] * len(channels_list)
             item['conn'] = [False] * len(channels_list)
             item['channels'] = []
+            item['code'] = self.compile_expression(rule)
+            item['env'] = dict(EVAL_BASE_ENV, ch=item['values'])
 
             for ch_idx, ch in enumerate(channels_list):
                 conn_cb = functools.partial(self.callback_conn, widget_ref,
@@ -211,12 +306,71 @@ class RulesEngine(QThread):
 
     def run(self):
         while not self.isInterruptionRequested():
-            w_map = self.widget_map.copy()
-            for widget_ref, rules in w_map.items():
-                for idx, rule in enumerate(rules):
-                    if rule['calculate']:
-                        self.calculate_expression(widget_ref, idx, rule)
-            self.msleep(33)  # 30Hz
+            with QMutexLocker(self.dirty_lock):
+                while (not self.dirty_rules and
+                       not self.isInterruptionRequested()):
+                    self.dirty_condition.wait(self.dirty_lock)
+            # Let the burst of triggers that woke us up accumulate, so that
+            # a rule triggered many times is only evaluated once.
+            self.msleep(self.FRAME_INTERVAL)
+            with QMutexLocker(self.dirty_lock):
+                dirty = self.dirty_rules
+                self.dirty_rules = deque()
+            # (widget, property) -> (order of the widget, rule index, payload)
+            batch = {}
+            widget_order = {}
+            evaluated = coalesced = 0
+            for widget_ref, idx in dirty:
+                try:
+                    rule = self.widget_map[widget_ref][idx]
+                except (KeyError, IndexError, TypeError):
+                    # The widget was unregistered in the meantime
+                    continue
+                if not rule['calculate']:
+                    continue
+                if rule['code'] is not None:
+                    evaluated += 1
+                payload = self.calculate_expression(widget_ref, idx, rule)
+                if payload is None:
+                    continue
+                order = widget_order.setdefault(widget_ref, len(widget_order))
+                key = (widget_ref, payload['property'])
+                if key in batch:
+                    # The last rule setting the property wins, as when the
+                    # rules are applied one after the other.
+                    coalesced += 1
+                    if batch[key][1] > idx:
+                        continue
+                batch[key] = (order, idx, payload)
+            with QMutexLocker(self.statistics_lock):
+                self.evaluated_count += evaluated
+                self.coalesced_count += coalesced
+            if batch:
+                payloads = [payload for _, _, payload in
+                            sorted(batch.values(), key=lambda item: item[:2])]
+                for payload in payloads:
+                    self.rule_signal.emit(payload)
+                self.rules_signal.emit(payloads)
+
+    def mark_dirty(self, widget_ref, index):
+        """
+        Flag a rule for evaluation and wake up the engine thread.
+
+        Parameters
+        ----------
+        widget_ref : weakref
+            A weakref to the widget owner of the rule.
+        index : int
+            The index of the rule to evaluate.
+        """
+        rule = self.widget_map[widget_ref][index]
+        if rule['calculate']:
+            # Already queued, it will use the latest values.
+            return
+        rule['calculate'] = True
+        with QMutexLocker(self.dirty_lock):
+            self.dirty_rules.append((widget_ref, index))
+            self.dirty_condition.wakeAll()
 
     def callback_value(self, widget_ref, index, ch_index, trigger, value):
         """
@@ -247,7 +401,7 @@ class RulesEngine(QThread):
                 if not all(w_map[index]['conn']):
                     self.warn_unconnected_channels(widget_ref, index)
                     return
-                w_map[index]['calculate'] = True
+                self.mark_dirty(widget_ref, index)
         except (KeyError, IndexError):
             pass
 
@@ -281,10 +435,34 @@ class RulesEngine(QThread):
             "Rule '%s': Not all channels are connected, skipping execution.",
             self.widget_map[widget_ref][index]['rule']['name'])
 
+    @staticmethod
+    def compile_expression(rule):
+        """
+        Compile the expression defined by the rule.
+
+        Parameters
+        ----------
+        rule : dict
+            The definition of the rule.
+
+        Returns
+        -------
+        code : code object or None
+            The compiled expression, or None if it could not be compiled.
+        """
+        try:
+            return compile(rule['expression'],
+                           "<rule '{}'>".format(rule.get('name', '')),
+                           'eval')
+        except Exception:
+            logger.exception("Error while compiling Rule.")
+            return None
+
     def calculate_expression(self, widget_ref, idx, rule):
         """
-        Evaluate the expression defined by the rule and emit the `rule_signal`
-        with the new value.
+        Evaluate the expression defined by the rule and build the payload
+        with the new value, to be sent with the `rule_signal` and the
+        `rules_signal`.
 
         .. warning
 
@@ -292,23 +470,21 @@ class RulesEngine(QThread):
 
         Returns
         -------
-        None
+        payload : dict or None
+            The payload for the widget, or None if the evaluation failed.
         """
         rule['calculate'] = False
-        eval_env = {'np': np,
-                    'ch': rule['values']}
-        eval_env.update({k: v
-                         for k, v in math.__dict__.items()
-                         if k[0] != '_'})
+        if rule['code'] is None:
+            # Compilation failed and was already reported at registration.
+            return None
 
         try:
-            expression = rule['rule']['expression']
             name = rule['rule']['name']
             prop = rule['rule']['property']
 
-            val = eval(expression, eval_env)
-            payload = {'widget': widget_ref, 'name': name, 'property': prop,
-                       'value': val}
-            self.rule_signal.emit(payload)
+            val = eval(rule['code'], rule['env'])
+            return {'widget': widget_ref, 'name': name, 'property': prop,
+                    'value': val}
         except Exception as e:
             logger.exception("Error while evaluating Rule.")
+            return None
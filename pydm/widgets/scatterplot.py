@@ -6,7 +6,7 @@ from qtpy.QtGui import QColor
 from qtpy.QtCore import Slot, Property, Qt
 from .baseplot import BasePlot, NoDataError, BasePlotCurveItem
 from .channel import PyDMChannel
-from ..utilities import remove_protocol
+from ..utilities import remove_protocol, ExtremaRingBuffer
 
 class ScatterPlotCurveItem(BasePlotCurveItem):
     _channels = ('x_channel', 'y_channel')
@@ -29,9 +29,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.redraw_mode = (redraw_mode if redraw_mode is not None
                             else self.REDRAW_ON_EITHER)
         self._bufferSize = 1200
-        self.data_buffer = np.zeros((2, self._bufferSize),
-                                    order='f', dtype=float)
-        self.points_accumulated = 0
+        # Each column holds one (x, y) pair.
+        self._buffer = ExtremaRingBuffer(self._bufferSize, rows=2)
         self.latest_x_value = None
         self.latest_y_value = None
         self.needs_new_x = True
@@ -59,6 +58,30 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         dic_['buffer_size'] = self.getBufferSize()
         return dic_
 
+    @property
+    def data_buffer(self):
+        """
+        The (x, y) pairs, ordered from the oldest to the newest.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (2, bufferSize) view of the curve's ring buffer.  The first row
+            holds the x values and the second the y values.
+        """
+        return self._buffer.view()
+
+    @property
+    def points_accumulated(self):
+        """
+        The number of pairs currently held in the data buffer.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._buffer)
+
     @property
     def x_address(self):
         """
@@ -88,7 +111,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.x_channel = PyDMChannel(
             address=new_address,
             connection_slot=self.xConnectionStateChanged,
-            value_slot=self.receiveXValue)
+            value_slot=self.receiveXValue,
+            deliver_all=True)
 
     @property
     def y_address(self):
@@ -119,7 +143,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.y_channel = PyDMChannel(
             address=new_address,
             connection_slot=self.yConnectionStateChanged,
-            value_slot=self.receiveYValue)
+            value_slot=self.receiveYValue,
+            deliver_all=True)
 
     @Slot(bool)
     def xConnectionStateChanged(self, connected):
@@ -169,7 +194,7 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         """
         This is called whenever new data is received for X or Y.
         Based on the value of the redraw_mode attribute, it decides whether
-        we are ready to shift the data buffer by one and add the latest data.
+        we are ready to append the latest (x, y) pair to the data buffer.
         """
         # If we haven't gotten values for X and Y yet, can't redraw.
         if self.latest_y_value is None or self.latest_x_value is None:
@@ -195,17 +220,11 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
             if self.needs_new_y or self.needs_new_x:
                 return
         # If you get this far, we are OK to add the latest data to the buffer.
-        self.data_buffer = np.roll(self.data_buffer, -1)
-        self.data_buffer[0, -1] = self.latest_x_value
-        self.data_buffer[1, -1] = self.latest_y_value
-        if self.points_accumulated < self._bufferSize:
-            self.points_accumulated = self.points_accumulated + 1
+        self._buffer.append((self.latest_x_value, self.latest_y_value))
         self.data_changed.emit()
 
     def initialize_buffer(self):
-        self.points_accumulated = 0
-        self.data_buffer = np.zeros((2, self._bufferSize),
-                                    order='f', dtype=float)
+        self._buffer = ExtremaRingBuffer(self._bufferSize, rows=2)
 
     def getBufferSize(self):
         return int(self._bufferSize)
@@ -225,8 +244,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         Called by the curve's parent plot whenever the curve needs to be
         re-drawn with new data.
         """
-        self.setData(x=self.data_buffer[0, -self.points_accumulated:].astype(np.float),
-                     y=self.data_buffer[1, -self.points_accumulated:].astype(np.float))
+        x, y = np.array(self._buffer.valid(), dtype=float)
+        self.setData(x=x, y=y)
         self.needs_new_x = True
         self.needs_new_y = True
 
@@ -234,6 +253,9 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         """
         Get the limits of the data for this curve.
 
+        The limits are maintained by the data buffer as pairs are added and
+        dropped, so this does not scan the data.
+
         Returns
         -------
         tuple
@@ -241,10 +263,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         """
         if self.points_accumulated == 0:
             raise NoDataError("Curve has no data, cannot determine limits.")
-        x_data = self.data_buffer[0, -self.points_accumulated:]
-        y_data = self.data_buffer[1, -self.points_accumulated:]
-        return ((float(np.amin(x_data)), float(np.amax(x_data))),
-                (float(np.amin(y_data)), float(np.amax(y_data))))
+        return ((float(self._buffer.minimum(0)), float(self._buffer.maximum(0))),
+                (float(self._buffer.minimum(1)), float(self._buffer.maximum(1))))
 
     def channels(self):
         return [self.y_channel, self.x_channel]
@@ -1,11 +1,10 @@
 from .qtplugin_base import PyDMDesignerPlugin, WidgetCategory
-from .tab_bar import PyDMTabWidget
 
 
 class TabWidgetPlugin(PyDMDesignerPlugin):
     """TabWidgetPlugin needs a custom plugin so that it can
     populate itself with an initial tab."""
-    TabClass = PyDMTabWidget
+    TabClass = 'pydm.widgets.tab_bar.PyDMTabWidget'
 
     def __init__(self, extensions=None):
         super(TabWidgetPlugin, self).__init__(self.TabClass,
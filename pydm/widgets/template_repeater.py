@@ -1,16 +1,21 @@
 import os
 import json
 import copy
+import time
 import logging
+import functools
+from collections import OrderedDict
 from qtpy.QtWidgets import (QFrame, QApplication, QLabel, QVBoxLayout,
                            QHBoxLayout, QWidget, QStyle, QSizePolicy,
-                           QLayout)
-from qtpy.QtCore import Qt, QSize, QRect, Property, QPoint, Q_ENUMS
+                           QLayout, QAbstractScrollArea)
+from qtpy.QtCore import Qt, QSize, QRect, Property, QPoint, Q_ENUMS, QTimer
 from .base import PyDMPrimitiveWidget
+from .rules import register_widget_rules, unregister_widget_rules
 from pydm.utilities import is_qt_designer
 import pydm.data_plugins
-from ..utilities import macro, find_file
-from ..display import load_file
+from ..utilities import (macro, find_file, establish_widget_connections,
+                         close_widget_connections)
+from ..display import load_file, UiTemplate
 logger = logging.getLogger(__name__)
 
 
@@ -121,6 +126,26 @@ class LayoutType(object):
 layout_class_for_type = (QVBoxLayout, QHBoxLayout, FlowLayout)
 
 
+def _unwatch_scrollbars(scrollbars, slot, *args):
+    """
+    Disconnect the scroll bars watched by a virtualized template repeater.
+
+    Parameters
+    ----------
+    scrollbars : list
+        The scroll bars, emptied once they are disconnected.
+    slot : callable
+        The slot of the repeater connected to their valueChanged signal.
+    """
+    for bar in scrollbars:
+        try:
+            bar.valueChanged.disconnect(slot)
+        except (TypeError, RuntimeError):
+            # Already disconnected, or the scroll bar was deleted.
+            pass
+    del scrollbars[:]
+
+
 class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
     """
     PyDMTemplateRepeater takes a .ui file with macro variables as a template, and a JSON
@@ -135,6 +160,16 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
     amount of work: just build a template for a single magnet, and a JSON list
     with the data that describes all of the magnets.
 
+    For very long lists, the `virtualized` property makes the widget create
+    only the instances visible inside the scroll area that contains it (plus
+    `overscan` instances on each side).  Instances scrolled out of view are
+    hidden, their channels are disconnected and they are kept in a cache of
+    rows, up to `rowCacheLimit` of them.  An instance is bound to the data
+    of its row by the macros expanded when it was built, so the cached
+    instances are only shown again when their own row comes back into view,
+    and the other rows entering the view get new instances.  All the
+    instances are assumed to have the size of the first one.
+
     Parameters
     ----------
     parent : optional
@@ -151,7 +186,32 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
         self._data_source = ""
         self._data = []
         self._cached_template = None
+        # The file and the modification time the cached template was
+        # parsed from.
+        self._cached_template_key = None
         self._parent_macros = None
+        self._incremental_updates = False
+        self._data_key = ""
+        # (key, signature, widget) for each instance, in layout order.
+        self._instances = []
+        self._virtualized = False
+        self._overscan = 2
+        self._row_cache_limit = 50
+        # State of the virtualized arrangement, while it is in use.
+        self._virtual = False
+        self._row_extent = 0
+        self._saved_minimum_size = None
+        self._materialized = {}
+        self._row_cache = OrderedDict()
+        self._watched_scrollbars = []
+        self._viewport_timer = QTimer(self)
+        self._viewport_timer.setSingleShot(True)
+        self._viewport_timer.setInterval(0)
+        self._viewport_timer.timeout.connect(self.update_viewport)
+        # The scroll areas may outlive the repeater.
+        self.destroyed.connect(functools.partial(
+            _unwatch_scrollbars, self._watched_scrollbars,
+            self._schedule_viewport_update))
         self._layout_type = LayoutType.Vertical
         self._temp_layout_spacing = 4
         self.app = QApplication.instance()
@@ -231,6 +291,139 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
             self._count_shown_in_designer = new_count
             self.rebuild()
     
+    @Property(bool)
+    def incrementalUpdates(self):
+        """
+        Whether or not changing the data only creates and destroys the
+        instances whose items were added, removed or changed.  Instances of
+        unchanged items are kept, along with their channel connections.
+
+        Returns
+        -------
+        bool
+        """
+        return self._incremental_updates
+
+    @incrementalUpdates.setter
+    def incrementalUpdates(self, incremental):
+        """
+        Whether or not changing the data only creates and destroys the
+        instances whose items were added, removed or changed.  Instances of
+        unchanged items are kept, along with their channel connections.
+
+        Parameters
+        ----------
+        incremental : bool
+        """
+        self._incremental_updates = bool(incremental)
+
+    @Property(str)
+    def dataKey(self):
+        """
+        The name of the field that identifies each item of the data when
+        using incremental updates.  If empty, or if an item does not have
+        this field, the whole item is used to identify it.
+
+        Returns
+        -------
+        str
+        """
+        return self._data_key
+
+    @dataKey.setter
+    def dataKey(self, key):
+        """
+        The name of the field that identifies each item of the data when
+        using incremental updates.  If empty, or if an item does not have
+        this field, the whole item is used to identify it.
+
+        Parameters
+        ----------
+        key : str
+        """
+        self._data_key = str(key)
+
+    @Property(bool)
+    def virtualized(self):
+        """
+        Whether or not only the instances inside the visible area are
+        created and connected.  Only the Vertical and Horizontal layouts can
+        be virtualized.  This property has no effect in Designer.
+
+        Returns
+        -------
+        bool
+        """
+        return self._virtualized
+
+    @virtualized.setter
+    def virtualized(self, virtualized):
+        """
+        Whether or not only the instances inside the visible area are
+        created and connected.  Only the Vertical and Horizontal layouts can
+        be virtualized.  This property has no effect in Designer.
+
+        Parameters
+        ----------
+        virtualized : bool
+        """
+        virtualized = bool(virtualized)
+        if virtualized != self._virtualized:
+            self._virtualized = virtualized
+            if not virtualized:
+                self._unwatch_scroll_areas()
+            self.rebuild()
+
+    @Property(int)
+    def overscan(self):
+        """
+        The number of instances created before and after the visible ones
+        when virtualized, so that they are ready when scrolling.
+
+        Returns
+        -------
+        int
+        """
+        return self._overscan
+
+    @overscan.setter
+    def overscan(self, overscan):
+        """
+        The number of instances created before and after the visible ones
+        when virtualized, so that they are ready when scrolling.
+
+        Parameters
+        ----------
+        overscan : int
+        """
+        self._overscan = max(int(overscan), 0)
+        self._schedule_viewport_update()
+
+    @Property(int)
+    def rowCacheLimit(self):
+        """
+        The maximum number of instances scrolled out of view that are kept,
+        disconnected, to be shown again when their row comes back into view.
+
+        Returns
+        -------
+        int
+        """
+        return self._row_cache_limit
+
+    @rowCacheLimit.setter
+    def rowCacheLimit(self, limit):
+        """
+        The maximum number of instances scrolled out of view that are kept,
+        disconnected, to be shown again when their row comes back into view.
+
+        Parameters
+        ----------
+        limit : int
+        """
+        self._row_cache_limit = max(int(limit), 0)
+        self._trim_row_cache()
+
     @Property(str)
     def templateFilename(self):
         """
@@ -372,17 +565,49 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
         parent_macros = copy.copy(self._parent_macros)
         parent_macros.update(variables)
         try:
-            w = load_file(fname, macros=parent_macros, target=None)
+            if fname and fname.endswith('.ui'):
+                w = self.template_for_file(fname).instantiate(parent_macros)
+            else:
+                w = load_file(fname, macros=parent_macros, target=None)
         except Exception as ex:
             w = QLabel('Error: could not load template: ' + str(ex))
         return w
 
+    def template_for_file(self, fname):
+        """
+        The parsed template for the given file, parsed only once and
+        reused for every instance, until the file is modified.
+
+        Parameters
+        ----------
+        fname : str
+            The path to the .ui file.
+
+        Returns
+        -------
+        UiTemplate
+        """
+        try:
+            key = (fname, os.path.getmtime(fname))
+        except OSError:
+            key = (fname, None)
+        if self._cached_template is None or self._cached_template_key != key:
+            self._cached_template = UiTemplate(fname)
+            self._cached_template_key = key
+            logger.debug("Template %s parsed in %.2f ms. Macros used: %s",
+                         fname, 1000 * self._cached_template.compile_time,
+                         sorted(self._cached_template.macro_names))
+        return self._cached_template
+
     def rebuild(self):
         """ Clear out all existing widgets, and populate the list using the
         template file and data source."""
         self.clear()
         if (not self.templateFilename) or (not self.data):
             return
+        if self._use_virtual():
+            self._rebuild_virtual()
+            return
         self.setUpdatesEnabled(False)
         
         layout_class = layout_class_for_type[self.layoutType]
@@ -393,16 +618,15 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
             l = layout_class(self)
             self.setLayout(l)
             self.layout().setSpacing(self._temp_layout_spacing)
+        start = time.time()
         try:
             with pydm.data_plugins.connection_queue(defer_connections=True):
                 for i, variables in enumerate(self.data):
                     if is_qt_designer() and i > self.countShownInDesigner - 1:
                         break
-                    w = self.open_template_file(variables)
-                    if w is None:
-                        w = QLabel()
-                        w.setText("No Template Loaded.  Data: {}".format(variables))
-                    w.setParent(self)
+                    w = self._create_instance(variables)
+                    key, signature = self._item_identity(variables)
+                    self._instances.append((key, signature, w))
                     self.layout().addWidget(w)
         except:
             logger.exception('Template repeater failed to rebuild.')
@@ -414,18 +638,285 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
             # staled.
             self.setUpdatesEnabled(True)
             pydm.data_plugins.establish_queued_connections()
+        if self.count():
+            elapsed = time.time() - start
+            logger.debug("Template repeater built %d instances in %.2f ms "
+                         "(%.2f ms per instance).", self.count(),
+                         1000 * elapsed, 1000 * elapsed / self.count())
     
+    def _create_instance(self, variables):
+        w = self.open_template_file(variables)
+        if w is None:
+            w = QLabel()
+            w.setText("No Template Loaded.  Data: {}".format(variables))
+        w.setParent(self)
+        return w
+
+    def _destroy_instance(self, w, connected=True):
+        # The instance is only deleted once control returns to the event
+        # loop: take it out of the widget and close its connections now.
+        w.hide()
+        w.setParent(None)
+        if connected:
+            close_widget_connections(w)
+            unregister_widget_rules(w)
+        w.deleteLater()
+
+    def _item_identity(self, item):
+        """
+        The key identifying a data item and the signature used to find out
+        whether or not it changed.
+        """
+        signature = json.dumps(item, sort_keys=True, default=str)
+        try:
+            key = json.dumps(item[self._data_key], sort_keys=True,
+                             default=str)
+        except (KeyError, TypeError, IndexError):
+            key = signature
+        return key, signature
+
+    def update_instances(self):
+        """
+        Update the instances of the template to match the data, creating
+        instances only for new or changed items, destroying the ones of
+        removed or changed items and keeping (and reordering) the others.
+        """
+        if (not self._instances or not self.templateFilename or
+                not self.data or self._use_virtual()):
+            self.rebuild()
+            return
+
+        available = {}
+        for key, signature, w in self._instances:
+            available.setdefault(key, []).append((signature, w))
+
+        new_instances = []
+        created = 0
+        self.setUpdatesEnabled(False)
+        try:
+            with pydm.data_plugins.connection_queue(defer_connections=True):
+                for i, variables in enumerate(self.data):
+                    if is_qt_designer() and i > self.countShownInDesigner - 1:
+                        break
+                    key, signature = self._item_identity(variables)
+                    w = None
+                    candidates = available.get(key, [])
+                    for idx, (old_signature, old_w) in enumerate(candidates):
+                        if old_signature == signature:
+                            w = old_w
+                            del candidates[idx]
+                            break
+                    if w is None:
+                        w = self._create_instance(variables)
+                        created += 1
+                    new_instances.append((key, signature, w))
+
+            # Take every instance out of the layout and put back the ones
+            # we keep, in the new order.
+            while self.layout().count() > 0:
+                self.layout().takeAt(0)
+            removed = 0
+            for candidates in available.values():
+                for _, w in candidates:
+                    self._destroy_instance(w)
+                    removed += 1
+            self._instances = new_instances
+            for _, _, w in self._instances:
+                self.layout().addWidget(w)
+        except:
+            logger.exception('Template repeater failed to update.')
+        else:
+            logger.debug("Template repeater update: %d instances kept, %d "
+                         "created and %d removed.",
+                         len(new_instances) - created, created, removed)
+        finally:
+            self.setUpdatesEnabled(True)
+            pydm.data_plugins.establish_queued_connections()
+
+    def _use_virtual(self):
+        return (self._virtualized and not is_qt_designer() and
+                self.layoutType != LayoutType.Flow)
+
+    def _rebuild_virtual(self):
+        if self.layout() is not None:
+            # Instances are placed by hand, remove the layout.
+            QWidget().setLayout(self.layout())
+        self._virtual = True
+        self._saved_minimum_size = self.minimumSize()
+
+        # Use the first instance to measure them all.
+        probe = self._create_instance(self.data[0])
+        hint = probe.sizeHint().expandedTo(probe.minimumSizeHint())
+        if self.layoutType == LayoutType.Vertical:
+            self._row_extent = max(hint.height(), 1)
+            self.setMinimumSize(hint.width(), self._virtual_length())
+        else:
+            self._row_extent = max(hint.width(), 1)
+            self.setMinimumSize(self._virtual_length(), hint.height())
+        self._materialized[0] = probe
+        self._place(0, probe)
+        probe.show()
+        self._watch_scroll_areas()
+        self._schedule_viewport_update()
+
+    def _stride(self):
+        return self._row_extent + max(self._temp_layout_spacing, 0)
+
+    def _virtual_length(self):
+        return max(len(self.data) * self._stride() - self._temp_layout_spacing,
+                   self._row_extent)
+
+    def _place(self, index, widget):
+        offset = index * self._stride()
+        if self.layoutType == LayoutType.Vertical:
+            widget.setGeometry(0, offset, self.width(), self._row_extent)
+        else:
+            widget.setGeometry(offset, 0, self._row_extent, self.height())
+
+    def _watch_scroll_areas(self):
+        parent = self.parentWidget()
+        while parent is not None:
+            if isinstance(parent, QAbstractScrollArea):
+                for bar in (parent.verticalScrollBar(),
+                            parent.horizontalScrollBar()):
+                    if bar not in self._watched_scrollbars:
+                        bar.valueChanged.connect(
+                            self._schedule_viewport_update)
+                        self._watched_scrollbars.append(bar)
+            parent = parent.parentWidget()
+
+    def _unwatch_scroll_areas(self):
+        _unwatch_scrollbars(self._watched_scrollbars,
+                            self._schedule_viewport_update)
+
+    def _schedule_viewport_update(self, *args, **kwargs):
+        if self._virtual:
+            self._viewport_timer.start()
+
+    def visible_range(self):
+        """
+        The indices of the first and last data items whose instances should
+        exist, given the visible area and the overscan, when virtualized.
+
+        Returns
+        -------
+        tuple (int, int) or None
+            None if the widget is not virtualized or not visible.
+        """
+        if not self._virtual or not self.data:
+            return None
+        visible = self.visibleRegion().boundingRect()
+        if visible.isEmpty():
+            return None
+        if self.layoutType == LayoutType.Vertical:
+            start, end = visible.top(), visible.bottom()
+        else:
+            start, end = visible.left(), visible.right()
+        stride = self._stride()
+        first = max(start // stride - self._overscan, 0)
+        last = min(end // stride + self._overscan, len(self.data) - 1)
+        return first, last
+
+    def update_viewport(self):
+        """
+        Create, or take from the row cache, the instances entering the
+        visible area and cache the ones leaving it.  Called automatically
+        when the widget is scrolled or resized while virtualized.
+        """
+        visible_range = self.visible_range()
+        if visible_range is None:
+            # Hidden, keep everything as it is until it is shown again.
+            return
+        first, last = visible_range
+        created = reused = 0
+        try:
+            with pydm.data_plugins.connection_queue(defer_connections=True):
+                for index in range(first, last + 1):
+                    if index in self._materialized:
+                        continue
+                    w = self._row_cache.pop(index, None)
+                    if w is not None:
+                        establish_widget_connections(w)
+                        register_widget_rules(w)
+                        reused += 1
+                    else:
+                        w = self._create_instance(self.data[index])
+                        created += 1
+                    self._materialized[index] = w
+                    self._place(index, w)
+                    w.show()
+        except:
+            logger.exception('Template repeater failed to update the '
+                             'visible instances.')
+        finally:
+            pydm.data_plugins.establish_queued_connections()
+        # Cache only after reusing, so that the instances needed now are
+        # not evicted from the cache.
+        for index in list(self._materialized):
+            if index < first or index > last:
+                self._cache_row(index)
+        if created or reused:
+            logger.debug("Template repeater showing items %d to %d: %d "
+                         "instances created and %d reused.", first, last,
+                         created, reused)
+
+    def _cache_row(self, index):
+        w = self._materialized.pop(index)
+        w.hide()
+        close_widget_connections(w)
+        unregister_widget_rules(w)
+        self._row_cache[index] = w
+        self._trim_row_cache()
+
+    def _trim_row_cache(self):
+        while len(self._row_cache) > self._row_cache_limit:
+            _, w = self._row_cache.popitem(last=False)
+            self._destroy_instance(w, connected=False)
+
+    def resizeEvent(self, event):
+        super(PyDMTemplateRepeater, self).resizeEvent(event)
+        if self._virtual:
+            for index, w in self._materialized.items():
+                self._place(index, w)
+            self._schedule_viewport_update()
+
+    def moveEvent(self, event):
+        super(PyDMTemplateRepeater, self).moveEvent(event)
+        self._schedule_viewport_update()
+
+    def showEvent(self, event):
+        super(PyDMTemplateRepeater, self).showEvent(event)
+        if self._virtual:
+            self._watch_scroll_areas()
+            self._schedule_viewport_update()
+
     def clear(self):
         """ Clear out any existing instances of the template inside
         the widget."""
+        self._instances = []
+        if self._virtual:
+            self._viewport_timer.stop()
+            self._unwatch_scroll_areas()
+            for w in self._materialized.values():
+                self._destroy_instance(w)
+            for w in self._row_cache.values():
+                self._destroy_instance(w, connected=False)
+            self._materialized = {}
+            self._row_cache = OrderedDict()
+            self.setMinimumSize(self._saved_minimum_size)
+            self._virtual = False
         if not self.layout():
             return
         while self.layout().count() > 0:
             item = self.layout().takeAt(0)
-            item.widget().deleteLater()
+            self._destroy_instance(item.widget())
             del item
     
     def count(self):
+        """ The number of instances of the template currently created.
+        When virtualized, only the instances in the visible area exist."""
+        if self._virtual:
+            return len(self._materialized)
         if not self.layout():
             return 0
         return self.layout().count()
@@ -445,7 +936,11 @@ class PyDMTemplateRepeater(QFrame, PyDMPrimitiveWidget, LayoutType):
         Sets the dictionary used by the widget to fill in each instance of 
         the template.  This property will be overwritten if the user changes
         the dataSource property.  After setting this property, `rebuild` 
-        is automatically called to refresh the widget.
+        is automatically called to refresh the widget, or `update_instances`
+        if incrementalUpdates is enabled.
         """
         self._data = new_data
-        self.rebuild()
+        if self._incremental_updates:
+            self.update_instances()
+        else:
+            self.rebuild()
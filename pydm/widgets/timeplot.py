@@ -8,7 +8,9 @@ from qtpy.QtCore import Signal, Slot, Property, QTimer
 from qtpy.QtWidgets import QAction
 from .baseplot import BasePlot, BasePlotCurveItem
 from .channel import PyDMChannel
-from .. utilities import remove_protocol
+from .. utilities import (remove_protocol, PyramidRingBuffer,
+                          ColumnRingBuffer)
+from .. utilities.disk_history import DiskHistory
 
 import logging
 logger = logging.getLogger(__name__)
@@ -81,9 +83,16 @@ class TimePlotCurveItem(BasePlotCurveItem):
         self._min_y_value = None
         self._max_y_value = None
 
-        self.data_buffer = np.zeros((2, self._bufferSize), order='f', dtype=float)
+        # The first row records timestamps, the second the actual values.
+        # The buffer also keeps a min/max pyramid of the samples, so that
+        # long histories are drawn at the resolution of the screen.
+        self._buffer = PyramidRingBuffer(self._bufferSize)
+        # In Asynchronous mode, the column of the buffer shared by the curves
+        # of the plot, used instead of the own buffer of the curve.
+        self._column = None
+        # The samples written to disk, if the history is kept on disk.
+        self._history = None
         self.connected = False
-        self.points_accumulated = 0
         self.latest_value = None
         self.channel = None
         self.address = channel_address
@@ -107,7 +116,33 @@ class TimePlotCurveItem(BasePlotCurveItem):
             return
         self.channel = PyDMChannel(address=new_address,
                                    connection_slot=self.connectionStateChanged,
-                                   value_slot=self.receiveNewValue)
+                                   value_slot=self.receiveNewValue,
+                                   values_slot=self.receiveNewValues,
+                                   deliver_all=True)
+
+    @property
+    def data_buffer(self):
+        """
+        The curve data, ordered from the oldest to the newest sample.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (2, bufferSize) view of the curve's ring buffer.  The first row
+            holds the timestamps and the second the values.
+        """
+        return self._buffer.view()
+
+    @property
+    def points_accumulated(self):
+        """
+        The number of samples currently held in the data buffer.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._buffer)
 
     @property
     def plotByTimeStamps(self):
@@ -149,13 +184,13 @@ class TimePlotCurveItem(BasePlotCurveItem):
         # Maybe change pen stroke?
         self.connected = connected
         if not self.connected:
-            self.latest_value = np.nan
+            self._set_latest_value(np.nan)
 
     @Slot(float)
     @Slot(int)
     def receiveNewValue(self, new_value):
         """
-        Rotate and fill the data buffer when a new value is available.
+        Append to the data buffer when a new value is available.
 
         For Synchronous mode, write the new value into the data buffer
         immediately, and increment the accumulated point counter.
@@ -174,17 +209,50 @@ class TimePlotCurveItem(BasePlotCurveItem):
         self.update_min_max_y_values(new_value)
 
         if self._update_mode == PyDMTimePlot.SynchronousMode:
-            self.data_buffer = np.roll(self.data_buffer, -1)
-            #The first array row is to record timestamps, when a new value arrives.
-            self.data_buffer[0, self._bufferSize - 1] = time.time()
-            #The second array row is to record the actual values.
-            self.data_buffer[1, self._bufferSize - 1] = new_value
-
-            if self.points_accumulated < self._bufferSize:
-                self.points_accumulated += 1
+            self.append_sample((time.time(), new_value))
             self.data_changed.emit()
         elif self._update_mode == PyDMTimePlot.AsynchronousMode:
-            self.latest_value = new_value
+            self._set_latest_value(new_value)
+
+    @Slot(np.ndarray, np.ndarray)
+    def receiveNewValues(self, timestamps, values):
+        """
+        Append a batch of samples to the data buffer, with the timestamps
+        given by their source.
+
+        For Synchronous mode, the samples are written into the data buffer
+        at once.  For Asynchronous mode, the latest value is kept to be
+        written when asyncUpdate is called, as with receiveNewValue.
+
+        This method is called by a PyDMChannel with the numeric values
+        received from the data plugin.  You can call it yourself to inject
+        data into the curve.
+
+        Parameters
+        ----------
+        timestamps : numpy.ndarray
+            The timestamps of the samples, in seconds since the epoch, from
+            the oldest to the newest.
+        values : numpy.ndarray
+            The y-values of the samples.
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        self.update_min_max_y_values(values.min())
+        self.update_min_max_y_values(values.max())
+
+        if self._update_mode == PyDMTimePlot.SynchronousMode:
+            self.append_samples(np.vstack((np.asarray(timestamps, dtype=float),
+                                           values)))
+            self.data_changed.emit()
+        elif self._update_mode == PyDMTimePlot.AsynchronousMode:
+            self._set_latest_value(values[-1])
+
+    def _set_latest_value(self, value):
+        self.latest_value = value
+        if self._column is not None:
+            self._column.value = value
 
     @Slot()
     def asyncUpdate(self):
@@ -192,16 +260,75 @@ class TimePlotCurveItem(BasePlotCurveItem):
         Updates the latest data read from the buffered variable into the data
         buffer, together with the timestamp when this happens. Also increments
         the accumulated point counter.
+
+        This does nothing for the curves using a column of the buffer of
+        their plot, which records the values of all its curves at once.
         """
-        if self._update_mode != PyDMTimePlot.AsynchronousMode:
+        if (self._update_mode != PyDMTimePlot.AsynchronousMode or
+                self._column is not None):
             return
-        self.data_buffer = np.roll(self.data_buffer, -1)
-        self.data_buffer[0, self._bufferSize - 1] = time.time()
-        self.data_buffer[1, self._bufferSize - 1] = self.latest_value
-        if self.points_accumulated < self._bufferSize:
-            self.points_accumulated = self.points_accumulated + 1
+        self.append_sample((time.time(), self.latest_value))
         self.data_changed.emit()
 
+    def append_sample(self, sample):
+        """
+        Add a sample to the data buffer, and to the history on disk if it is
+        enabled.
+
+        Parameters
+        ----------
+        sample : tuple
+            The timestamp and the value.
+        """
+        self._buffer.append(sample)
+        if self._history is not None:
+            self._history.append(sample)
+
+    def append_samples(self, samples):
+        """
+        Add several samples to the data buffer, and to the history on disk if
+        it is enabled, in one operation.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            The timestamps and the values, with shape (2, number of samples),
+            from the oldest to the newest.
+        """
+        self._buffer.extend(samples)
+        if self._history is not None:
+            self._history.extend(samples)
+
+    @property
+    def diskHistory(self):
+        """
+        Whether all the samples are also written to memory-mapped files, so
+        that the history older than the data buffer can be plotted.
+
+        Returns
+        -------
+        bool
+        """
+        return self._history is not None
+
+    @diskHistory.setter
+    def diskHistory(self, enabled):
+        """
+        Whether all the samples are also written to memory-mapped files, so
+        that the history older than the data buffer can be plotted.  The
+        data buffer then only needs to hold the samples redrawn often.
+
+        Parameters
+        ----------
+        enabled : bool
+        """
+        if enabled and self._history is None:
+            self._history = DiskHistory(self.address or self.name())
+            self._history.extend(self._buffer.valid())
+        elif not enabled and self._history is not None:
+            self._history.close()
+            self._history = None
+
     def update_min_max_y_values(self, new_value):
         """
         Updte the min and max y-value as a new value is available. This is
@@ -219,17 +346,33 @@ class TimePlotCurveItem(BasePlotCurveItem):
         elif self._max_y_value < new_value:
             self._max_y_value = new_value
 
+    def use_column(self, column):
+        """
+        Read the samples of the curve from a column of a ColumnRingBuffer,
+        written by the plot in Asynchronous mode, instead of from its own
+        data buffer.
+
+        Parameters
+        ----------
+        column : RingBufferColumn or None
+            The column, or None to go back to an own data buffer.
+        """
+        self._column = column
+        if column is not None and self.latest_value is not None:
+            column.value = self.latest_value
+        self.initialize_buffer()
+
     def initialize_buffer(self):
         """
         Initialize the data buffer used to plot the current curve.
         """
-        self.points_accumulated = 0
-
+        if self._column is not None:
+            self._buffer = self._column
+            return
         # If you don't specify dtype=float, you don't have enough
         # resolution for the timestamp data.
-        self.data_buffer = np.zeros((2, self._bufferSize),
-                                    order='f', dtype=float)
-        self.data_buffer[0].fill(time.time())
+        self._buffer = PyramidRingBuffer(self._bufferSize,
+                                         fill=(time.time(), 0))
 
     def getBufferSize(self):
         return int(self._bufferSize)
@@ -254,30 +397,68 @@ class TimePlotCurveItem(BasePlotCurveItem):
         On the other hand, if plot by relative time, take the time diff from
         the starting time of the curve, and plot the data to the time diff
         position on the x-axis.
+
+        When the buffer holds more samples than the plot has pixels, the
+        samples are drawn as the minimum and the maximum of each pixel
+        column of the visible time range.
         """
         try:
-            x = self.data_buffer[0, -self.points_accumulated:].astype(np.float)
-            y = self.data_buffer[1, -self.points_accumulated:].astype(np.float)
+            now = time.time()
+            view_box = self.getViewBox()
+            if view_box is None:
+                x, y = np.array(self._buffer.valid(), dtype=float)
+            else:
+                x_min, x_max = view_box.viewRange()[0]
+                if not self._plot_by_timestamps:
+                    x_min += now
+                    x_max += now
+                # The only copy of the buffer made per redraw.
+                x, y = self._buffer.decimated(x_min, x_max,
+                                              view_box.width())
+                if self._history is not None:
+                    x, y = self._prepend_history(x, y, x_min, x_max,
+                                                 view_box.width())
 
             if not self._plot_by_timestamps:
-                x -= time.time()
+                x -= now
 
             self.setData(y=y, x=x)
         except (ZeroDivisionError, OverflowError):
             # Solve an issue with pyqtgraph and initial downsampling
             pass
 
+    def _prepend_history(self, x, y, x_min, x_max, pixels):
+        # Add the samples of the visible range which are older than the data
+        # buffer, read back from the disk at the resolution of the screen.
+        if len(self._buffer) == 0:
+            return x, y
+        oldest = self._buffer.valid()[0, 0]
+        if x_min >= oldest:
+            return x, y
+        span = max(x_max - x_min, 1e-9)
+        points = 2 * int(np.ceil(pixels * (min(oldest, x_max) - x_min) / span))
+        older = self._history.read(x_min, oldest, max(points, 2))
+        return np.concatenate((older[0], x)), np.concatenate((older[1], y))
+
     def setUpdatesAsynchronously(self, value):
         if value is True:
             self._update_mode = PyDMTimePlot.AsynchronousMode
         else:
             self._update_mode = PyDMTimePlot.SynchronousMode
+            self._drop_column()
         self.initialize_buffer()
 
     def resetUpdatesAsynchronously(self):
         self._update_mode = PyDMTimePlot.SynchronousMode
+        self._drop_column()
         self.initialize_buffer()
 
+    def _drop_column(self):
+        # In Synchronous mode the samples are appended to an own buffer.
+        if self._column is not None:
+            self._column.remove()
+            self._column = None
+
     def max_x(self):
         """
         Provide the the most recent timestamp accumulated from the data buffer.
@@ -288,7 +469,13 @@ class TimePlotCurveItem(BasePlotCurveItem):
         float
             The timestamp of the most recent data point recorded into the data buffer.
         """
-        return self.data_buffer[0, -1]
+        return self._buffer.latest()[0]
+
+    def close(self):
+        """
+        Remove the history files of the curve, if any.
+        """
+        self.diskHistory = False
 
     def channels(self):
         return [self.channel]
@@ -361,14 +548,25 @@ class PyDMTimePlot(BasePlot):
             self.plotItem.setLimits(xMax=0)
 
         self._bufferSize = DEFAULT_BUFFER_SIZE
+        self._disk_history = False
 
         self._time_span = DEFAULT_TIME_SPAN  # This is in seconds
         self._update_interval = DEFAULT_UPDATE_INTERVAL
 
         self.update_timer = QTimer(self)
         self.update_timer.setInterval(self._update_interval)
+        self.update_timer.timeout.connect(self._record_columns)
+        # In Asynchronous mode, the buffer shared by the curves, with a
+        # column per curve.
+        self._columns = None
         self._update_mode = PyDMTimePlot.SynchronousMode
         self._needs_redraw = True
+        self._updating_x_axis = False
+
+        # Draw the curves again at the resolution of the new range when
+        # zooming or resizing.
+        self.getViewBox().sigXRangeChanged.connect(self._view_changed)
+        self.getViewBox().sigResized.connect(self._view_changed)
 
         self.labels = {
             "left": None,
@@ -433,8 +631,10 @@ class PyDMTimePlot(BasePlot):
                                       **plot_opts)
         new_curve.setUpdatesAsynchronously(self.updatesAsynchronously)
         new_curve.setBufferSize(self._bufferSize)
+        new_curve.diskHistory = self._disk_history
+        if self._columns is not None:
+            new_curve.use_column(self._columns.add_column())
 
-        self.update_timer.timeout.connect(new_curve.asyncUpdate)
         self.addCurve(new_curve, curve_color=color)
 
         new_curve.data_changed.connect(self.set_needs_redraw)
@@ -444,16 +644,16 @@ class PyDMTimePlot(BasePlot):
 
     def removeYChannel(self, curve):
         """
-        Remove a curve from the graph. This also stops update the timer
-        associated with the curve.
+        Remove a curve from the graph. This also removes its column from the
+        buffer of the plot in Asynchronous mode.
 
         Parameters
         ----------
         curve : TimePlotCurveItem
             The curve to be removed.
         """
-        self.update_timer.timeout.disconnect(curve.asyncUpdate)
         self.removeCurve(curve)
+        curve.close()
         if len(self._curves) < 1:
             self.redraw_timer.stop()
 
@@ -470,10 +670,48 @@ class PyDMTimePlot(BasePlot):
         curve = self._curves[index]
         self.removeYChannel(curve)
 
+    def removeCurve(self, plot_item):
+        if self._columns is not None and plot_item._column is not None:
+            self._columns.remove_column(plot_item._column)
+            plot_item.use_column(None)
+        super(PyDMTimePlot, self).removeCurve(plot_item)
+
+    def _start_columns(self):
+        # A new buffer for the samples of all the curves.
+        self._columns = ColumnRingBuffer(self._bufferSize, fill=time.time())
+        for curve in self._curves:
+            if curve._update_mode == PyDMTimePlot.AsynchronousMode:
+                curve.use_column(self._columns.add_column())
+
+    def _stop_columns(self):
+        self._columns = None
+        for curve in self._curves:
+            curve.use_column(None)
+
+    @Slot()
+    def _record_columns(self):
+        """
+        In Asynchronous mode, record the latest value of every curve, with
+        the current time, in a single write to the buffer of the curves.
+        """
+        if self._columns is None or not self._curves:
+            return
+        now = time.time()
+        self._columns.append_latest(now)
+        for curve in self._curves:
+            if curve._history is not None and curve._column is not None:
+                curve._history.append((now, curve._column.value))
+        self._needs_redraw = True
+
     @Slot()
     def set_needs_redraw(self):
         self._needs_redraw = True
 
+    def _view_changed(self, *args):
+        # The range changes made by redrawPlot itself come with new data.
+        if not self._updating_x_axis:
+            self._needs_redraw = True
+
     @Slot()
     def redrawPlot(self):
         """
@@ -482,7 +720,11 @@ class PyDMTimePlot(BasePlot):
         if not self._needs_redraw:
             return
 
-        self.updateXAxis()
+        self._updating_x_axis = True
+        try:
+            self.updateXAxis()
+        finally:
+            self._updating_x_axis = False
 
         for curve in self._curves:
             curve.redrawCurve()
@@ -519,7 +761,11 @@ class PyDMTimePlot(BasePlot):
         """
         Remove all curves from the graph.
         """
+        for curve in self._curves:
+            curve.close()
         super(PyDMTimePlot, self).clear()
+        if self._columns is not None:
+            self._start_columns()
 
     def getCurves(self):
         """
@@ -658,6 +904,8 @@ class PyDMTimePlot(BasePlot):
             self._bufferSize = max(int(value), MINIMUM_BUFFER_SIZE)
             for curve in self._curves:
                 curve.setBufferSize(value)
+            if self._columns is not None:
+                self._start_columns()
 
     def resetBufferSize(self):
         """
@@ -668,27 +916,79 @@ class PyDMTimePlot(BasePlot):
             self._bufferSize = DEFAULT_BUFFER_SIZE
             for curve in self._curves:
                 curve.resetBufferSize()
+            if self._columns is not None:
+                self._start_columns()
 
     bufferSize = Property("int", getBufferSize, setBufferSize, resetBufferSize)
 
+    def getDiskHistory(self):
+        """
+        Whether the curves write all their samples to memory-mapped files,
+        so that more history than the data buffers hold can be plotted.
+
+        Returns
+        -------
+        enabled : bool
+        """
+        return self._disk_history
+
+    def setDiskHistory(self, value):
+        """
+        Set whether the curves write all their samples to memory-mapped
+        files, in PYDM_HISTORY_PATH.  The data buffers then only need to hold
+        the recent samples, the older ones in the visible time range are read
+        back from the files when the curves are redrawn.  The files are
+        rotated as configured by PYDM_HISTORY_SEGMENT_SIZE and
+        PYDM_HISTORY_SEGMENTS, and removed when the curves are removed.
+
+        Parameters
+        ----------
+        value : bool
+        """
+        self._disk_history = bool(value)
+        for curve in self._curves:
+            curve.diskHistory = self._disk_history
+
+    def resetDiskHistory(self):
+        """
+        Keep the samples of the curves in their data buffers only.
+        """
+        self.setDiskHistory(False)
+
+    diskHistory = Property("bool", getDiskHistory, setDiskHistory,
+                           resetDiskHistory)
+
     def getUpdatesAsynchronously(self):
         return self._update_mode == PyDMTimePlot.AsynchronousMode
 
     def setUpdatesAsynchronously(self, value):
+        """
+        Set whether the curves are updated on a timer, every updateInterval,
+        with the latest value of their channel, instead of on every new
+        value.  The samples of all the curves are then kept in a single
+        buffer, with one column per curve, written once per update.
+
+        Parameters
+        ----------
+        value : bool
+        """
         for curve in self._curves:
             curve.setUpdatesAsynchronously(value)
         if value is True:
             self._update_mode = PyDMTimePlot.AsynchronousMode
+            self._start_columns()
             self.update_timer.start()
         else:
             self._update_mode = PyDMTimePlot.SynchronousMode
             self.update_timer.stop()
+            self._stop_columns()
 
     def resetUpdatesAsynchronously(self):
         self._update_mode = PyDMTimePlot.SynchronousMode
         self.update_timer.stop()
         for curve in self._curves:
             curve.resetUpdatesAsynchronously()
+        self._stop_columns()
 
     updatesAsynchronously = Property("bool",
                                      getUpdatesAsynchronously,
@@ -6,7 +6,7 @@ from .channel import PyDMChannel
 import itertools
 import json
 from collections import OrderedDict
-from ..utilities import remove_protocol
+from ..utilities import remove_protocol, decimate_view
 
 
 class WaveformCurveItem(BasePlotCurveItem):
@@ -41,12 +41,17 @@ class WaveformCurveItem(BasePlotCurveItem):
         - WaveformCurveItem.REDRAW_ON_X: Redraw after X receives new data.
         - WaveformCurveItem.REDRAW_ON_Y: Redraw after Y receives new data.
         - WaveformCurveItem.REDRAW_ON_BOTH: Redraw after both X and Y receive new data.
+    decimation: bool, optional
+        Whether waveforms with more points than the plot has pixels are
+        decimated to the minimum and maximum of each pixel column before
+        being drawn.  Defaults to True.
     **kargs: optional
         PlotDataItem keyword arguments, such as symbol and symbolSize.
     """
     _channels = ('x_channel', 'y_channel')
 
-    def __init__(self, y_addr=None, x_addr=None, redraw_mode=None, **kws):
+    def __init__(self, y_addr=None, x_addr=None, redraw_mode=None,
+                 decimation=True, **kws):
         y_addr = "" if y_addr is None else y_addr
         if kws.get('name') is None:
             y_name = remove_protocol(y_addr)
@@ -72,6 +77,11 @@ class WaveformCurveItem(BasePlotCurveItem):
         # y_waveform with the latest values, based on the redraw mode.
         self.latest_x = None
         self.latest_y = None
+        self.decimation = decimation
+        # The window of the last decimation, and whether the X waveform it
+        # was computed for is sorted.
+        self._decimated_window = None
+        self._x_sorted = (None, False)
         super(WaveformCurveItem, self).__init__(**kws)
 
     def to_dict(self):
@@ -87,6 +97,7 @@ class WaveformCurveItem(BasePlotCurveItem):
                             ("x_channel", self.x_address)])
         dic_.update(super(WaveformCurveItem, self).to_dict())
         dic_["redraw_mode"] = self.redraw_mode
+        dic_["decimation"] = self.decimation
         return dic_
 
     @property
@@ -238,18 +249,81 @@ class WaveformCurveItem(BasePlotCurveItem):
         # longer so that they are both the same size.
         if self.y_waveform is None:
             return
-        if self.x_waveform is None:
-            self.setData(y=self.y_waveform.astype(np.float))
+        if self.x_waveform is not None:
+            if self.x_waveform.shape[0] > self.y_waveform.shape[0]:
+                self.x_waveform = self.x_waveform[:self.y_waveform.shape[0]]
+            elif self.x_waveform.shape[0] < self.y_waveform.shape[0]:
+                self.y_waveform = self.y_waveform[:self.x_waveform.shape[0]]
+        x, y = self.x_waveform, self.y_waveform
+        self._decimated_window = self.decimation_window()
+        if self._decimated_window is not None:
+            # Only the points that are visible at the resolution of the
+            # screen are converted and drawn.
+            indices = decimate_view(y, *self._decimated_window)
+            y = y[indices]
+            x = indices if x is None else x[indices]
+        # No copy is made if the waveforms are already floats.
+        y = np.asarray(y, dtype=float)
+        if x is None:
+            self.setData(y=y)
             return
-        if self.x_waveform.shape[0] > self.y_waveform.shape[0]:
-            self.x_waveform = self.x_waveform[:self.y_waveform.shape[0]]
-        elif self.x_waveform.shape[0] < self.y_waveform.shape[0]:
-            self.y_waveform = self.y_waveform[:self.x_waveform.shape[0]]
-        self.setData(x=self.x_waveform.astype(np.float),
-                     y=self.y_waveform.astype(np.float))
+        self.setData(x=np.asarray(x, dtype=float), y=y)
         self.needs_new_x = True
         self.needs_new_y = True
 
+    def decimation_window(self):
+        """
+        The part of the Y waveform that is visible, and the number of pixels
+        it spans, if it has to be decimated.
+
+        The waveform is not decimated when the curve draws symbols, which
+        would otherwise be drawn for the extrema of each pixel column only,
+        nor when the X waveform is not sorted, since the extrema of a range
+        of indices are then scattered over the plot.
+
+        Returns
+        -------
+        tuple (int, int, int) or None
+            The number of pixels, the index of the first visible point and
+            the index after the last one, or None if the waveform is drawn
+            as is.
+        """
+        if (not self.decimation or self.y_waveform is None or
+                self.opts['symbol'] is not None):
+            return None
+        view_box = self.getViewBox()
+        if view_box is None:
+            return None
+        pixels = int(view_box.width())
+        count = self.y_waveform.shape[0]
+        if pixels < 1 or count <= 2 * pixels:
+            return None
+        x_min, x_max = view_box.viewRange()[0]
+        x = self.x_waveform
+        if x is None:
+            start = int(np.floor(x_min))
+            stop = int(np.ceil(x_max)) + 1
+        elif self._is_x_sorted():
+            start = int(np.searchsorted(x, x_min, side='left'))
+            stop = int(np.searchsorted(x, x_max, side='right'))
+        else:
+            return None
+        start = min(max(start, 0), count)
+        stop = min(max(stop, start), count)
+        return (pixels, start, stop)
+
+    def setSymbol(self, symbol):
+        super(WaveformCurveItem, self).setSymbol(symbol)
+        if self.decimation_window() != self._decimated_window:
+            self.redrawCurve()
+
+    def _is_x_sorted(self):
+        x, x_sorted = self._x_sorted
+        if x is not self.x_waveform:
+            x_sorted = bool(np.all(self.x_waveform[1:] >= self.x_waveform[:-1]))
+            self._x_sorted = (self.x_waveform, x_sorted)
+        return x_sorted
+
     def limits(self):
         """
         Limits of the data for this curve.
@@ -328,6 +402,10 @@ class PyDMWaveformPlot(BasePlot):
         init_channel_pairs = zip(init_x_channels, init_y_channels)
         for (x_chan, y_chan) in init_channel_pairs:
             self.addChannel(y_chan, x_channel=x_chan)
+        # Decimate the long waveforms again when zooming or resizing.
+        view_box = self.plotItem.getViewBox()
+        view_box.sigXRangeChanged.connect(self._view_changed)
+        view_box.sigResized.connect(self._view_changed)
 
     def initialize_for_designer(self):
         # If we are in Qt Designer, don't update the plot continuously.
@@ -336,7 +414,8 @@ class PyDMWaveformPlot(BasePlot):
 
     def addChannel(self, y_channel=None, x_channel=None, name=None,
                    color=None, lineStyle=None, lineWidth=None,
-                   symbol=None, symbolSize=None, redraw_mode=None):
+                   symbol=None, symbolSize=None, redraw_mode=None,
+                   decimation=None):
         """
         Add a new curve to the plot.  In addition to the arguments below,
         all other keyword arguments are passed to the underlying
@@ -371,6 +450,9 @@ class PyDMWaveformPlot(BasePlot):
             Which symbol to use to represent the data.
         symbol: int, optional
             Size of the symbol.
+        decimation: bool, optional
+            Whether long waveforms are decimated to the resolution of the
+            screen before being drawn.  Defaults to True.
         """
         plot_opts = {}
         plot_opts['symbol'] = symbol
@@ -382,6 +464,8 @@ class PyDMWaveformPlot(BasePlot):
             plot_opts['lineWidth'] = lineWidth
         if redraw_mode is not None:
             plot_opts['redraw_mode'] = redraw_mode
+        if decimation is not None:
+            plot_opts['decimation'] = decimation
         self._needs_redraw = False
         curve = WaveformCurveItem(y_addr=y_channel,
                                   x_addr=x_channel,
@@ -420,6 +504,12 @@ class PyDMWaveformPlot(BasePlot):
     def set_needs_redraw(self):
         self._needs_redraw = True
 
+    def _view_changed(self, *args):
+        for curve in self._curves:
+            if curve.decimation_window() != curve._decimated_window:
+                self._needs_redraw = True
+                return
+
     @Slot()
     def redrawPlot(self):
         """
@@ -472,7 +562,8 @@ class PyDMWaveformPlot(BasePlot):
                             lineWidth=d.get('lineWidth'),
                             symbol=d.get('symbol'),
                             symbolSize=d.get('symbolSize'),
-                            redraw_mode=d.get('redraw_mode'))
+                            redraw_mode=d.get('redraw_mode'),
+                            decimation=d.get('decimation'))
 
     curves = Property("QStringList", getCurves, setCurves, designable=False)
 
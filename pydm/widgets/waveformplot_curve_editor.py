@@ -13,7 +13,7 @@ class PyDMWaveformPlotCurvesModel(BasePlotCurvesModel):
     def __init__(self, plot, parent=None):
         super(PyDMWaveformPlotCurvesModel, self).__init__(plot, parent=parent)
         self._column_names = ('Y Channel', 'X Channel') + self._column_names
-        self._column_names += ('Redraw Mode', )
+        self._column_names += ('Redraw Mode', 'Decimation')
 
     def get_data(self, column_name, curve):
         if column_name == "Y Channel":
@@ -26,6 +26,8 @@ class PyDMWaveformPlotCurvesModel(BasePlotCurvesModel):
             return str(curve.x_address)
         elif column_name == "Redraw Mode":
             return curve.redraw_mode
+        elif column_name == "Decimation":
+            return curve.decimation
         return super(PyDMWaveformPlotCurvesModel, self).get_data(
             column_name, curve)
 
@@ -36,6 +38,8 @@ class PyDMWaveformPlotCurvesModel(BasePlotCurvesModel):
             curve.x_address = str(value)
         elif column_name == "Redraw Mode":
             curve.redraw_mode = int(value)
+        elif column_name == "Decimation":
+            curve.decimation = bool(value)
         else:
             return super(PyDMWaveformPlotCurvesModel, self).set_data(
                 column_name=column_name, curve=curve, value=value)
@@ -1,9 +1,11 @@
 import sys
+import time
 import argparse
 import logging
 
 
 def main():
+    start = time.time()
     logger = logging.getLogger('')
     handler = logging.StreamHandler()
     formatter = logging.Formatter('[%(asctime)s] [%(levelname)-8s] - %(message)s')
@@ -12,22 +14,8 @@ def main():
     logger.setLevel("INFO")
     handler.setLevel("INFO")
 
-    from pydm.utilities import setup_renderer
-
-    setup_renderer()
-
-    try:
-        """
-        We must import QtWebEngineWidgets before creating a QApplication
-        otherwise we get the following error if someone adds a WebView at Designer:
-        ImportError: QtWebEngineWidgets must be imported before a QCoreApplication instance is created
-        """
-        from qtpy import QtWebEngineWidgets
-    except ImportError:
-        logger.debug('QtWebEngine is not supported.')
-
     import pydm
-    from pydm.utilities.macro import parse_macro_string
+    from pydm import tracing
 
     parser = argparse.ArgumentParser(description="Python Display Manager")
     parser.add_argument(
@@ -96,6 +84,13 @@ def main():
              ' Qt widgets.',
         default=None
         )
+    parser.add_argument(
+        '--trace-file',
+        help='Record how long the startup and the loading of the displays' +
+             ' take, and save it at exit to this file as a Chrome trace' +
+             ' (open it with chrome://tracing or ui.perfetto.dev).',
+        default=None
+        )
     parser.add_argument(
         'display_args',
         help='Arguments to be passed to the PyDM client application' +
@@ -105,6 +100,26 @@ def main():
         )
 
     pydm_args = parser.parse_args()
+    if pydm_args.trace_file:
+        tracing.enable_tracing(start)
+    startup = tracing.trace_span("startup").begin()
+
+    with tracing.trace_span("import pydm"):
+        from pydm.utilities import setup_renderer
+        from pydm.utilities.macro import parse_macro_string
+
+    setup_renderer()
+
+    try:
+        """
+        We must import QtWebEngineWidgets before creating a QApplication
+        otherwise we get the following error if someone adds a WebView at Designer:
+        ImportError: QtWebEngineWidgets must be imported before a QCoreApplication instance is created
+        """
+        from qtpy import QtWebEngineWidgets
+    except ImportError:
+        logger.debug('QtWebEngine is not supported.')
+
     macros = None
     if pydm_args.macro is not None:
         macros = parse_macro_string(pydm_args.macro)
@@ -113,23 +128,31 @@ def main():
         logger.setLevel(pydm_args.log_level)
         handler.setLevel(pydm_args.log_level)
 
-    app = pydm.PyDMApplication(
-        ui_file=pydm_args.displayfile,
-        command_line_args=pydm_args.display_args,
-        perfmon=pydm_args.perfmon,
-        hide_nav_bar=pydm_args.hide_nav_bar,
-        hide_menu_bar=pydm_args.hide_menu_bar,
-        hide_status_bar=pydm_args.hide_status_bar,
-        fullscreen=pydm_args.fullscreen,
-        read_only=pydm_args.read_only,
-        macros=macros,
-        stylesheet_path=pydm_args.stylesheet
-        )
+    with tracing.trace_span("create application"):
+        app = pydm.PyDMApplication(
+            ui_file=pydm_args.displayfile,
+            command_line_args=pydm_args.display_args,
+            perfmon=pydm_args.perfmon,
+            hide_nav_bar=pydm_args.hide_nav_bar,
+            hide_menu_bar=pydm_args.hide_menu_bar,
+            hide_status_bar=pydm_args.hide_status_bar,
+            fullscreen=pydm_args.fullscreen,
+            read_only=pydm_args.read_only,
+            macros=macros,
+            stylesheet_path=pydm_args.stylesheet
+            )
 
     pydm.utilities.shortcuts.install_connection_inspector(
         parent=app.main_window)
 
-    sys.exit(app.exec_())
+    # The startup ends once the event loop runs.
+    from qtpy.QtCore import QTimer
+    QTimer.singleShot(0, lambda: startup.end())
+
+    ret = app.exec_()
+    if pydm_args.trace_file:
+        tracing.save_trace(pydm_args.trace_file)
+    sys.exit(ret)
 
 
 if __name__ == "__main__":